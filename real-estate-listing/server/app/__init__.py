@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from config import Config
 from config import import_firebase_variables
@@ -12,6 +12,19 @@ from app.utils import bp as utils_bp
 from app.vendors import bp as vendors_bp
 from app.admin import bp as admin_bp
 from app.blogs import bp as blogs_bp
+from app.media import bp as media_bp
+from app.services.search_index import ensure_search_index
+from app.middleware.query_budget import init_query_budget
+from app.middleware.firebase_tokens import init_token_verifier
+from app.middleware.local_auth import init_local_auth
+from app.middleware.compression import init_compression
+from app.services.mailer import init_mailer
+from app.services.view_counters import init_view_counters
+from app.services.response_cache import init_response_cache
+from app.services.live_updates import init_live_updates
+from app.services.serialization import init_fast_json
+from app.services.image_storage import init_image_storage
+from app.services.image_variants import init_image_variants
 import firebase_admin
 from firebase_admin import credentials
 import os
@@ -28,12 +41,26 @@ load_dotenv(env_path)
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    # orjson-encoded JSON responses
+    init_fast_json(app)
 
     # Configure CORS to allow requests from Next.js frontend
-    CORS(app, resources={r"/*": {"origins": ["http://localhost:3000", "http://127.0.0.1:3000"]}}, supports_credentials=True)
+    CORS(app, resources={r"/*": {"origins": app.config['CORS_ORIGINS']}}, supports_credentials=True)
     # Initialize Flask extensions here
     # Init db
     db.init_app(app)
+    # Per-request SQL query budget (development/tests)
+    init_query_budget(app)
+    # Background delivery of queued emails
+    init_mailer(app)
+    # Blog and property view counts, written in batches
+    init_view_counters(app)
+    # Cache for public read endpoints, invalidated by writes
+    init_response_cache(app)
+    # Server-Sent Events of new and updated listings
+    init_live_updates(app)
+    # gzip/brotli compression of large responses
+    init_compression(app)
 
     # Register blueprints here
     app.register_blueprint(main_bp)
@@ -45,15 +72,14 @@ def create_app(config_class=Config):
     app.register_blueprint(vendors_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(blogs_bp)
+    app.register_blueprint(media_bp)
+
+    # Create the full-text search index for properties if it is missing
+    with app.app_context():
+        ensure_search_index()
     
-    # Serve uploaded images
-    uploads_dir = os.path.join(server_dir, 'uploads')
-    os.makedirs(uploads_dir, exist_ok=True)
-    
-    @app.route('/uploads/properties/<filename>')
-    def uploaded_file(filename):
-        """Serve uploaded property images"""
-        return send_from_directory(os.path.join(uploads_dir, 'properties'), filename)
+    # Uploaded images are served by the media blueprint
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     #projects/603732657929/secrets/FIREBASE_KEYS
     # Initialize Firebase Admin SDK
     firebase_initialized = False
@@ -94,4 +120,19 @@ def create_app(config_class=Config):
         print("  1. Place firebase-service-account.json in the server directory, OR")
         print("  2. Set Firebase environment variables (see BACKEND_FIREBASE_SETUP.md)")
 
+    if app.config.get('AUTH_PROVIDER') == 'local':
+        # Offline test identity provider (see app/middleware/local_auth.py)
+        init_local_auth(app)
+    else:
+        # Verify Firebase ID tokens locally (see app/middleware/firebase_tokens.py)
+        project_id = app.config.get('FIREBASE_PROJECT_ID')
+        if not project_id and firebase_admin._apps:
+            project_id = firebase_admin.get_app().project_id
+        init_token_verifier(app, project_id)
+
+    # Resolve image storage backends once (needs Firebase for Firebase Storage)
+    uploader = init_image_storage(app)
+    # Resized WebP/JPEG copies of every uploaded image
+    init_image_variants(app, uploader)
+
     return app
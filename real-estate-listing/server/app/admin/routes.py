@@ -1,5 +1,5 @@
 from app.admin import bp
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from app.middleware.authenticate import authenticate_user
 from app.middleware.admin import require_admin
 import os
@@ -30,3 +30,33 @@ def check_admin():
         "admin_emails_configured": len(admin_emails) > 0
     }), 200
 
+
+# Admin: Response cache statistics (hits, computed and coalesced misses)
+@bp.get('/admin/cache_stats')
+@authenticate_user
+@require_admin
+def cache_stats():
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({
+        "enabled": True,
+        "redis": cache.remote is not None,
+        "stats": dict(cache.stats)
+    }), 200
+
+
+# Admin: Response compression statistics (bytes saved per endpoint)
+@bp.get('/admin/compression_stats')
+@authenticate_user
+@require_admin
+def compression_stats():
+    compressor = current_app.extensions.get('compression')
+    if compressor is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({
+        "enabled": True,
+        "encodings": list(compressor.encodings),
+        "min_size": compressor.min_size,
+        "endpoints": {endpoint: dict(stats) for endpoint, stats in compressor.stats.items()}
+    }), 200
@@ -6,41 +6,59 @@ import uuid
 from app.middleware.authenticate import authenticate_user
 from app.middleware.admin import require_admin
 from datetime import datetime
+from app.services.pagination import cursor_requested, paginate_by_cursor, with_next_cursor
+from app.services.listing_queries import admin_blogs, published_blogs
+from app.services.view_counters import count_view
+from app.services.response_cache import cached_response
+from app.services.conditional import not_modified, pagination_etag, resource_validators, unchanged, with_validators
 
 # Get all published blogs (public endpoint)
 @bp.get('/blogs')
+@cached_response('blogs')
 def get_all_blogs():
     category = request.args.get('category', None)
     page = request.args.get('page', 1, type=int)
     
-    query = Blog.query.filter_by(published=True, active=True)
+    query = published_blogs(category)
     
-    if category:
-        query = query.filter_by(category=category)
-    
-    pagination_result = query.order_by(Blog.date_published.desc()).paginate(page=page, per_page=10)
+    if cursor_requested():
+        pagination_result = paginate_by_cursor(query, Blog, per_page=10)
+    else:
+        pagination_result = query.order_by(Blog.date_published.desc()).paginate(page=page, per_page=10)
     
     if pagination_result is None:
         return jsonify({"blogs": [], "pages": 0}), 200
+    # The client has this page already: nothing to serialize
+    etag = pagination_etag(pagination_result)
+    if unchanged(etag):
+        return not_modified(etag)
     
-    return jsonify({
+    return with_validators(jsonify(with_next_cursor({
         "blogs": [blog.serialize() for blog in pagination_result.items],
         "pages": pagination_result.pages,
         "current_page": page
-    }), 200
+    }, pagination_result)), etag), 200
 
 # Get blog by ID (public endpoint)
 @bp.get('/blogs/<blog_id>')
 def get_blog(blog_id):
+    # Answer conditional requests before loading the blog
+    validators = resource_validators("blog", Blog, blog_id)
+    if validators is None:
+        return jsonify({"message": "Blog not found"}), 404
+    
+    # Count the view (buffered, written in batches)
+    pending_views = count_view(Blog, blog_id)
+    if unchanged(*validators):
+        return not_modified(*validators)
+
     blog = Blog.query.get(blog_id)
     if blog is None:
         return jsonify({"message": "Blog not found"}), 404
+    blog_data = blog.serialize()
+    blog_data["views"] = (blog.views or 0) + pending_views
     
-    # Increment views
-    blog.views = (blog.views or 0) + 1
-    db.session.commit()
-    
-    return jsonify(blog.serialize()), 200
+    return with_validators(jsonify(blog_data), *validators), 200
 
 # Admin: Create blog
 @bp.post('/blogs/admin/create')
@@ -160,9 +178,7 @@ def admin_get_all_blogs():
     include_unpublished = request.args.get('include_unpublished', 'false').lower() == 'true'
     page = request.args.get('page', 1, type=int)
     
-    query = Blog.query.filter_by(active=True)
-    if not include_unpublished:
-        query = query.filter_by(published=True)
+    query = admin_blogs(include_unpublished)
     
     pagination_result = query.order_by(Blog.date_created.desc()).paginate(page=page, per_page=20)
     
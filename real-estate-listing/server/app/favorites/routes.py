@@ -5,6 +5,8 @@ from flask import jsonify, request
 from app.extensions import db
 import uuid
 from app.middleware.authenticate import authenticate_user
+from app.services.pagination import cursor_requested, paginate_by_cursor, with_next_cursor
+from app.services.listing_queries import NEWEST_FIRST, favorite_properties, user_favorite
 
 # Get user favorites
 
@@ -13,26 +15,24 @@ from app.middleware.authenticate import authenticate_user
 @authenticate_user
 def get_user_favorites(user_id):
     page_number = request.args.get("page", 1, type=int)
-    pagination_result = Favorite.query.filter_by(
-        user_id=user_id).paginate(page=page_number, per_page=20)
 
-    favorite_items = [
-        item.property_id for item in pagination_result.items]
+    # Fetch the favorited properties in one joined query
+    query = favorite_properties(user_id)
+    if cursor_requested():
+        pagination_result = paginate_by_cursor(query, Property, per_page=20)
+    else:
+        pagination_result = query.order_by(*NEWEST_FIRST).paginate(page=page_number, per_page=20)
 
-    # print(favorite_items)
-    if favorite_items is None:
-        return jsonify({"properties": [], "pages": 0}), 200
-    try:
-        favorite_items_with_details = []
-        for item in favorite_items:
-            item_results = Property.query.get(item)
-            serialized_results = item_results.serialize()
-            serialized_results["property_images"] = item_results.get_property_images(
-            )
-            favorite_items_with_details.append(serialized_results)
-        return jsonify({"properties": favorite_items_with_details, "pages": pagination_result.pages}), 200
-    except Exception as e:
-        return jsonify(e), 500
+    favorite_items_with_details = []
+    for item_results in pagination_result.items:
+        serialized_results = item_results.serialize()
+        serialized_results["property_images"] = item_results.get_property_images()
+        favorite_items_with_details.append(serialized_results)
+
+    return jsonify(with_next_cursor({
+        "properties": favorite_items_with_details,
+        "pages": pagination_result.pages
+    }, pagination_result)), 200
 
 # Add property to favorites
 
@@ -40,8 +40,7 @@ def get_user_favorites(user_id):
 @bp.post('/favorites/add_to_favorites')
 def add_to_favorite():
     request_data = request.get_json()
-    result = Favorite.query.filter(
-        Favorite.property_id == request_data['property_id'], Favorite.user_id == request_data['user_id']).first()
+    result = user_favorite(request_data['user_id'], request_data['property_id']).first()
 
     if request_data['action'] == "add":
         if result != None:
@@ -67,8 +66,7 @@ def add_to_favorite():
 
 @bp.get('/favorites/check_property/<user_id>/<property_id>')
 def check_property_exists(user_id, property_id):
-    result = Favorite.query.filter(
-        Favorite.property_id == property_id, Favorite.user_id == user_id).first()
+    result = user_favorite(user_id, property_id).first()
 
     if result is None:
         return jsonify("False")
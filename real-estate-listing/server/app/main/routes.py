@@ -1,5 +1,28 @@
+from flask import current_app, jsonify, request
 from app.main import bp
+from app.extensions import db
+from app.services.change_feed import ENTITIES, changes_since
 
 @bp.route('/')
 def index():
     return '<h1>Home page</h1>'
+
+
+# Change feed: changes to listings, realtors, blogs and vendors after a sequence number
+@bp.get('/changes')
+def get_changes():
+    since = request.args.get('since', 0, type=int)
+    page_size = current_app.config.get('CHANGE_FEED_PAGE_SIZE', 500)
+    limit = min(request.args.get('limit', page_size, type=int) or page_size, page_size)
+    entities = [entity.strip() for entity in request.args.get('entity', '').split(',') if entity.strip()]
+    unknown = sorted(set(entities) - set(ENTITIES))
+    if unknown:
+        return jsonify({"message": f"Unknown entities: {', '.join(unknown)}"}), 400
+
+    changes, more = changes_since(db.session.connection(), max(since, 0), max(limit, 1), entities,
+                                  settle=current_app.config.get('CHANGE_FEED_SETTLE', 0))
+    return jsonify({
+        "changes": changes,
+        "next": changes[-1]["seq"] if changes else max(since, 0),
+        "more": more
+    }), 200
@@ -0,0 +1,92 @@
+"""
+Serving of uploaded property images.
+
+Content-addressed files (`<sha256>.<ext>` and their `<sha256>_<width>w.<ext>`
+variants, see app/services/image_store.py) never change, so they are sent
+with an immutable, year-long Cache-Control and their name as a strong
+ETag; revalidations get a 304 without touching the disk. Older uploads get
+UPLOADS_MAX_AGE and an ETag from a hash of their content.
+
+UPLOADS_SERVE_MODE picks who streams the bytes:
+- 'app': the app sends the file (Range requests supported; gunicorn uses
+  sendfile(2) for it),
+- 'accel': nginx, via X-Accel-Redirect to UPLOADS_ACCEL_PREFIX, e.g.
+      location /protected-uploads/ { internal; alias /app/uploads/properties/; }
+- 'sendfile': Apache/lighttpd, via an X-Sendfile header with the file path.
+In the last two modes, request threads only write headers.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from cachetools import LRUCache
+from flask import abort, current_app, request, send_file
+from werkzeug.utils import safe_join
+from app.media import bp
+
+HASHED_FILENAME = re.compile(r'^[0-9a-f]{64}(_\d+w)?\.\w+$')
+
+# One year, the longest max-age caches are asked to honour
+IMMUTABLE_MAX_AGE = 31536000
+
+_content_etags = LRUCache(maxsize=10000)
+_content_etags_lock = threading.Lock()
+
+
+def _content_etag(path):
+    """SHA-256 of a file's content, cached until the file changes"""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _content_etags_lock:
+        etag = _content_etags.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()
+        with _content_etags_lock:
+            _content_etags[key] = etag
+    return etag
+
+
+# Serve uploaded images
+@bp.get('/uploads/properties/<filename>')
+def uploaded_file(filename):
+    """Serve uploaded property images"""
+    config = current_app.config
+    path = safe_join(os.path.join(config['UPLOAD_FOLDER'], 'properties'), filename)
+    if path is None:
+        abort(404)
+
+    hashed = HASHED_FILENAME.match(filename) is not None
+    if hashed:
+        etag = filename
+        cache_control = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        if not os.path.isfile(path):
+            abort(404)
+        etag = _content_etag(path)
+        cache_control = f"public, max-age={config.get('UPLOADS_MAX_AGE', 86400)}"
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    elif not os.path.isfile(path):
+        abort(404)
+    else:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        mode = config.get('UPLOADS_SERVE_MODE', 'app')
+        if mode == 'accel':
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = f"{config['UPLOADS_ACCEL_PREFIX'].rstrip('/')}/{filename}"
+        elif mode == 'sendfile':
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Sendfile'] = path
+        else:
+            # conditional=True answers If-Modified-Since and Range requests
+            response = send_file(path, mimetype=mimetype, conditional=True, etag=etag, max_age=None)
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
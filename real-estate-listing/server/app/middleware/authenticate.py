@@ -1,23 +1,17 @@
-from flask import request
-import firebase_admin
-from firebase_admin import auth, credentials
+from flask import request, current_app
 from functools import wraps
+import jwt
+from app.middleware.firebase_tokens import KeySourceError
 
 def authenticate_user(f):
     @wraps(f)
     def wrap(*args, **kwargs):
-        # Check if Firebase Admin SDK is initialized
-        try:
-            import firebase_admin
-            if not firebase_admin._apps:
-                return {
-                    'message': 'Firebase Admin SDK is not initialized. Please set up Firebase environment variables on the backend.',
-                    'error': 'firebase_not_configured'
-                }, 503
-        except ImportError:
+        # Tokens are verified locally (see app/middleware/firebase_tokens.py)
+        verifier = current_app.extensions.get('token_verifier')
+        if verifier is None:
             return {
-                'message': 'Firebase Admin SDK is not available.',
-                'error': 'firebase_not_available'
+                'message': 'Firebase project id is not configured. Please set FIREBASE_PROJECT_ID (or a Firebase service account) on the backend.',
+                'error': 'firebase_project_id_missing'
             }, 503
         
         auth_header = request.headers.get('Authorization')
@@ -31,18 +25,19 @@ def authenticate_user(f):
             else:
                 token = auth_header
             
-            from firebase_admin import auth
-            user = auth.verify_id_token(token)
+            user = verifier.verify(token)
             request.user = user
-        except ValueError as e:
-            # Firebase not initialized
-            print(f"Firebase not initialized: {e}")
+        except KeySourceError as e:
+            print(f"Token signing keys unavailable: {e}")
             return {
-                'message': 'Firebase Admin SDK is not initialized. Please configure Firebase credentials on the backend.',
-                'error': 'firebase_not_initialized'
+                'message': 'Unable to verify tokens right now. Please try again later.',
+                'error': 'signing_keys_unavailable'
             }, 503
-        except Exception as e:
+        except jwt.InvalidTokenError as e:
             print(f"Authentication error: {e}")
             return {'message': 'Invalid token provided.', 'error': str(e)}, 401
+        except Exception as e:
+            print(f"Authentication error: {type(e).__name__}: {e}")
+            return {'message': 'Invalid token provided.', 'error': str(e)}, 401
         return f(*args, **kwargs)
     return wrap
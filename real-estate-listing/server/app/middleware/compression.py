@@ -0,0 +1,113 @@
+"""
+Response compression.
+
+An `after_request` hook compresses text responses of at least
+COMPRESSION_MIN_SIZE bytes with the best encoding the client accepts:
+brotli when the brotli package is installed, else gzip. Responses that
+are streamed, already encoded, or not 200s are left alone.
+
+Responses served from the response cache (app/services/response_cache.py)
+carry a dict of compressed bodies stored with their cache entry, so a
+popular page is compressed once per worker instead of on every hit.
+
+`stats` counts, per endpoint, the responses compressed and the bytes
+before and after compression (GET /admin/compression_stats).
+"""
+import gzip
+import threading
+from flask import request
+
+# Brotli import (optional - gzip is used when it isn't installed)
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Mimetypes worth compressing (images are already compressed)
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'application/javascript',
+                          'text/html', 'text/plain', 'text/csv', 'text/css', 'text/event-stream'}
+
+
+class Compressor:
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+        self.stats = {}  # endpoint -> counters
+        self._lock = threading.Lock()
+
+    def negotiate(self):
+        """Encoding to use for the current request, None if the client accepts none of ours"""
+        accepted = request.accept_encodings
+        for encoding in self.encodings:
+            if accepted[encoding]:
+                return encoding
+        return None
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def process(self, response):
+        """Compress `response` in place when it is worth it"""
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        # Compressed bodies stored with a cache entry, filled on first use
+        precompressed = getattr(response, 'precompressed', None)
+        compressed = precompressed.get(encoding) if precompressed is not None else None
+        reused = compressed is not None
+        if compressed is None:
+            compressed = self.compress(body, encoding)
+            if precompressed is not None:
+                precompressed[encoding] = compressed
+        if len(compressed) >= len(body):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        self._record(request.endpoint, len(body), len(compressed), reused)
+        return response
+
+    def _record(self, endpoint, original, compressed, reused):
+        with self._lock:
+            stats = self.stats.setdefault(endpoint or 'unknown', {
+                'responses': 0, 'precompressed': 0, 'bytes_in': 0, 'bytes_out': 0, 'bytes_saved': 0})
+            stats['responses'] += 1
+            stats['precompressed'] += int(reused)
+            stats['bytes_in'] += original
+            stats['bytes_out'] += compressed
+            stats['bytes_saved'] += original - compressed
+
+
+def init_compression(app):
+    """Compress responses with gzip (or brotli) when the client accepts it"""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return None
+    if not BROTLI_AVAILABLE:
+        print("⚠️  Warning: brotli is not installed, responses are compressed with gzip only")
+
+    compressor = Compressor(
+        min_size=app.config.get('COMPRESSION_MIN_SIZE', 1024),
+        gzip_level=app.config.get('COMPRESSION_GZIP_LEVEL', 6),
+        brotli_quality=app.config.get('COMPRESSION_BROTLI_QUALITY', 5),
+    )
+    app.extensions['compression'] = compressor
+
+    @app.after_request
+    def compress_response(response):
+        return compressor.process(response)
+
+    return compressor
@@ -0,0 +1,164 @@
+"""
+Local verification of Firebase ID tokens.
+
+Instead of calling firebase_admin.auth.verify_id_token on every request,
+tokens are verified here with PyJWT against Google's signing certificates,
+which are cached for as long as their Cache-Control max-age allows.
+Verified claims are memoized per token (by SHA-256 hash) until the token
+expires, so a repeat request with the same token costs a dictionary lookup.
+
+The key source is pluggable: `StaticKeySource` takes locally generated
+keys, which lets the verifier run offline.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+import jwt
+import requests
+from cryptography import x509
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+
+# Don't refetch certificates for an unknown key id more often than this (seconds)
+MIN_REFRESH_INTERVAL = 60
+
+
+class KeySourceError(Exception):
+    """Signing keys could not be loaded"""
+
+
+class GoogleCertKeySource:
+    """Google's token signing certificates, cached for their max-age"""
+
+    def __init__(self, url=GOOGLE_CERTS_URL, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = 0
+
+    def get_key(self, kid):
+        now = time.time()
+        with self._lock:
+            stale = now >= self._expires_at
+            # Keys rotate: an unknown key id may mean new certificates are out
+            unknown = kid not in self._keys and now - self._fetched_at >= MIN_REFRESH_INTERVAL
+            if stale or unknown:
+                self._refresh(now)
+            return self._keys.get(kid)
+
+    def _refresh(self, now):
+        try:
+            response = requests.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            certificates = response.json()
+        except Exception as e:
+            if self._keys:
+                # Keep using the previous certificates for a little longer
+                print(f"[AUTH] Failed to refresh signing certificates: {e}")
+                self._expires_at = now + MIN_REFRESH_INTERVAL
+                return
+            raise KeySourceError(f"Failed to fetch signing certificates: {e}")
+
+        max_age = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+        self._keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode()).public_key()
+            for kid, pem in certificates.items()
+        }
+        self._fetched_at = now
+        self._expires_at = now + (int(max_age.group(1)) if max_age else MIN_REFRESH_INTERVAL)
+
+
+class StaticKeySource:
+    """A fixed mapping of key ids to public keys"""
+
+    def __init__(self, keys):
+        self._keys = dict(keys)
+
+    def get_key(self, kid):
+        return self._keys.get(kid)
+
+
+class TokenVerifier:
+    """
+    Verifies RS256 ID tokens issued for `project_id`, following the checks
+    documented for Firebase ID tokens (kid, exp, iat, aud, iss, sub, auth_time).
+    """
+
+    def __init__(self, project_id, key_source, issuer=None, cache_size=10000, leeway=0):
+        self.project_id = project_id
+        self.key_source = key_source
+        self.issuer = issuer or f'https://securetoken.google.com/{project_id}'
+        self.cache_size = cache_size
+        self.leeway = leeway
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def verify(self, token):
+        """Return the token's claims, raises jwt.InvalidTokenError if it is not valid"""
+        token_hash = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+
+        with self._cache_lock:
+            cached = self._cache.get(token_hash)
+            if cached is not None:
+                claims, expires_at = cached
+                if now < expires_at:
+                    self._cache.move_to_end(token_hash)
+                    return dict(claims)
+                del self._cache[token_hash]
+
+        claims = self._decode(token)
+
+        with self._cache_lock:
+            self._cache[token_hash] = (claims, claims['exp'] + self.leeway)
+            self._cache.move_to_end(token_hash)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(claims)
+
+    def _decode(self, token):
+        header = jwt.get_unverified_header(token)
+        if header.get('alg') != 'RS256':
+            raise jwt.InvalidAlgorithmError('ID token must be signed with RS256')
+        kid = header.get('kid')
+        if not kid:
+            raise jwt.InvalidTokenError('ID token has no "kid" header')
+        key = self.key_source.get_key(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f'ID token was signed with an unknown key "{kid}"')
+
+        claims = jwt.decode(
+            token, key,
+            algorithms=['RS256'],
+            audience=self.project_id,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={'require': ['exp', 'iat', 'aud', 'iss', 'sub']},
+        )
+
+        subject = claims['sub']
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise jwt.InvalidTokenError('ID token has an invalid "sub" claim')
+        if claims['iat'] > time.time() + self.leeway:
+            raise jwt.ImmatureSignatureError('ID token was issued in the future')
+        if claims.get('auth_time', 0) > time.time() + self.leeway:
+            raise jwt.ImmatureSignatureError('ID token has an "auth_time" in the future')
+
+        # Same shape as firebase_admin.auth.verify_id_token
+        claims['uid'] = subject
+        return claims
+
+
+def init_token_verifier(app, project_id):
+    """Install the Firebase token verifier used by authenticate_user"""
+    if not project_id:
+        app.extensions['token_verifier'] = None
+        return None
+    verifier = TokenVerifier(project_id, GoogleCertKeySource(),
+                             cache_size=app.config.get('TOKEN_CACHE_SIZE', 10000))
+    app.extensions['token_verifier'] = verifier
+    return verifier
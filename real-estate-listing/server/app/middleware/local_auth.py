@@ -0,0 +1,88 @@
+"""
+Offline stand-in for Firebase Authentication.
+
+With AUTH_PROVIDER=local the app accepts ID tokens signed by a local RSA
+key instead of Google's. Tokens carry the same claims as Firebase ID tokens
+(uid/sub, email, name), so authenticate_user and require_admin treat them
+exactly like real ones. Meant for load tests and benchmarks on machines
+without access to a Firebase project; never enable it in production.
+
+Mint tokens with `python mint_token.py`.
+"""
+import os
+import time
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from app.middleware.firebase_tokens import StaticKeySource, TokenVerifier
+
+LOCAL_KEY_ID = 'local-auth'
+LOCAL_ISSUER = 'https://local-auth.invalid/'
+
+
+def load_or_create_private_key(path):
+    """Load the RSA signing key at `path`, generating it on first use"""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return serialization.load_pem_private_key(f.read(), password=None)
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    # Create the file readable by its owner only
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pem)
+    print(f"[AUTH] Generated local auth signing key at {path}")
+    return private_key
+
+
+class LocalIdentityProvider:
+    """Mints and verifies Firebase-shaped ID tokens with a local RSA key"""
+
+    def __init__(self, private_key, project_id, cache_size=10000):
+        self.private_key = private_key
+        self.project_id = project_id
+        self.verifier = TokenVerifier(
+            project_id,
+            StaticKeySource({LOCAL_KEY_ID: private_key.public_key()}),
+            issuer=LOCAL_ISSUER,
+            cache_size=cache_size,
+        )
+
+    def mint_token(self, uid, email=None, name=None, expires_in=3600):
+        now = int(time.time())
+        claims = {
+            'iss': LOCAL_ISSUER,
+            'aud': self.project_id,
+            'sub': uid,
+            'user_id': uid,
+            'iat': now,
+            'auth_time': now,
+            'exp': now + expires_in,
+        }
+        if email:
+            claims['email'] = email
+            claims['email_verified'] = True
+        if name:
+            claims['name'] = name
+        return jwt.encode(claims, self.private_key, algorithm='RS256', headers={'kid': LOCAL_KEY_ID})
+
+
+def create_local_identity_provider(config):
+    """Build the provider from LOCAL_AUTH_KEY_FILE and LOCAL_AUTH_PROJECT_ID"""
+    private_key = load_or_create_private_key(config['LOCAL_AUTH_KEY_FILE'])
+    return LocalIdentityProvider(private_key, config['LOCAL_AUTH_PROJECT_ID'],
+                                 cache_size=config.get('TOKEN_CACHE_SIZE', 10000))
+
+
+def init_local_auth(app):
+    """Make authenticate_user accept tokens minted by the local provider"""
+    provider = create_local_identity_provider(app.config)
+    app.extensions['local_identity_provider'] = provider
+    app.extensions['token_verifier'] = provider.verifier
+    print("⚠️  Warning: AUTH_PROVIDER=local, accepting locally signed test tokens instead of Firebase ID tokens")
+    return provider
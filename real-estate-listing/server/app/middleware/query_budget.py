@@ -0,0 +1,43 @@
+from flask import g, jsonify, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+        g.query_statements.append(statement)
+
+
+def init_query_budget(app):
+    """
+    Fail requests that run more than MAX_QUERIES_PER_REQUEST SQL statements.
+    Meant for development and tests, to catch N+1 query regressions.
+    Disabled when MAX_QUERIES_PER_REQUEST is 0 or unset.
+    """
+    budget = app.config.get('MAX_QUERIES_PER_REQUEST')
+    if not budget:
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+    @app.before_request
+    def start_query_count():
+        g.query_count = 0
+        g.query_statements = []
+
+    @app.after_request
+    def check_query_count(response):
+        count = g.get('query_count', 0)
+        if count > budget:
+            print(f"[QUERIES] {count} queries exceed the budget of {budget}:")
+            for statement in g.query_statements:
+                print(f"  - {' '.join(statement.split())[:200]}")
+            response = jsonify({
+                "message": f"Request ran {count} SQL queries, the budget is {budget}",
+                "error": "query_budget_exceeded"
+            })
+            response.status_code = 500
+        response.headers['X-Query-Count'] = str(count)
+        return response
@@ -3,6 +3,13 @@ from app.extensions import db
 
 # Blog model
 class Blog(db.Model):
+    __table_args__ = (
+        # Published blogs, latest first (public listing)
+        db.Index('ix_blog_published_active_date_published', 'published', 'active', 'date_published'),
+        # Blogs newest first (cursor pages and admin listing)
+        db.Index('ix_blog_active_published_date_created', 'active', 'published', 'date_created', 'id'),
+    )
+
     id = db.Column(db.String, primary_key=True)
     title = db.Column(db.String, index=False, unique=False)
     content = db.Column(db.Text, index=False, unique=False)  # Full blog content (can be HTML or markdown)
@@ -17,6 +24,8 @@ class Blog(db.Model):
     views = db.Column(db.Integer, index=False, default=0, unique=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
     date_published = db.Column(db.DateTime, nullable=True)
+    # Last modification, the version behind ETag/Last-Modified (see app/services/conditional.py)
+    date_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<Blog "{self.title}">'
@@ -37,5 +46,6 @@ class Blog(db.Model):
             "views": self.views,
             "date_created": self.date_created.isoformat() if self.date_created else None,
             "date_published": self.date_published.isoformat() if self.date_published else None,
+            "date_updated": self.date_updated.isoformat() if self.date_updated else None,
         }
 
@@ -0,0 +1,28 @@
+from datetime import datetime
+from app.extensions import db
+
+# Sequenced log of listing changes, served by the change feed (see app/services/change_feed.py)
+class ChangeLog(db.Model):
+    # Never reuse sequence numbers
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    # Sequence number, increasing with every change
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String, index=False, unique=False)  # property, realtor, blog or vendor
+    entity_id = db.Column(db.String, index=False, unique=False)
+    op = db.Column(db.String, index=False, unique=False)  # create, update, delist, relist or delete
+    fields = db.Column(db.String, index=False, unique=False, nullable=True)  # Comma-separated, for updates
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ChangeLog {self.seq} {self.op} {self.entity} "{self.entity_id}">'
+
+    def serialize(self):
+        return {
+            "seq": self.seq,
+            "entity": self.entity,
+            "id": self.entity_id,
+            "op": self.op,
+            "fields": self.fields.split(',') if self.fields else None,
+            "date_created": self.date_created.isoformat() if self.date_created else None
+        }
@@ -0,0 +1,40 @@
+from datetime import datetime
+from app.extensions import db
+import json
+
+# Transactional emails waiting to be delivered by the mailer (app/services/mailer.py)
+class EmailOutbox(db.Model):
+    __table_args__ = (
+        # The mailer polls for pending emails that are due
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.String, primary_key=True)
+    kind = db.Column(db.String, index=False, unique=False)  # e.g. "purchase_request", "inquiry"
+    recipient = db.Column(db.String, index=False, unique=False)
+    payload = db.Column(db.Text, index=False, unique=False)  # JSON body for the mail API
+    status = db.Column(db.String, default='pending', index=False, unique=False)  # pending, sent, failed
+    attempts = db.Column(db.Integer, default=0, index=False, unique=False)
+    # When the email may next be picked up; also the lease of a worker that claimed it
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claim_token = db.Column(db.String, index=False, unique=False, nullable=True)
+    last_error = db.Column(db.Text, index=False, unique=False, nullable=True)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    date_sent = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<EmailOutbox "{self.id}" {self.status}>'
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "recipient": self.recipient,
+            "payload": json.loads(self.payload) if self.payload else None,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "last_error": self.last_error,
+            "date_created": self.date_created.isoformat() if self.date_created else None,
+            "date_sent": self.date_sent.isoformat() if self.date_sent else None
+        }
@@ -4,6 +4,11 @@ from app.extensions import db
 
 
 class Favorite(db.Model):
+    __table_args__ = (
+        # Favorite lookups for a user and property pair
+        db.Index('ix_favorite_user_property', 'user_id', 'property_id'),
+    )
+
     id = db.Column(db.String, primary_key=True)
     property_id = db.Column(db.String, db.ForeignKey('property.id', ondelete='CASCADE'),
                             index=True, unique=False)
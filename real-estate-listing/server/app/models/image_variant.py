@@ -0,0 +1,33 @@
+from datetime import datetime
+from app.extensions import db
+import json
+
+# Resized copies of an uploaded image (see app/services/image_variants.py)
+class ImageVariant(db.Model):
+    url = db.Column(db.String, primary_key=True)  # URL of the original image
+    backend = db.Column(db.String, index=False, unique=False)  # cloudinary, firebase or local
+    width = db.Column(db.Integer, index=False, unique=False, nullable=True)
+    height = db.Column(db.Integer, index=False, unique=False, nullable=True)
+    # {"webp": {"320": url, ...}, "jpeg": {"320": url, ...}}
+    variants = db.Column(db.Text, index=False, unique=False)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ImageVariant "{self.url}">'
+
+    def serialize(self):
+        return manifest(self.width, self.height, json.loads(self.variants) if self.variants else {})
+
+
+def manifest(width, height, variants):
+    """The variants of one image, with ready-made srcset strings per format"""
+    return {
+        "width": width,
+        "height": height,
+        "variants": variants,
+        "srcset": {
+            image_format: ', '.join(f"{url} {size}w" for size, url in
+                                    sorted(urls.items(), key=lambda item: int(item[0])))
+            for image_format, urls in variants.items()
+        }
+    }
@@ -2,8 +2,10 @@ from datetime import datetime
 from app.extensions import db
 import pickle
 import json
+import re
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy import TypeDecorator, Text
+from sqlalchemy.orm import validates
 
 # SQLite-compatible JSON array type
 class JSONArray(TypeDecorator):
@@ -20,10 +22,59 @@ class JSONArray(TypeDecorator):
             return json.loads(value)
         return []
 
+# Area units accepted in `Property.size`, with their size in acres
+AREA_UNITS = [
+    ('acres', 1.0, ('acres', 'acre', 'ac')),
+    ('sqft', 1 / 43560.0, ('square feet', 'square foot', 'sq ft', 'sq. ft.', 'sq.ft.', 'sqft', 'sf', 'ft2')),
+    ('sqm', 1 / 4046.8564224, ('square meters', 'square metres', 'sq m', 'sqm', 'm2')),
+    ('hectares', 2.4710538147, ('hectares', 'hectare', 'ha')),
+]
+
+
+def parse_acreage(size):
+    """
+    Parse a free-text size such as "7.93 acres" or "12,000 sq ft".
+    Returns (acreage, unit); sizes without a unit are taken to be acres,
+    unparseable sizes give (None, None).
+    """
+    if size is None:
+        return None, None
+    if isinstance(size, (int, float)):
+        return float(size), 'acres'
+
+    text = size.strip().lower()
+    match = re.match(r'^(\d+(?:\.\d+)?|\.\d+)\s*(.*)$', text.replace(',', ''))
+    if not match:
+        return None, None
+
+    number, unit_text = float(match.group(1)), match.group(2).strip()
+    if not unit_text:
+        return number, 'acres'
+    for unit, acres, spellings in AREA_UNITS:
+        if unit_text in spellings:
+            return number * acres, unit
+    return None, None
+
+
 # Property model
 
 
 class Property(db.Model):
+    __table_args__ = (
+        # Active listings newest first (browse pages and their cursors)
+        db.Index('ix_property_active_date_created', 'active', 'date_created', 'id'),
+        # All listings newest first (admin listing, recently added)
+        db.Index('ix_property_date_created', 'date_created', 'id'),
+        # Listings by last modification (catalogue export, incremental pulls)
+        db.Index('ix_property_date_updated', 'date_updated', 'id'),
+        db.Index('ix_property_active_date_updated', 'active', 'date_updated', 'id'),
+        # A realtor's listings newest first (seller dashboard, realtor page)
+        db.Index('ix_property_owner_date_created', 'owner_id', 'date_created', 'id'),
+        # Active listings by area and by price (range filters and sorting)
+        db.Index('ix_property_active_acreage', 'active', 'acreage', 'id'),
+        db.Index('ix_property_active_price', 'active', 'price', 'id'),
+    )
+
     id = db.Column(db.String, primary_key=True)
     owner_id = db.Column(db.String, db.ForeignKey('realtor.id'),
                          index=True, unique=False)
@@ -37,10 +88,24 @@ class Property(db.Model):
     property_type = db.Column(db.String, index=False, unique=False)
     active = db.Column(db.Boolean, index=False, default=True, unique=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last modification, the version behind ETag/Last-Modified (see app/services/conditional.py)
+    date_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     # Use JSONArray for SQLite compatibility, ARRAY for PostgreSQL
     property_images = db.Column(
         JSONArray(), default=[], index=False, unique=False)
     size = db.Column(db.String, index=False, unique=False)
+    # Numeric area parsed from `size`, normalized to acres (see parse_acreage)
+    acreage = db.Column(db.Float, index=False, unique=False, nullable=True)
+    size_unit = db.Column(db.String, index=False, unique=False, nullable=True)
+    # Detail page views, flushed in batches (see app/services/view_counters.py)
+    views = db.Column(db.Integer, index=False, default=0, unique=False)
+    # Listing entry encoded as JSON, rebuilt on write (see app/services/property_documents.py)
+    document = db.deferred(db.Column(db.Text, index=False, unique=False, nullable=True))
+
+    @validates('size')
+    def validate_size(self, key, size):
+        self.acreage, self.size_unit = parse_acreage(size)
+        return size
 
     def get_property_images(self):
         if isinstance(self.property_images, str):
@@ -65,6 +130,10 @@ class Property(db.Model):
             "property_type": self.property_type,
             "active": self.active,
             "date_created": self.date_created,
+            "date_updated": self.date_updated,
             "property_images": self.property_images,
-            "size": self.size
+            "size": self.size,
+            "acreage": self.acreage,
+            "size_unit": self.size_unit,
+            "views": self.views or 0
         }
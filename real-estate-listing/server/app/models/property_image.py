@@ -0,0 +1,10 @@
+from app.extensions import db
+
+# The URLs of Property.property_images, one row each, to find the listings
+# showing an image (see app/services/property_documents.py)
+class PropertyImage(db.Model):
+    property_id = db.Column(db.String, db.ForeignKey('property.id', ondelete='CASCADE'), primary_key=True)
+    url = db.Column(db.String, primary_key=True, index=True)
+
+    def __repr__(self):
+        return f'<PropertyImage {self.property_id} "{self.url}">'
@@ -17,6 +17,8 @@ class Realtor(db.Model):
     contact = db.Column(db.String, index=False, unique=False, nullable=True)
     active = db.Column(db.Boolean, index=False, default=True, unique=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last modification, the version behind ETag/Last-Modified (see app/services/conditional.py)
+    date_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     properties = db.relationship(
         'Property', backref='realtor', lazy='dynamic', cascade='all, delete, delete-orphan')
     followers = db.relationship(
@@ -33,6 +35,7 @@ class Realtor(db.Model):
             "description": self.description,
             "profile_picture": self.profile_picture,
             "date_created": self.date_created,
+            "date_updated": self.date_updated,
             "company_mail": self.company_mail,
             "active": self.active,
             "website_url": self.website_url,
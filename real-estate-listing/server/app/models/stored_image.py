@@ -0,0 +1,29 @@
+from datetime import datetime
+from app.extensions import db
+
+# Content-addressed image in the local uploads directory (see app/services/image_store.py)
+class StoredImage(db.Model):
+    sha256 = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String, index=False, unique=True)  # "<sha256><extension>"
+    content_type = db.Column(db.String, index=False, unique=False, nullable=True)
+    size = db.Column(db.Integer, index=False, unique=False)
+    width = db.Column(db.Integer, index=False, unique=False, nullable=True)
+    height = db.Column(db.Integer, index=False, unique=False, nullable=True)
+    # Listings using this content when gc_uploads.py last counted; unused files are removed
+    refcount = db.Column(db.Integer, default=0, index=False, unique=False)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StoredImage "{self.filename}" x{self.refcount}>'
+
+    def serialize(self):
+        return {
+            "sha256": self.sha256,
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "size": self.size,
+            "width": self.width,
+            "height": self.height,
+            "refcount": self.refcount,
+            "date_created": self.date_created.isoformat() if self.date_created else None
+        }
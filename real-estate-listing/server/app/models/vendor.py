@@ -3,6 +3,12 @@ from app.extensions import db
 
 # Vendor model
 class Vendor(db.Model):
+    __table_args__ = (
+        # Active vendors newest first, overall and per category
+        db.Index('ix_vendor_active_date_created', 'active', 'date_created'),
+        db.Index('ix_vendor_category_active_date_created', 'category', 'active', 'date_created'),
+    )
+
     id = db.Column(db.String, primary_key=True)
     vendor_id = db.Column(db.String, index=True, unique=True)  # Firebase user ID
     company_name = db.Column(db.String, index=False, unique=False)
@@ -17,6 +23,8 @@ class Vendor(db.Model):
     verified = db.Column(db.Boolean, index=False, default=False, unique=False)
     active = db.Column(db.Boolean, index=False, default=True, unique=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last modification, the version behind ETag/Last-Modified (see app/services/conditional.py)
+    date_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<Vendor "{self.company_name}">'
@@ -37,5 +45,6 @@ class Vendor(db.Model):
             "verified": self.verified,
             "active": self.active,
             "date_created": self.date_created.isoformat() if self.date_created else None,
+            "date_updated": self.date_updated.isoformat() if self.date_updated else None,
         }
 
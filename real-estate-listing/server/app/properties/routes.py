@@ -2,68 +2,122 @@ from app.properties import bp
 from app.models.property import Property
 from app.models.realtor import Realtor
 from app.models.purchase import Purchase
-from flask import jsonify, request
+from flask import Response, current_app, jsonify, redirect, request, stream_with_context
 from app.extensions import db
+from sqlalchemy.orm import joinedload
 import uuid
-import os
-import requests
 from app.middleware.authenticate import authenticate_user
 from app.middleware.admin import require_admin
-from sqlalchemy import func
+from app.services.search_index import full_text_property_ids, tokenize
+from app.services.pagination import cursor_requested, paginate_by_cursor, paginate_id_list, with_next_cursor
+from app.services.facets import get_facet_index
+from app.services.mailer import enqueue_email
+from app.services.image_variants import attach_image_variants
+from app.services.view_counters import count_view
+from app.services.response_cache import cached, cached_response, request_key
+from app.services.serialization import listing_fields, project
+from app.services.property_documents import listing_items, listing_response
+from app.services.listing_queries import (AREA_SORTS, NEWEST_FIRST, active_properties, active_properties_by_id,
+                                          admin_properties, area_order, realtor_properties, recently_added)
+from app.services.property_export import EXPORT_FORMATS, export_lines, export_rows, parse_updated_since
+from app.services.property_import import IMPORT_FORMATS, PropertyImporter, read_rows
+from app.services.moderation import ACTIONS, PROPERTY_FILTERS, moderate, selection_condition
+from app.services.conditional import (not_modified, page_etag, pagination_etag, parse_version, resource_etag,
+                                      row_version, unchanged, with_validators)
+
+def _number_arg(name):
+    """Numeric query argument, None when missing, empty or 0 (no filter)"""
+    value = request.args.get(name)
+    if not value or value == "0":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
 
 
 # Get all properties
 @bp.route('/property/all_properties')
+@cached_response('properties', 'realtors', 'image_variants')
 def get_all_properties():
     page_number = request.args.get('page', 1, type=int)
-    # Query the table with all properties
-    pagination_properties = Property.query.filter(
-        Property.active == True).paginate(page=page_number, per_page=20)
+    fields = listing_fields(extra=('image_variants',))
+    # Active properties, in the optional area range (in acres) served by the acreage index
+    query = active_properties(_number_arg('min_area'), _number_arg('max_area'))
+    # Only the requested columns, as rows
+    query = project(query, fields)
+
+    if cursor_requested():
+        pagination_properties = paginate_by_cursor(query, Property, per_page=20)
+    else:
+        sort = request.args.get('sort')
+        if sort in AREA_SORTS:
+            query = query.order_by(*area_order(sort))
+        else:
+            query = query.order_by(*NEWEST_FIRST)
+        pagination_properties = query.paginate(page=page_number, per_page=20)
 
     # If properties is None return a empty list
     if pagination_properties == None:
         return jsonify({"properties": [], "pages": 0}), 200
-    # Extract pagination items and number of pages
-    properties = pagination_properties.items
+    # The client has this page already: nothing to serialize
+    etag = pagination_etag(pagination_properties)
+    if unchanged(etag):
+        return not_modified(etag)
+    # Extract pagination items (stored documents, with resized versions of the images for srcset)
+    list_items_with_images = listing_items(pagination_properties.items, fields)
     number_of_pages = pagination_properties.pages
-    # init an empty list
-    list_items_with_images = []
-
-    # Iterate the properties while appending the list with images of the property
-    for property_item in properties:
-        listed_property = property_item.serialize()
-        listed_property["property_images"] = property_item.get_property_images()
-        list_items_with_images.append(listed_property)
 
     response_data = {
-        "properties": list_items_with_images,
         "pages": number_of_pages
     }
-    return jsonify(response_data)
+    return with_validators(listing_response(with_next_cursor(response_data, pagination_properties),
+                                            "properties", list_items_with_images), etag)
 
 
 # Get a property of a specific ID
 @bp.get('/property/<property_id>')
 def get_property(property_id):
     print(f"[BACKEND] Fetching property with ID: {property_id}")
-    # Query the db for the property of `id`
-    result = Property.query.get(property_id)
+    # Cached until the property, or a realtor, is written
+    detail = cached(request_key(), (f"property:{property_id}", "realtors", "image_variants"),
+                    lambda: _property_detail(property_id))
     # Check if property is not found
-    if result == None:
+    if detail is None:
         print(f"[BACKEND] Property {property_id} not found in database")
         # Return error msg
         return jsonify({"msg": f"property of id {property_id} not found"}), 200
+
+    # Count the view (buffered, written in batches)
+    pending_views = count_view(Property, property_id)
+    # The client's copy is current: nothing to serialize
+    etag = resource_etag("property", property_id, detail["version"])
+    last_modified = parse_version(detail["version"])
+    if unchanged(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    # The cached dict is shared, so copy it
+    property_id_result = detail["property"]
+    views = (property_id_result.get("views") or 0) + pending_views
+    return with_validators(jsonify(dict(property_id_result, views=views)), etag, last_modified), 200
+
+
+def _property_detail(property_id):
+    """
+    Serialized property with its images and realtor contact, and its
+    version (see app/services/conditional.py); None if it doesn't exist
+    """
+    # Query the db for the property of `id`, together with its realtor
+    result = Property.query.options(joinedload(Property.realtor))\
+        .filter(Property.id == property_id).first()
+    if result == None:
+        return None
     # Get the images of the property and return only the url
     property_images = result.get_property_images()
     print(f"[BACKEND] Found property: {result.id}, {result.address}, {len(property_images)} images")
-    print(f"[BACKEND] Property data from DB:")
-    print(f"  - bedrooms (unitCount): {result.bedrooms}")
-    print(f"  - size (acreage): {result.size}")
-    print(f"  - property_type: {result.property_type}")
-    print(f"  - price: {result.price}")
     
     # Get realtor contact information
-    realtor = Realtor.query.get(result.owner_id)
+    realtor = result.realtor
     realtor_info = None
     if realtor:
         realtor_info = {
@@ -72,11 +126,6 @@ def get_property(property_id):
             "contact_phone": realtor.contact,
             "realtor_id": realtor.realtor_id,  # Add Firebase user ID for ownership check
         }
-        print(f"[BACKEND] Realtor contact info:")
-        print(f"  - name: {realtor.company_name}")
-        print(f"  - email: {realtor.company_mail}")
-        print(f"  - phone: {realtor.contact}")
-        print(f"  - realtor_id (Firebase): {realtor.realtor_id}")
     
     # Convert the property values to dictionary
     property_id_result = result.serialize()
@@ -85,12 +134,8 @@ def get_property(property_id):
     # Add realtor contact information
     if realtor_info:
         property_id_result["realtor"] = realtor_info
-    
-    print(f"[BACKEND] Serialized property data:")
-    print(f"  - bedrooms: {property_id_result.get('bedrooms')}")
-    print(f"  - size: {property_id_result.get('size')}")
-    print(f"  - property_type: {property_id_result.get('property_type')}")
-    return jsonify(property_id_result), 200
+    attach_image_variants([property_id_result])
+    return {"property": property_id_result, "version": row_version(result.date_updated, result.date_created)}
 
 
 # post a property to the db
@@ -258,6 +303,30 @@ def admin_activate_property(property_id):
         db.session.rollback()
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
+# Admin: Moderate properties by id list or filter (activate, deactivate or delete)
+@bp.post('/property/admin/bulk/<action>')
+@authenticate_user
+@require_admin
+def admin_bulk_properties(action):
+    if action not in ACTIONS:
+        return jsonify({"message": f"action must be one of: {', '.join(ACTIONS)}"}), 404
+    request_data = request.get_json(silent=True)
+    if not isinstance(request_data, dict):
+        return jsonify({"message": "Invalid request data"}), 400
+    try:
+        condition = selection_condition(Property, request_data, PROPERTY_FILTERS)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        result = moderate(Property, action, condition, dry_run=bool(request_data.get('dry_run')))
+        print(f"[ADMIN] Bulk {action} of {result['affected']} properties by admin {request.user.get('email')}")
+        return jsonify(result), 200
+    except Exception as e:
+        print(f"[ADMIN] Error in bulk {action} of properties: {e}")
+        db.session.rollback()
+        return jsonify({"message": f"An error occurred: {str(e)}"}), 500
+
 # Admin: Get all properties (including inactive)
 @bp.get('/property/admin/all')
 @authenticate_user
@@ -266,11 +335,13 @@ def admin_get_all_properties():
     page_number = request.args.get('page', 1, type=int)
     include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
     
-    query = Property.query
-    if not include_inactive:
-        query = query.filter(Property.active == True)
+    # Load each property's realtor in the same query
+    query = admin_properties(include_inactive)
     
-    pagination_result = query.order_by(Property.date_created.desc()).paginate(page=page_number, per_page=20)
+    if cursor_requested():
+        pagination_result = paginate_by_cursor(query, Property, per_page=20)
+    else:
+        pagination_result = query.order_by(*NEWEST_FIRST).paginate(page=page_number, per_page=20)
     
     if pagination_result is None:
         return jsonify({"properties": [], "pages": 0}), 200
@@ -280,7 +351,7 @@ def admin_get_all_properties():
         item = property_item.serialize()
         item["property_images"] = property_item.get_property_images()
         # Include realtor info
-        realtor = Realtor.query.get(property_item.owner_id)
+        realtor = property_item.realtor
         if realtor:
             item["realtor"] = {
                 "company_name": realtor.company_name,
@@ -290,10 +361,62 @@ def admin_get_all_properties():
             }
         serialized_results.append(item)
     
-    return jsonify({
+    return jsonify(with_next_cursor({
         "properties": serialized_results,
         "pages": pagination_result.pages
-    }), 200
+    }, pagination_result)), 200
+
+
+# Live updates: new and changed active properties, as Server-Sent Events.
+# Streams are served by live_server.py, not by the API's worker threads.
+@bp.get('/property/live_updates')
+def stream_live_updates():
+    url = current_app.config.get('LIVE_UPDATES_URL')
+    if not url or 'live_updates' not in current_app.extensions:
+        return jsonify({"message": "Live updates are disabled"}), 503
+    query = request.query_string.decode()
+    return redirect(f"{url}?{query}" if query else url, code=307)
+
+
+# Admin: Export the whole catalogue as NDJSON or CSV, streamed
+@bp.get('/property/admin/export')
+@authenticate_user
+@require_admin
+def admin_export_properties():
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"message": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
+    try:
+        updated_since = parse_updated_since(request.args.get('updated_since'))
+    except ValueError:
+        return jsonify({"message": "updated_since must be an ISO 8601 date"}), 400
+
+    lines = export_lines(export_format, export_rows(include_inactive, updated_since))
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(lines), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=properties.{export_format}",
+        "Cache-Control": "no-store",
+    })
+
+
+# Admin: Import properties from an NDJSON or CSV body, in batches
+@bp.post('/property/admin/import')
+@authenticate_user
+@require_admin
+def admin_import_properties():
+    import_format = request.args.get('format', 'ndjson').lower()
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({"message": f"format must be one of: {', '.join(IMPORT_FORMATS)}"}), 400
+    batch_size = request.args.get('batch_size', current_app.config.get('IMPORT_BATCH_SIZE', 500), type=int)
+    if not batch_size or batch_size < 1:
+        return jsonify({"message": "batch_size must be a positive integer"}), 400
+
+    importer = PropertyImporter(batch_size=min(batch_size, 5000),
+                                default_realtor_id=request.args.get('realtor_id'))
+    report = importer.run(read_rows(request.stream, import_format))
+    print(f"[IMPORT] Imported {report.imported} properties, {report.failed} rows failed")
+    return jsonify(report.serialize()), 200 if report.imported or not report.failed else 400
 
 
 # Update property
@@ -483,119 +606,129 @@ def get_my_properties():
     include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
     
     # Get all properties for this realtor
-    query = Property.query.filter_by(owner_id=realtor.id)
-    if not include_inactive:
-        query = query.filter(Property.active == True)
+    fields = listing_fields()
+    query = project(realtor_properties(realtor.id, include_inactive), fields)
     
-    pagination_result = query.order_by(Property.date_created.desc()).paginate(page=page_number, per_page=20)
+    if cursor_requested():
+        pagination_result = paginate_by_cursor(query, Property, per_page=20)
+    else:
+        pagination_result = query.order_by(*NEWEST_FIRST).paginate(page=page_number, per_page=20)
     
     if pagination_result is None:
         return jsonify({"properties": [], "pages": 0}), 200
     
-    serialized_results = []
-    for property_item in pagination_result.items:
-        item = property_item.serialize()
-        item["property_images"] = property_item.get_property_images()
-        serialized_results.append(item)
+    serialized_results = listing_items(pagination_result.items, fields)
     
-    return jsonify({
-        "properties": serialized_results,
+    return listing_response(with_next_cursor({
         "pages": pagination_result.pages
-    }), 200
+    }, pagination_result), "properties", serialized_results), 200
+
+
+def _search_filters():
+    """Facet index filters from the search query arguments"""
+    return {
+        "category": request.args.get('category') or None,
+        "property_type": request.args.get('property_type') or None,
+        "min_price": _number_arg('min_price'),
+        "max_price": _number_arg('max_price'),
+        "max_bedrooms": _number_arg('bedrooms'),
+        "max_bathrooms": _number_arg('bathrooms'),
+        "min_acreage": _number_arg('min_area'),
+        "max_acreage": _number_arg('max_area'),
+    }
+
+
+def _matching_property_ids(index, filters):
+    """Ids of active properties matching the search term and filters, best match first"""
+    search_text = request.args.get('search_term')
+    matches = index.filter(**filters)
+    if tokenize(search_text):
+        property_ids = index.restrict(full_text_property_ids(search_text), matches)
+    else:
+        property_ids = index.ids(matches)
+
+    sort = request.args.get('sort')
+    if sort in AREA_SORTS:
+        property_ids = index.order_by(property_ids, 'acreage', descending=AREA_SORTS[sort])
+    return property_ids
+
+
+def _load_properties(property_ids, fields):
+    """Load the active rows of `fields` by property id, keeping the order of `property_ids`"""
+    if not property_ids:
+        return []
+    # The facet index of this worker can lag behind a delist made by another one
+    by_id = {row.id: row for row in project(active_properties_by_id(property_ids), fields)}
+    return [by_id[property_id] for property_id in property_ids if property_id in by_id]
 
 
 # Search properties
 @bp.get('/property/search_properties')
+@cached_response('properties', 'realtors', 'image_variants')
 def search_properties():
-    # Extract all arguments from request
-    search_text = request.args.get('search_term')
-    min_price = request.args.get('min_price')
-    max_price = request.args.get('max_price')
-    bedrooms = request.args.get('bedrooms')
-    bathrooms = request.args.get('bathrooms')
-    category = request.args.get('category')
-    property_type = request.args.get('property_type')
-    max_area = request.args.get("max_area")
     page_number = request.args.get('page', 1, type=int)
+    fields = listing_fields(extra=('image_variants',))
 
-    # print(request.args, len(category))
-
-    # define the base query with the search conditions
-    query = Property.query.filter(
-        db.or_(
-            db.or_(
-                func.lower(Property.location).like(
-                    '%{}%'.format(search_text.lower())),
-                func.lower(Property.category).like(
-                    '%{}%'.format(search_text.lower())),
-                func.lower(Property.description).like(
-                    '%{}%'.format(search_text.lower())),
-                func.lower(Property.address).like(
-                    '%{}%'.format(search_text.lower()))
-            )
-        )
-    )
+    # Filter with the in-memory facet index, rank with the full-text index
+    index = get_facet_index()
+    property_ids = _matching_property_ids(index, _search_filters())
 
-    # add additional filters based on the search criteria
-    if len(category):
-        query = query.filter(Property.category == category.lower())
-        print("category")
-    if len(property_type):
-        query = query.filter(Property.property_type == property_type)
-        print("type")
-    if min_price and not (min_price == "" or min_price == "0"):
-        query = query.filter(Property.price >= int(min_price))
-        print("min-price")
-    if max_price and not (max_price == "" or max_price == "0"):
-        query = query.filter(Property.price <= int(max_price))
-        print("max-price")
-    if bathrooms and not (bathrooms == "" or bathrooms == "0"):
-        query = query.filter(Property.bathrooms <= int(bathrooms))
-        print("bath")
-    if bedrooms and not (bedrooms == "" or bedrooms == "0"):
-        query = query.filter(Property.bedrooms <= int(bedrooms))
-        print("beds")
-    if max_area and not (max_area == "" or max_area == "0"):
-        query = query.filter(Property.size >= int(max_area))
-        print("size")
-
-    # query all searches
-    results = query.paginate(page=page_number, per_page=20)
+    # cursor pages are ordered by date instead of relevance
+    results = paginate_id_list(property_ids, index.sort_key, lambda ids: _load_properties(ids, fields),
+                               per_page=20, page_number=page_number)
+    etag = pagination_etag(results)
+    if unchanged(etag):
+        return not_modified(etag)
 
-    if results is None:
-        return jsonify({"results": [], "pages": 0}), 200
+    list_items_with_images = listing_items(results.items, fields)
 
-    list_items_with_images = []
-    # Iterate the properties while appending the list with images of the property
-    for property_item in results.items:
-        listed_property = property_item.serialize()
-        listed_property["property_images"] = property_item.get_property_images()
-        list_items_with_images.append(listed_property)
+    return with_validators(listing_response(with_next_cursor({"pages": results.pages}, results),
+                                            "results", list_items_with_images), etag)
 
-    return jsonify({"results": list_items_with_images, "pages": results.pages})
+
+# Facet counts for the search filters
+@bp.get('/property/facets')
+def get_property_facets():
+    index = get_facet_index()
+    filters = _search_filters()
+
+    # Restrict the counts to the properties matching the search term
+    search_text = request.args.get('search_term')
+    within = None
+    if tokenize(search_text):
+        within = index.bitmap_of(full_text_property_ids(search_text))
+
+    return jsonify({
+        "total": index.count(index.filter(**filters), within),
+        "facets": index.facet_counts(within=within, **filters)
+    }), 200
 
 
 # Recently added properties
 @bp.get('/property/recently_added')
+@cached_response('properties', 'realtors', 'image_variants')
 def search_recently_added():
-    results = Property.query.order_by(Property.date_created.desc()).limit(4)
+    fields = listing_fields(extra=('image_variants',))
+    results = recently_added(fields).all()
 
     if results is None:
         return jsonify([]), 200
+    etag = page_etag(results)
+    if unchanged(etag):
+        return not_modified(etag)
 
-    recent_properties = []
-    for item in results:
-        recent_properties.append(item.serialize())
+    recent_properties = listing_items(results, fields)
 
-    return jsonify(recent_properties)
+    return with_validators(listing_response(None, None, recent_properties), etag)
 
 
 # Purchase/Book a property
 @bp.post('/property/purchase/<property_id>')
 @authenticate_user
 def purchase_property(property_id):
-    # Verify property exists
-    property = Property.query.get(property_id)
+    # Verify property exists (and load its owner in the same query)
+    property = Property.query.options(joinedload(Property.realtor))\
+        .filter(Property.id == property_id).first()
     if property is None:
         return jsonify({"message": "Property not found"}), 404
     
@@ -607,7 +740,7 @@ def purchase_property(property_id):
         return jsonify({"message": "User ID not found in token"}), 401
     
     # Get realtor (property owner) information
-    realtor = Realtor.query.get(property.owner_id)
+    realtor = property.realtor
     if not realtor:
         return jsonify({"message": "Property owner not found"}), 404
     
@@ -629,26 +762,19 @@ def purchase_property(property_id):
     
     try:
         db.session.add(new_purchase)
+        # Queue the email to the realtor in the same transaction as the purchase
+        queue_purchase_email(
+            buyer_name=request_data.get('name', ''),
+            buyer_email=request_data.get('email', ''),
+            buyer_phone=request_data.get('phone', ''),
+            buyer_message=request_data.get('message', ''),
+            realtor_email=realtor_email,
+            property_title=property.address or property.location,
+            property_price=property.price,
+            property_location=property.location
+        )
         db.session.commit()
-        
-        # Send email to realtor
-        try:
-            send_purchase_email(
-                buyer_name=request_data.get('name', ''),
-                buyer_email=request_data.get('email', ''),
-                buyer_phone=request_data.get('phone', ''),
-                buyer_message=request_data.get('message', ''),
-                realtor_email=realtor_email,
-                property_title=property.address or property.location,
-                property_price=property.price,
-                property_location=property.location
-            )
-            print(f"[PURCHASE] Email sent to realtor: {realtor_email}")
-        except Exception as email_error:
-            print(f"[PURCHASE] Failed to send email: {email_error}")
-            # Don't fail the purchase if email fails
-            import traceback
-            traceback.print_exc()
+        print(f"[PURCHASE] Email to realtor queued: {realtor_email}")
         
         return jsonify({
             "message": "Purchase request submitted successfully",
@@ -662,13 +788,8 @@ def purchase_property(property_id):
         return jsonify({"message": "An error occurred"}), 500
 
 
-def send_purchase_email(buyer_name, buyer_email, buyer_phone, buyer_message, realtor_email, property_title, property_price, property_location):
-    """Send purchase request email to realtor using Brevo API"""
-    
-    api_key = os.environ.get("MAIL_KEY")
-    if not api_key:
-        print("[EMAIL] MAIL_KEY not configured, skipping email")
-        return
+def queue_purchase_email(buyer_name, buyer_email, buyer_phone, buyer_message, realtor_email, property_title, property_price, property_location):
+    """Add the purchase request email to the realtor to the outbox (sent after commit)"""
     
     subject = f"New Purchase Request: {property_title}"
     
@@ -680,16 +801,16 @@ def send_purchase_email(buyer_name, buyer_email, buyer_phone, buyer_message, rea
     <html>
     <head>
         <style>
-            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-            .container { max-width: 600px; margin: 0 auto; padding: 20px; }
-            .header { background-color: #2563eb; color: white; padding: 20px; border-radius: 5px 5px 0 0; }
-            .content { background-color: #f9fafb; padding: 20px; border: 1px solid #e5e7eb; }
-            .property-info { background-color: white; padding: 15px; margin: 15px 0; border-radius: 5px; border-left: 4px solid #2563eb; }
-            .buyer-info { background-color: white; padding: 15px; margin: 15px 0; border-radius: 5px; }
-            .label { font-weight: bold; color: #4b5563; }
-            .value { color: #111827; margin-bottom: 10px; }
-            .message-box { background-color: #eff6ff; padding: 15px; border-radius: 5px; margin-top: 15px; }
-            .footer { text-align: center; padding: 20px; color: #6b7280; font-size: 12px; }
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background-color: #2563eb; color: white; padding: 20px; border-radius: 5px 5px 0 0; }}
+            .content {{ background-color: #f9fafb; padding: 20px; border: 1px solid #e5e7eb; }}
+            .property-info {{ background-color: white; padding: 15px; margin: 15px 0; border-radius: 5px; border-left: 4px solid #2563eb; }}
+            .buyer-info {{ background-color: white; padding: 15px; margin: 15px 0; border-radius: 5px; }}
+            .label {{ font-weight: bold; color: #4b5563; }}
+            .value {{ color: #111827; margin-bottom: 10px; }}
+            .message-box {{ background-color: #eff6ff; padding: 15px; border-radius: 5px; margin-top: 15px; }}
+            .footer {{ text-align: center; padding: 20px; color: #6b7280; font-size: 12px; }}
         </style>
     </head>
     <body>
@@ -751,24 +872,7 @@ def send_purchase_email(buyer_name, buyer_email, buyer_phone, buyer_message, rea
         message_section=message_section
     )
     
-    endpoint = 'https://api.brevo.com/v3/smtp/email'
-    headers = {
-        'accept': 'application/json',
-        'api-key': str(api_key),
-        'content-type': 'application/json'
-    }
-    payload = {
-        'sender': {'email': "254realtors.homes@gmail.com", 'name': 'Real Estate Platform'},
-        'to': [{"email": realtor_email}],
-        'replyTo': {'email': buyer_email, 'name': buyer_name},
-        'subject': subject,
-        'htmlContent': html_content
-    }
-    
-    response = requests.post(endpoint, headers=headers, json=payload)
-    
-    if not response.ok:
-        print(f"[EMAIL] Brevo API error: {response.status_code} - {response.text}")
-        raise Exception(f"Email sending failed: {response.status_code}")
-    
-    print(f"[EMAIL] Purchase request email sent successfully to {realtor_email}")
+    enqueue_email(
+        'purchase_request', realtor_email, subject, html_content,
+        reply_to={'email': buyer_email, 'name': buyer_name}
+    )
@@ -5,16 +5,27 @@ from flask import jsonify, request
 from app.extensions import db
 import uuid
 from app.middleware.authenticate import authenticate_user
+from app.services.pagination import cursor_requested, paginate_by_cursor, with_next_cursor
+from app.services.response_cache import cached_response
+from app.services.serialization import listing_fields, project
+from app.services.property_documents import listing_items, listing_response
+from app.services.listing_queries import NEWEST_FIRST, realtor_properties
+from app.services.conditional import (not_modified, page_etag, pagination_etag, resource_validators, unchanged,
+                                      with_validators)
 
 # Gets all realtors
 
 
 @bp.route('/realtors')
+@cached_response('realtors')
 def get_realtors():
     realtors = Realtor.query.all()
     if realtors is None:
         return jsonify([]), 200
-    return jsonify([realtor.serialize() for realtor in realtors]), 200
+    etag = page_etag(realtors)
+    if unchanged(etag):
+        return not_modified(etag)
+    return with_validators(jsonify([realtor.serialize() for realtor in realtors]), etag), 200
 
 
 # Registers a new realtor
@@ -70,11 +81,18 @@ def update_realtor_details(realtor_id):
 
 @bp.get('/realtor/get_realtor/<id>')
 def get_realtor(id):
+    # Answer conditional requests before loading the realtor
+    validators = resource_validators("realtor", Realtor, id)
+    if validators is None:
+        return f"User of ID {id} not found"
+    if unchanged(*validators):
+        return not_modified(*validators)
+
     result = Realtor.query.get(id)
     if result is None:
         return f"User of ID {id} not found"
 
-    return jsonify(result.serialize()), 200
+    return with_validators(jsonify(result.serialize()), *validators), 200
 
 # Get all realtor properties
 
@@ -83,25 +101,27 @@ def get_realtor(id):
 def get_realtor_properties(realtor_id):
 
     page_number = request.args.get("page", 1, type=int)
-    pagination_result = Realtor.query.get(
-        realtor_id).properties.filter(Property.active == True).paginate(page=page_number, per_page=20)
-
-    print(pagination_result.items)
+    fields = listing_fields()
+    query = project(realtor_properties(realtor_id), fields)
+    if cursor_requested():
+        pagination_result = paginate_by_cursor(query, Property, per_page=20)
+    else:
+        pagination_result = query.order_by(*NEWEST_FIRST).paginate(page=page_number, per_page=20)
 
     if pagination_result is None:
         return jsonify({"properties": [], "pages": 0})
 
     if len(pagination_result.items) == 0:
-        return jsonify({"properties": [], "pages": 0})
+        return jsonify(with_next_cursor({"properties": [], "pages": 0}, pagination_result))
+    # The client has this page already: nothing to serialize
+    etag = pagination_etag(pagination_result)
+    if unchanged(etag):
+        return not_modified(etag)
 
-    serialized_results = []
-    for property_item in pagination_result.items:
-        item = property_item.serialize()
-        images = property_item.get_property_images()
-        item["property_images"] = images
-        serialized_results.append(item)
+    serialized_results = listing_items(pagination_result.items, fields)
 
-    return jsonify({"properties": serialized_results, "pages": pagination_result.pages}), 200
+    return with_validators(listing_response(with_next_cursor({"pages": pagination_result.pages}, pagination_result),
+                                            "properties", serialized_results), etag), 200
 
 # Get realtor active properties
 
@@ -0,0 +1,101 @@
+"""
+Change feed for incremental sync.
+
+Every create, update, delist (active set to false), relist and delete of
+a Property, Realtor, Blog or Vendor is appended to ChangeLog in the same
+transaction as the write, with an increasing sequence number. ORM writes
+are logged from the session's `after_flush`; set-based writes (bulk
+import, bulk moderation) must call `record_changes` before committing.
+Bookkeeping columns (IGNORED_FIELDS) don't make a change: view counts
+and rebuilt documents are not logged. A listing whose realtor is updated
+or whose image variants are saved is logged as an update of its
+`realtor` or `image_variants` field, since what it serves changed.
+
+GET /changes?since=<seq> returns the changes after a sequence number, a
+page at a time, with the `next` sequence number to ask for. A consumer
+keeps that number and refetches only the entities that changed.
+
+Sequence numbers are taken when a change is written, so with concurrent
+writers (PostgreSQL) a transaction can commit a lower number after a
+higher one was already served. Changes younger than CHANGE_FEED_SETTLE
+seconds are held back to leave such transactions time to commit.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+from app.models.blog import Blog
+from app.models.change_log import ChangeLog
+from app.models.property import Property
+from app.models.realtor import Realtor
+from app.models.vendor import Vendor
+from app.services.model_events import ModelChange, changed_columns, object_id
+
+# Logged models and their entity names in the feed
+TRACKED = {Property: 'property', Realtor: 'realtor', Blog: 'blog', Vendor: 'vendor'}
+ENTITIES = tuple(TRACKED.values())
+
+# Columns whose changes aren't published
+IGNORED_FIELDS = {'date_updated', 'document', 'views'}
+
+
+def _entry(entity, change, now):
+    op = change.op
+    fields = None
+    if op == 'update':
+        changed = set(change.changed or ()) - IGNORED_FIELDS
+        if not changed:
+            return None
+        if 'active' in changed:
+            op = 'relist' if change.values.get('active') else 'delist'
+        fields = ','.join(sorted(changed))
+    return {'entity': entity, 'entity_id': str(change.id), 'op': op, 'fields': fields, 'date_created': now}
+
+
+def record_changes(connection, model, changes):
+    """Append `changes` (ModelChanges) of `model` to the change log, in the transaction of `connection`"""
+    now = datetime.utcnow()
+    rows = [row for row in (_entry(TRACKED[model], change, now) for change in changes) if row is not None]
+    if rows:
+        connection.execute(insert(ChangeLog.__table__), rows)
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_flushed_changes(session, flush_context):
+    by_model = {}
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            by_model.setdefault(type(obj), []).append(ModelChange('create', object_id(obj), None, None))
+    for obj in session.dirty:
+        if type(obj) in TRACKED and session.is_modified(obj, include_collections=False):
+            by_model.setdefault(type(obj), []).append(
+                ModelChange('update', object_id(obj), {'active': obj.active}, changed_columns(obj)))
+    for obj in session.deleted:
+        if type(obj) in TRACKED:
+            by_model.setdefault(type(obj), []).append(ModelChange('delete', object_id(obj), None, None))
+    for model, changes in by_model.items():
+        record_changes(session.connection(), model, changes)
+
+
+def changes_query(since, limit, entities=None, written_before=None):
+    """Query of the changes after `since`, oldest first and at most `limit`"""
+    table = ChangeLog.__table__
+    query = select(table.c.seq, table.c.entity, table.c.entity_id, table.c.op, table.c.fields)\
+        .where(table.c.seq > since)
+    if entities:
+        query = query.where(table.c.entity.in_(entities))
+    if written_before is not None:
+        query = query.where(table.c.date_created <= written_before)
+    return query.order_by(table.c.seq).limit(limit)
+
+
+def changes_since(connection, since, limit, entities=None, settle=0):
+    """(changes after `since`, oldest first and at most `limit`, whether there are more)"""
+    written_before = datetime.utcnow() - timedelta(seconds=settle) if settle else None
+    rows = connection.execute(changes_query(since, limit + 1, entities, written_before)).all()
+    return [{
+        "seq": row.seq,
+        "entity": row.entity,
+        "id": row.entity_id,
+        "op": row.op,
+        "fields": row.fields.split(',') if row.fields else None,
+    } for row in rows[:limit]], len(rows) > limit
@@ -0,0 +1,86 @@
+"""
+Conditional GET for public resources.
+
+Properties, blogs, vendors and realtors carry a `date_updated` column
+(set on every ORM write, and when a property's document is rebuilt), which
+is their version. Single resources get a weak ETag built from it plus a
+Last-Modified header; a list gets a weak ETag hashed from the ids and
+versions of the rows on the page (so a row leaving the page changes it
+too) and no Last-Modified, which deletes couldn't advance.
+
+Endpoints compute the validators from the rows they loaded and answer
+304 before serializing anything (`unchanged`/`not_modified`). Responses
+carry `Cache-Control: no-cache`, so browsers revalidate every time.
+Buffered view counts don't change the version.
+"""
+import hashlib
+from datetime import datetime, timezone
+from flask import current_app, request
+from sqlalchemy import select
+from app.extensions import db
+
+
+def row_version(date_updated, date_created=None):
+    """Version string of a row; rows written before `date_updated` existed fall back to `date_created`"""
+    version = date_updated or date_created
+    return version.isoformat() if version else '0'
+
+
+def resource_etag(kind, resource_id, version):
+    return f"{kind}-{resource_id}-{version}"
+
+
+def page_etag(rows, *extra):
+    """ETag of a list page from its rows' ids and versions (and e.g. the number of pages)"""
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(f"{row.id}:{row_version(row.date_updated, row.date_created)}\n".encode())
+    for value in extra:
+        digest.update(f"|{value}".encode())
+    return digest.hexdigest()
+
+
+def pagination_etag(pagination):
+    """ETag of a page returned by the pagination helpers (or Flask-SQLAlchemy's paginate)"""
+    return page_etag(pagination.items, pagination.pages, getattr(pagination, 'next_cursor', None))
+
+
+def resource_validators(kind, model, resource_id):
+    """(ETag, Last-Modified) of one row, without loading it; None if it doesn't exist"""
+    version = db.session.execute(
+        select(model.date_updated, model.date_created).where(model.id == resource_id)
+    ).first()
+    if version is None:
+        return None
+    date_updated, date_created = version
+    return resource_etag(kind, resource_id, row_version(date_updated, date_created)), date_updated or date_created
+
+
+def unchanged(etag, last_modified=None):
+    """True when the request's If-None-Match (or else If-Modified-Since) matches"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified=None):
+    """Add the ETag (and Last-Modified) of the resource to `response`"""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def parse_version(version):
+    """Datetime of a `row_version` string, for Last-Modified"""
+    try:
+        return datetime.fromisoformat(version)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,397 @@
+"""
+In-process facet index over active properties.
+
+Every active property gets a slot number. Categorical fields and price
+buckets keep one bitmap (a Python int, bit n = slot n) per value;
+numeric fields keep a sorted array of (value, slot) pairs so ranges are
+found by bisection, and the bitmaps of the ranges asked for are kept
+until the next write. Filters are answered by AND-ing bitmaps, and facet
+counts are popcounts, so neither touches the database.
+
+Setting or testing one bit of a big int copies or shifts the whole int,
+so bitmaps are built by setting bits in a bytearray and converting it
+once, and read back through its bytes. A full load sorts each array
+once; later writes insert into them.
+
+The index is loaded from the database on first use and updated after
+every commit that touches a Property. Writes made by other workers are
+picked up through the 'properties' tag of the response cache (see
+app/services/response_cache.py): the index remembers the tag's version
+when it is loaded and how many commits of this worker it has applied
+since (each bumps the tag once), and is reloaded when the tag has moved
+further. Without a shared tag (no Redis), it is reloaded every
+FACET_INDEX_MAX_AGE seconds.
+"""
+import time
+import threading
+from bisect import bisect_left, bisect_right, insort
+from flask import current_app
+from app.extensions import db
+from app.models.property import Property
+from app.services.model_events import on_commit
+from app.services.pagination import newest_first
+from app.services.response_cache import tag_version
+
+CATEGORICAL_FIELDS = ('category', 'property_type')
+NUMERIC_FIELDS = ('price', 'bedrooms', 'bathrooms', 'acreage')
+
+# Upper bounds of the price buckets returned by /property/facets (None = no limit)
+PRICE_BUCKETS = (250000, 500000, 1000000, 2500000, 5000000, None)
+
+# Range bitmaps kept between writes (min/max price, bedrooms, ...)
+MAX_CACHED_RANGES = 256
+
+INDEXED_COLUMNS = (Property.id, Property.active, Property.date_created,
+                   Property.category, Property.property_type, Property.price,
+                   Property.bedrooms, Property.bathrooms, Property.acreage)
+
+
+def _facet_key(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def _slots_of(bitmap):
+    """Slot numbers set in `bitmap`, in increasing order"""
+    slots = []
+    for position, byte in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) >> 3, 'little')):
+        if byte:
+            base = position << 3
+            slots.extend(base + bit for bit in _BYTE_BITS[byte])
+    return slots
+
+
+# Byte value -> positions of its set bits
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+
+def _bitmap_of_slots(slots, size):
+    """Bitmap of `slots` (all < `size`), set in a bytearray and converted once"""
+    bits = bytearray((size + 7) >> 3)
+    for slot in slots:
+        bits[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _price_bucket(price):
+    """Index in PRICE_BUCKETS of the bucket holding `price`, None if it is in none"""
+    if price is None or price < 0:
+        return None
+    return bisect_right(PRICE_BUCKETS, price, hi=len(PRICE_BUCKETS) - 1)
+
+
+class FacetIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._slots = {}        # property id -> slot
+        self._ids = []          # slot -> property id (None if free)
+        self._sort_keys = []    # slot -> (date_created, id)
+        self._values = []       # slot -> indexed values
+        self._free = []
+        self._all = 0
+        self._bitmaps = {field: {} for field in CATEGORICAL_FIELDS}
+        self._labels = {field: {} for field in CATEGORICAL_FIELDS}
+        self._numeric = {field: ([], []) for field in NUMERIC_FIELDS}  # (values, slots), sorted on (value, slot)
+        self._price_buckets = [0] * len(PRICE_BUCKETS)
+        self._by_date = []      # slots, oldest first (see newest_first)
+        self._ranges = {}       # (field, minimum, maximum) -> bitmap, cleared on writes
+        self.built_at = time.monotonic()
+        self.version = None     # version of the 'properties' cache tag when loaded
+        self.local_writes = 0   # commits of this worker applied since
+
+    def _date_key(self, slot):
+        return newest_first(self._sort_keys[slot])
+
+    # Writes
+
+    def load(self, rows):
+        """Index `rows` (mappings of INDEXED_COLUMNS values) into an empty index, with one sort per array"""
+        with self._lock:
+            grouped = {field: {} for field in CATEGORICAL_FIELDS}
+            buckets = [[] for _ in PRICE_BUCKETS]
+            for row in rows:
+                if not row.get('active') or row['id'] in self._slots:
+                    continue
+                slot = len(self._ids)
+                values = {field: _facet_key(row.get(field)) for field in CATEGORICAL_FIELDS}
+                values.update({field: row.get(field) for field in NUMERIC_FIELDS})
+                self._ids.append(row['id'])
+                self._sort_keys.append((row.get('date_created'), row['id']))
+                self._values.append(values)
+                self._slots[row['id']] = slot
+                for field in CATEGORICAL_FIELDS:
+                    key = values[field]
+                    if key is not None:
+                        grouped[field].setdefault(key, []).append(slot)
+                        self._labels[field][key] = row.get(field)
+                bucket = _price_bucket(values['price'])
+                if bucket is not None:
+                    buckets[bucket].append(slot)
+
+            size = len(self._ids)
+            self._all = (1 << size) - 1
+            for field in CATEGORICAL_FIELDS:
+                self._bitmaps[field] = {key: _bitmap_of_slots(slots, size) for key, slots in grouped[field].items()}
+            self._price_buckets = [_bitmap_of_slots(slots, size) for slots in buckets]
+            for field in NUMERIC_FIELDS:
+                pairs = sorted((values[field], slot) for slot, values in enumerate(self._values)
+                               if values[field] is not None)
+                self._numeric[field] = ([value for value, _ in pairs], [slot for _, slot in pairs])
+            self._by_date = sorted(range(size), key=self._date_key)
+            self._ranges.clear()
+
+    def upsert(self, row):
+        """Add or refresh a property given a mapping of INDEXED_COLUMNS values"""
+        with self._lock:
+            self.remove(row['id'])
+            if not row.get('active'):
+                return
+
+            slot = self._free.pop() if self._free else len(self._ids)
+            values = {field: _facet_key(row.get(field)) for field in CATEGORICAL_FIELDS}
+            values.update({field: row.get(field) for field in NUMERIC_FIELDS})
+
+            if slot == len(self._ids):
+                self._ids.append(None)
+                self._sort_keys.append(None)
+                self._values.append(None)
+            self._ids[slot] = row['id']
+            self._sort_keys[slot] = (row.get('date_created'), row['id'])
+            self._values[slot] = values
+            self._slots[row['id']] = slot
+            self._ranges.clear()
+
+            bit = 1 << slot
+            self._all |= bit
+            for field in CATEGORICAL_FIELDS:
+                key = values[field]
+                if key is None:
+                    continue
+                self._bitmaps[field][key] = self._bitmaps[field].get(key, 0) | bit
+                self._labels[field][key] = row.get(field)
+            bucket = _price_bucket(values['price'])
+            if bucket is not None:
+                self._price_buckets[bucket] |= bit
+            for field in NUMERIC_FIELDS:
+                if values[field] is None:
+                    continue
+                sorted_values, sorted_slots = self._numeric[field]
+                position = self._numeric_position(field, values[field], slot)
+                sorted_values.insert(position, values[field])
+                sorted_slots.insert(position, slot)
+            insort(self._by_date, slot, key=self._date_key)
+
+    def remove(self, property_id):
+        with self._lock:
+            slot = self._slots.pop(property_id, None)
+            if slot is None:
+                return
+            values = self._values[slot]
+            self._ranges.clear()
+            bit = 1 << slot
+            self._all &= ~bit
+            for field in CATEGORICAL_FIELDS:
+                key = values[field]
+                if key is None:
+                    continue
+                remaining = self._bitmaps[field][key] & ~bit
+                if remaining:
+                    self._bitmaps[field][key] = remaining
+                else:
+                    del self._bitmaps[field][key]
+                    del self._labels[field][key]
+            bucket = _price_bucket(values['price'])
+            if bucket is not None:
+                self._price_buckets[bucket] &= ~bit
+            for field in NUMERIC_FIELDS:
+                if values[field] is None:
+                    continue
+                sorted_values, sorted_slots = self._numeric[field]
+                position = self._numeric_position(field, values[field], slot)
+                del sorted_values[position]
+                del sorted_slots[position]
+            del self._by_date[bisect_left(self._by_date, self._date_key(slot), key=self._date_key)]
+            self._ids[slot] = None
+            self._sort_keys[slot] = None
+            self._values[slot] = None
+            insort(self._free, slot, key=lambda free_slot: -free_slot)
+
+    def _numeric_position(self, field, value, slot):
+        """Position of (value, slot) in the sorted arrays of `field`"""
+        sorted_values, sorted_slots = self._numeric[field]
+        # Equal values are ordered by slot
+        start = bisect_left(sorted_values, value)
+        end = bisect_right(sorted_values, value, lo=start)
+        return bisect_left(sorted_slots, slot, start, end)
+
+    # Reads
+
+    def _range(self, field, minimum=None, maximum=None):
+        key = (field, minimum, maximum)
+        bitmap = self._ranges.get(key)
+        if bitmap is None:
+            sorted_values, sorted_slots = self._numeric[field]
+            start = bisect_left(sorted_values, minimum) if minimum is not None else 0
+            end = bisect_right(sorted_values, maximum) if maximum is not None else len(sorted_values)
+            bitmap = _bitmap_of_slots(sorted_slots[start:end], len(self._ids))
+            if len(self._ranges) >= MAX_CACHED_RANGES:
+                self._ranges.clear()
+            self._ranges[key] = bitmap
+        return bitmap
+
+    def filter(self, category=None, property_type=None, min_price=None, max_price=None,
+               max_bedrooms=None, max_bathrooms=None, min_acreage=None, max_acreage=None,
+               exclude=None):
+        """
+        Bitmap of active properties matching every given filter.
+        `exclude` names a filter to ignore (used for facet counts).
+        """
+        with self._lock:
+            bitmap = self._all
+            if category and exclude != 'category':
+                bitmap &= self._bitmaps['category'].get(_facet_key(category), 0)
+            if property_type and exclude != 'property_type':
+                bitmap &= self._bitmaps['property_type'].get(_facet_key(property_type), 0)
+            if (min_price is not None or max_price is not None) and exclude != 'price':
+                bitmap &= self._range('price', min_price, max_price)
+            if max_bedrooms is not None:
+                bitmap &= self._range('bedrooms', maximum=max_bedrooms)
+            if max_bathrooms is not None:
+                bitmap &= self._range('bathrooms', maximum=max_bathrooms)
+            if min_acreage is not None or max_acreage is not None:
+                bitmap &= self._range('acreage', min_acreage, max_acreage)
+            return bitmap
+
+    def ids(self, bitmap):
+        """Property ids in `bitmap`, newest first"""
+        with self._lock:
+            if bitmap.bit_count() * 8 < len(self._by_date):
+                # Few matches: sort them
+                slots = sorted(_slots_of(bitmap), key=self._date_key, reverse=True)
+            else:
+                # Many: walk the date order and keep the matches
+                bits = bitmap.to_bytes((len(self._ids) + 7) >> 3, 'little')
+                slots = [slot for slot in reversed(self._by_date) if bits[slot >> 3] >> (slot & 7) & 1]
+            ids = self._ids
+            return [ids[slot] for slot in slots]
+
+    def order_by(self, property_ids, field, descending=False):
+        """Sort `property_ids` on a numeric field, properties without a value last"""
+        with self._lock:
+            values = {property_id: self._values[self._slots[property_id]][field]
+                      for property_id in property_ids if property_id in self._slots}
+        with_value = [property_id for property_id in property_ids if values.get(property_id) is not None]
+        without_value = [property_id for property_id in property_ids if values.get(property_id) is None]
+        return sorted(with_value, key=values.get, reverse=descending) + without_value
+
+    def bitmap_of(self, property_ids):
+        """Bitmap of the active properties among `property_ids`"""
+        with self._lock:
+            slots = self._slots
+            return _bitmap_of_slots((slots[property_id] for property_id in property_ids if property_id in slots),
+                                    len(self._ids))
+
+    def count(self, bitmap, within=None):
+        if within is not None:
+            bitmap &= within
+        return bitmap.bit_count()
+
+    def restrict(self, property_ids, bitmap):
+        """The ids of `property_ids` that are in `bitmap`, keeping their order"""
+        with self._lock:
+            slots = self._slots
+            bits = bitmap.to_bytes((len(self._ids) + 7) >> 3, 'little')
+            return [property_id for property_id in property_ids
+                    if property_id in slots and bits[slots[property_id] >> 3] >> (slots[property_id] & 7) & 1]
+
+    def sort_key(self, property_id):
+        with self._lock:
+            slot = self._slots.get(property_id)
+            return self._sort_keys[slot] if slot is not None else None
+
+    def facet_counts(self, within=None, **filters):
+        """
+        Counts per category, property type and price bucket. Each facet is
+        counted with the other filters applied, and only inside the `within`
+        bitmap when one is given.
+        """
+        with self._lock:
+            mask = self._all if within is None else within
+            counts = {}
+            for field in CATEGORICAL_FIELDS:
+                bitmap = self.filter(exclude=field, **filters) & mask
+                counts[field] = {
+                    self._labels[field][key]: (value_bitmap & bitmap).bit_count()
+                    for key, value_bitmap in self._bitmaps[field].items()
+                    if value_bitmap & bitmap
+                }
+
+            bitmap = self.filter(exclude='price', **filters) & mask
+            counts['price'] = []
+            lower = 0
+            for upper, bucket in zip(PRICE_BUCKETS, self._price_buckets):
+                # Buckets are [lower, upper), the last one is unbounded
+                counts['price'].append({"min": lower, "max": upper, "count": (bucket & bitmap).bit_count()})
+                lower = upper
+            return counts
+
+    def __len__(self):
+        return len(self._slots)
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def indexed_rows():
+    """Query of the INDEXED_COLUMNS of the active properties"""
+    return db.select(*INDEXED_COLUMNS).where(Property.active == True)
+
+
+def build_facet_index():
+    # Read the version first: a write committed during the load makes the index stale
+    version = tag_version('properties')
+    index = FacetIndex()
+    index.load(db.session.execute(indexed_rows()).mappings())
+    index.version = version
+    return index
+
+
+def _is_stale(index, max_age):
+    if index is None or time.monotonic() - index.built_at >= max_age:
+        return True
+    version = tag_version('properties')
+    if version is None:
+        return False
+    if index.version is None:
+        # Loaded while Redis was unreachable
+        return True
+    # A write of this worker may not have bumped the tag yet, hence >
+    return version > index.version + index.local_writes
+
+
+def get_facet_index():
+    """Return the process-wide facet index, (re)building it when missing or stale"""
+    global _index
+    max_age = current_app.config.get('FACET_INDEX_MAX_AGE', 300)
+    if not _is_stale(_index, max_age):
+        return _index
+
+    with _build_lock:
+        if _is_stale(_index, max_age):
+            _index = build_facet_index()
+            print(f"[FACETS] Indexed {len(_index)} active properties")
+    return _index
+
+
+@on_commit(Property)
+def update_facet_index(changes):
+    if _index is None:
+        return
+    index = _index
+    with index._lock:
+        for change in changes:
+            if change.op == 'delete':
+                index.remove(change.id)
+            else:
+                index.upsert(change.values)
+        index.local_writes += 1
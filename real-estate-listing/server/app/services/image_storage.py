@@ -0,0 +1,163 @@
+"""
+Image upload pipeline for /utils/upload_images.
+
+Storage backends are resolved once, when the app starts, in priority order:
+Cloudinary (USE_CLOUDINARY), Firebase Storage (USE_FIREBASE_STORAGE) and
+the local uploads directory (USE_LOCAL_STORAGE). Each image is uploaded on
+a process-wide pool of UPLOAD_WORKERS threads, so a request with many
+images takes about as long as its slowest image. An image falls back to the
+next backend when one fails, and every image gets its own result.
+"""
+import os
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from app.services.image_store import init_image_store
+
+# Cloudinary import (optional - only if configured)
+try:
+    import cloudinary
+    import cloudinary.uploader
+    CLOUDINARY_AVAILABLE = True
+except ImportError:
+    CLOUDINARY_AVAILABLE = False
+
+# One image of an upload request.
+# `field` is the form field name, `stream` a seekable file object.
+ImageUpload = namedtuple('ImageUpload', ['field', 'filename', 'content_type', 'stream'])
+
+# Outcome of one image: `url` and `backend` on success, `error` otherwise
+UploadResult = namedtuple('UploadResult', ['field', 'filename', 'url', 'backend', 'error', 'seconds'])
+
+
+def safe_filename(filename):
+    safe = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_', '.')).strip()
+    return safe.replace(' ', '_')
+
+
+class CloudinaryBackend:
+    name = 'cloudinary'
+
+    def __init__(self, cloud_name, api_key, api_secret):
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+
+    def store(self, upload, upload_id, base_url):
+        result = cloudinary.uploader.upload(
+            upload.stream,
+            folder=f"properties/{upload_id}",
+            public_id=f"{upload_id}_{upload.field}",
+            resource_type="image",
+            overwrite=False
+        )
+        return result.get('secure_url') or result.get('url')
+
+
+class FirebaseStorageBackend:
+    name = 'firebase'
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def store(self, upload, upload_id, base_url):
+        blob = self.bucket.blob(f'images/{upload_id}/{safe_filename(upload.filename)}')
+        blob.upload_from_file(upload.stream, content_type=upload.content_type)
+        blob.make_public()
+        return blob.public_url
+
+    def store_variant(self, name, data, content_type, upload_id, base_url):
+        blob = self.bucket.blob(f'images/{upload_id}/variants/{name}')
+        blob.upload_from_string(data, content_type=content_type)
+        blob.make_public()
+        return blob.public_url
+
+
+class LocalStorageBackend:
+    """Stores images in the content-addressed store (app/services/image_store.py)"""
+    name = 'local'
+
+    def __init__(self, image_store):
+        self.image_store = image_store
+        self.upload_dir = image_store.directory
+
+    def store(self, upload, upload_id, base_url):
+        filename = self.image_store.put(upload.stream, safe_filename(upload.filename))
+        return f"{base_url}/uploads/properties/{filename}"
+
+    def store_variant(self, name, data, content_type, upload_id, base_url):
+        path = os.path.join(self.upload_dir, name)
+        partial = f"{path}.{uuid.uuid4().hex}.partial"
+        with open(partial, 'wb') as f:
+            f.write(data)
+        os.replace(partial, path)
+        return f"{base_url}/uploads/properties/{name}"
+
+
+class ImageUploader:
+    def __init__(self, backends, workers=8):
+        self.backends = backends
+        # Called as on_stored(backend, upload, url, upload_id, base_url) after each upload
+        self.on_stored = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-upload')
+
+    def upload_all(self, uploads, upload_id, base_url):
+        """Upload `uploads` concurrently; results are in the same order"""
+        futures = [self._pool.submit(self.upload, upload, upload_id, base_url) for upload in uploads]
+        return [future.result() for future in futures]
+
+    def upload(self, upload, upload_id, base_url):
+        started = time.perf_counter()
+        # Uploads streamed into the image store were checked while they arrived
+        if hasattr(upload.stream, 'finish'):
+            error = upload.stream.finish()
+            if error:
+                print(f"[UPLOAD] Rejected {upload.filename}: {error}")
+                return UploadResult(upload.field, upload.filename, None, None, error, 0)
+        errors = []
+        for backend in self.backends:
+            try:
+                upload.stream.seek(0)
+                url = backend.store(upload, upload_id, base_url)
+                print(f"[UPLOAD] Uploaded to {backend.name}: {url}")
+                if self.on_stored is not None:
+                    self.on_stored(backend, upload, url, upload_id, base_url)
+                return UploadResult(upload.field, upload.filename, url, backend.name, None,
+                                    time.perf_counter() - started)
+            except Exception as e:
+                print(f"[UPLOAD] {backend.name} upload of {upload.filename} failed: {e}")
+                errors.append(f"{backend.name}: {e}")
+        error = '; '.join(errors) or 'No storage backend configured'
+        print(f"[UPLOAD] Failed to upload image {upload.field} with all methods")
+        return UploadResult(upload.field, upload.filename, None, None, error, time.perf_counter() - started)
+
+
+def resolve_backends(config, image_store):
+    """Storage backends enabled in `config`, in priority order"""
+    backends = []
+    if config.get('USE_CLOUDINARY'):
+        if CLOUDINARY_AVAILABLE:
+            backends.append(CloudinaryBackend(config.get('CLOUDINARY_CLOUD_NAME'),
+                                              config.get('CLOUDINARY_API_KEY'),
+                                              config.get('CLOUDINARY_API_SECRET')))
+        else:
+            print("⚠️  Warning: USE_CLOUDINARY is set but the cloudinary package is not installed")
+
+    if config.get('USE_FIREBASE_STORAGE'):
+        try:
+            from firebase_admin import storage
+            backends.append(FirebaseStorageBackend(storage.bucket()))
+        except Exception as e:
+            print(f"⚠️  Warning: Firebase Storage is not available for uploads: {e}")
+
+    if config.get('USE_LOCAL_STORAGE'):
+        backends.append(LocalStorageBackend(image_store))
+    return backends
+
+
+def init_image_storage(app):
+    """Resolve the storage backends once and create the upload pool"""
+    image_store = init_image_store(app)
+    uploader = ImageUploader(resolve_backends(app.config, image_store), workers=app.config.get('UPLOAD_WORKERS', 8))
+    app.extensions['image_uploader'] = uploader
+    print(f"[UPLOAD] Image storage: {' > '.join(backend.name for backend in uploader.backends) or 'none'}")
+    return uploader
@@ -0,0 +1,308 @@
+"""
+Content-addressed local image store.
+
+Files uploaded to /utils/upload_images are streamed to a temporary file in
+UPLOAD_FOLDER/tmp while Werkzeug parses the request, and hashed (SHA-256)
+as they are written. A file is rejected as soon as it goes over
+MAX_IMAGE_BYTES, or its header declares more than MAX_IMAGE_DIMENSION
+pixels on a side or MAX_IMAGE_PIXELS in total: the rest of its data is
+discarded instead of written.
+
+The local storage backend stores every image under its content hash by
+hard-linking the temporary file, so an image uploaded again (an agency's
+stock photo on many listings) reuses the existing file. The StoredImage
+table records each file. Which listings use a file is only known from
+their property_images, so gc_uploads.py counts the references there
+(StoredImage.refcount) and removes files that nothing references.
+"""
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from urllib.parse import urlsplit
+from flask import Request, current_app
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.stored_image import StoredImage
+
+try:
+    from PIL import Image
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+# Endpoints whose file uploads are streamed into the store
+STREAMED_ENDPOINTS = {'utils.upload_images'}
+
+# Try to read the image size once this much of the file has arrived
+HEADER_PROBES = (1024, 8 * 1024, 64 * 1024, 256 * 1024)
+
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif', 'BMP': '.bmp', 'TIFF': '.tif'}
+
+STORED_FILENAME = re.compile(r'^([0-9a-f]{64})\.\w+$')
+
+
+def _format_size(size):
+    """`size` bytes for messages, e.g. '15 MB' or '512 KB'"""
+    for unit, scale in (('MB', 1024 * 1024), ('KB', 1024)):
+        if size >= scale:
+            return f"{size / scale:.1f}".removesuffix('.0') + f" {unit}"
+    return f"{size} bytes"
+
+
+class HashedUpload:
+    """
+    Writable stream handed to Werkzeug's form parser for one uploaded file.
+    Hashes and checks the data as it is written, then reads like a file.
+    """
+
+    def __init__(self, directory, max_bytes, max_dimension, max_pixels):
+        self._file = tempfile.NamedTemporaryFile(dir=directory, prefix='upload-', delete=False)
+        self.path = self._file.name
+        self.max_bytes = max_bytes
+        self.max_dimension = max_dimension
+        self.max_pixels = max_pixels
+        self.size = 0
+        self.dimensions = None
+        self.format = None
+        self.error = None
+        self._hash = hashlib.sha256()
+        self._header = bytearray()
+        self._probes = list(HEADER_PROBES) if PILLOW_AVAILABLE else []
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def write(self, data):
+        if self.error:
+            return len(data)
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            self._reject(f"File is larger than {_format_size(self.max_bytes)}")
+            return len(data)
+        if self._probes:
+            self._header += data[:self._probes[-1] - len(self._header)]
+            if len(self._header) >= self._probes[0]:
+                while self._probes and len(self._header) >= self._probes[0]:
+                    self._probes.pop(0)
+                self._probe(io.BytesIO(self._header))
+                if self.error:
+                    return len(data)
+        self._hash.update(data)
+        self._file.write(data)
+        return len(data)
+
+    def finish(self):
+        """Final checks once the whole file has arrived; returns an error message or None"""
+        if self.error:
+            return self.error
+        if PILLOW_AVAILABLE and self.dimensions is None:
+            self._file.flush()
+            self._probe(self.path)
+            if self.dimensions is None and not self.error:
+                self._reject("File is not a supported image")
+        return self.error
+
+    def _probe(self, source):
+        try:
+            # Only the header is parsed, pixel data is not decoded
+            with Image.open(source) as image:
+                self.dimensions = image.size
+                self.format = image.format
+        except Exception:
+            return
+        self._probes = []
+        self._header = bytearray()
+        width, height = self.dimensions
+        if self.max_dimension and max(width, height) > self.max_dimension:
+            self._reject(f"Image is {width}x{height}, the limit is {self.max_dimension} pixels per side")
+        elif self.max_pixels and width * height > self.max_pixels:
+            self._reject(f"Image has {width * height} pixels, the limit is {self.max_pixels}")
+
+    def _reject(self, reason):
+        self.error = reason
+        self._probes = []
+        self._header = bytearray()
+        self._file.seek(0)
+        self._file.truncate()
+
+    # File interface used by FileStorage and the storage backends
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=0):
+        if whence == 0 and offset == 0:
+            self._file.flush()
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        self._file.flush()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __del__(self):
+        self.close()
+
+
+class UploadRequest(Request):
+    """Streams uploads of STREAMED_ENDPOINTS into the image store"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint in STREAMED_ENDPOINTS:
+            return current_app.config.get('MAX_UPLOAD_REQUEST_BYTES')
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        store = current_app.extensions.get('image_store')
+        if store is not None and self.endpoint in STREAMED_ENDPOINTS:
+            return store.open_upload()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+class ContentAddressedStore:
+    def __init__(self, app, directory, max_bytes=None, max_dimension=None, max_pixels=None):
+        self.app = app
+        self.directory = directory
+        self.tmp_directory = os.path.join(os.path.dirname(directory), 'tmp')
+        self.max_bytes = max_bytes
+        self.max_dimension = max_dimension
+        self.max_pixels = max_pixels
+        os.makedirs(self.directory, exist_ok=True)
+        os.makedirs(self.tmp_directory, exist_ok=True)
+
+    def open_upload(self):
+        return HashedUpload(self.tmp_directory, self.max_bytes, self.max_dimension, self.max_pixels)
+
+    def put(self, stream, filename_hint=''):
+        """Store the content of `stream` (once) and return its filename"""
+        if isinstance(stream, HashedUpload):
+            return self._put_file(stream.path, stream.sha256, stream.size, stream.dimensions,
+                                  stream.format, filename_hint)
+
+        # Any other stream is copied to a temporary file first, hashing it on the way
+        upload = self.open_upload()
+        try:
+            stream.seek(0)
+            shutil.copyfileobj(stream, upload, 64 * 1024)
+            error = upload.finish()
+            if error:
+                raise ValueError(error)
+            return self._put_file(upload.path, upload.sha256, upload.size, upload.dimensions,
+                                  upload.format, filename_hint)
+        finally:
+            upload.close()
+
+    def _put_file(self, source_path, sha256, size, dimensions, image_format, filename_hint):
+        extension = FORMAT_EXTENSIONS.get(image_format) or os.path.splitext(filename_hint)[1].lower() or '.jpg'
+        filename = self._register(sha256, f"{sha256}{extension}", size, dimensions, image_format)
+        target = os.path.join(self.directory, filename)
+        if not os.path.exists(target):
+            self._link(source_path, target)
+        else:
+            print(f"[UPLOAD] Duplicate image, reusing {filename}")
+        return filename
+
+    def _link(self, source_path, target):
+        try:
+            os.link(source_path, target)
+        except FileExistsError:
+            pass
+        except OSError:
+            # No hard links (e.g. another filesystem): copy, then move into place atomically
+            partial = f"{target}.{uuid.uuid4().hex}.partial"
+            shutil.copyfile(source_path, partial)
+            os.replace(partial, target)
+
+    def _register(self, sha256, filename, size, dimensions, image_format):
+        """Record the content if it is new, returns the filename it is stored under"""
+        with self.app.app_context():
+            try:
+                for _ in range(2):
+                    existing = db.session.execute(
+                        db.select(StoredImage.filename).where(StoredImage.sha256 == sha256)
+                    ).scalar()
+                    if existing is not None:
+                        return existing
+                    try:
+                        db.session.add(StoredImage(
+                            sha256=sha256,
+                            filename=filename,
+                            content_type=f"image/{image_format.lower()}" if image_format else None,
+                            size=size,
+                            width=dimensions[0] if dimensions else None,
+                            height=dimensions[1] if dimensions else None,
+                            # No listing uses it yet
+                            refcount=0,
+                        ))
+                        db.session.commit()
+                        return filename
+                    except IntegrityError:
+                        # Stored concurrently by another upload
+                        db.session.rollback()
+                raise RuntimeError(f"Could not register stored image {sha256}")
+            finally:
+                db.session.remove()
+
+
+def stored_filenames(urls):
+    """Filenames of content-addressed local images among `urls`"""
+    filenames = []
+    for url in urls or []:
+        if not isinstance(url, str):
+            continue
+        path = urlsplit(url).path
+        if path.startswith('/uploads/properties/') and STORED_FILENAME.match(os.path.basename(path)):
+            filenames.append(os.path.basename(path))
+    return filenames
+
+
+def init_image_store(app):
+    """Content-addressed store for local uploads, with streamed, size-checked uploads"""
+    store = ContentAddressedStore(
+        app,
+        os.path.join(app.config['UPLOAD_FOLDER'], 'properties'),
+        max_bytes=app.config.get('MAX_IMAGE_BYTES'),
+        max_dimension=app.config.get('MAX_IMAGE_DIMENSION'),
+        max_pixels=app.config.get('MAX_IMAGE_PIXELS'),
+    )
+    app.request_class = UploadRequest
+    app.extensions['image_store'] = store
+    if PILLOW_AVAILABLE and app.config.get('MAX_IMAGE_PIXELS'):
+        # Also guards the decoders used for image variants
+        Image.MAX_IMAGE_PIXELS = app.config['MAX_IMAGE_PIXELS']
+    return store
@@ -0,0 +1,208 @@
+"""
+Responsive variants of uploaded property images.
+
+After an image is uploaded it is resized to each of IMAGE_VARIANT_WIDTHS
+(never upscaled), re-encoded as WebP and JPEG, and stored next to the
+original by the same backend. EXIF metadata is dropped after its
+orientation has been applied. This runs on a pool of IMAGE_VARIANT_WORKERS
+threads, off the request path. Cloudinary resizes on the fly, so its
+variants are transformation URLs and nothing is processed locally.
+
+Each original gets an ImageVariant row with the same manifest shape for
+every backend; `attach_image_variants` adds them to serialized listings.
+
+Resizing needs Pillow; without it only Cloudinary images get variants.
+"""
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from app.extensions import db
+from app.models.image_variant import ImageVariant
+from app.services.image_storage import CloudinaryBackend
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+# Variant format -> (content type, file extension)
+FORMATS = {
+    'webp': ('image/webp', '.webp'),
+    'jpeg': ('image/jpeg', '.jpg'),
+}
+
+ORIENTATION_TAG = 0x0112
+
+# Look up manifests for at most this many URLs per query
+LOOKUP_CHUNK_SIZE = 500
+
+
+def render_variants(data, widths, webp_quality=75, jpeg_quality=80):
+    """
+    Decode an image and re-encode it at each width narrower than the
+    original (or just at the original width when it is narrower than all
+    of them). Returns ((width, height), [(format, width, bytes), ...]).
+    """
+    image = Image.open(io.BytesIO(data))
+    original_size = image.size
+    if image.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8):
+        original_size = original_size[::-1]
+    # Let the JPEG decoder downscale while decoding; both sides stay >= the largest width
+    image.draft('RGB', (max(widths), max(widths)))
+    image = ImageOps.exif_transpose(image)
+    icc_profile = image.info.get('icc_profile')
+
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    targets = sorted({width for width in widths if width < image.width} or {image.width}, reverse=True)
+    rendered = []
+    current = image
+    # Resize from the previous (larger) variant, which is cheaper than from the original
+    for width in targets:
+        if width != current.width:
+            height = max(1, round(current.height * width / current.width))
+            current = current.resize((width, height), Image.LANCZOS)
+
+        opaque = current
+        if current.mode == 'RGBA':
+            opaque = Image.new('RGB', current.size, (255, 255, 255))
+            opaque.paste(current, mask=current.getchannel('A'))
+
+        # No exif= argument: metadata is not copied into the variants
+        webp = io.BytesIO()
+        current.save(webp, 'WEBP', quality=webp_quality, method=4, icc_profile=icc_profile)
+        rendered.append(('webp', width, webp.getvalue()))
+        jpeg = io.BytesIO()
+        opaque.save(jpeg, 'JPEG', quality=jpeg_quality, optimize=True, progressive=True, icc_profile=icc_profile)
+        rendered.append(('jpeg', width, jpeg.getvalue()))
+    return original_size, rendered
+
+
+def cloudinary_variants(url, widths):
+    """Transformation URLs resizing a Cloudinary image on delivery"""
+    if '/upload/' not in url:
+        return {}
+    prefix, path = url.split('/upload/', 1)
+    return {
+        image_format: {str(width): f"{prefix}/upload/w_{width},c_limit,q_auto,f_{extension}/{path}"
+                       for width in widths}
+        for image_format, extension in (('webp', 'webp'), ('jpeg', 'jpg'))
+    }
+
+
+class VariantProcessor:
+    def __init__(self, app, widths, webp_quality=75, jpeg_quality=80, workers=2):
+        self.app = app
+        self.widths = sorted(widths)
+        self.webp_quality = webp_quality
+        self.jpeg_quality = jpeg_quality
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+        # URLs being processed, so duplicates uploaded together are processed once
+        self._in_progress = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, backend, upload, url, upload_id, base_url):
+        """Called after `upload` was stored at `url`; queues its variants"""
+        if isinstance(backend, CloudinaryBackend):
+            self._pool.submit(self._save, url, backend.name, None, cloudinary_variants(url, self.widths))
+            return
+        if not PILLOW_AVAILABLE or not hasattr(backend, 'store_variant'):
+            return
+        with self._lock:
+            if url in self._in_progress:
+                return
+            self._in_progress.add(url)
+        # The upload's stream is closed once the request ends, so keep the bytes
+        upload.stream.seek(0)
+        data = upload.stream.read()
+        self._pool.submit(self._process, backend, url, data, upload_id, base_url)
+
+    def process(self, backend, url, data, base_url, upload_id=None):
+        """Generate and record the variants of an image stored at `url` by `backend`, in this thread"""
+        self._process(backend, url, data, upload_id, base_url)
+
+    def record_cloudinary(self, url):
+        """Record the transformation URLs of an image stored on Cloudinary"""
+        self._save(url, CloudinaryBackend.name, None, cloudinary_variants(url, self.widths))
+
+    def _process(self, backend, url, data, upload_id, base_url):
+        try:
+            # Content-addressed uploads give a duplicate image the same URL
+            with self.app.app_context():
+                exists = db.session.get(ImageVariant, url) is not None
+                db.session.remove()
+            if exists:
+                return
+            size, rendered = render_variants(data, self.widths, self.webp_quality, self.jpeg_quality)
+            stem = os.path.splitext(os.path.basename(urlsplit(url).path))[0]
+            variants = {}
+            for image_format, width, variant_data in rendered:
+                content_type, extension = FORMATS[image_format]
+                variant_url = backend.store_variant(f"{stem}_{width}w{extension}", variant_data,
+                                                    content_type, upload_id, base_url)
+                variants.setdefault(image_format, {})[str(width)] = variant_url
+            self._save(url, backend.name, size, variants)
+            print(f"[VARIANTS] {len(rendered)} variants of {url}")
+        except Exception as e:
+            print(f"[VARIANTS] Failed to process {url}: {e}")
+        finally:
+            with self._lock:
+                self._in_progress.discard(url)
+
+    def _save(self, url, backend_name, size, variants):
+        with self.app.app_context():
+            try:
+                db.session.merge(ImageVariant(
+                    url=url,
+                    backend=backend_name,
+                    width=size[0] if size else None,
+                    height=size[1] if size else None,
+                    variants=json.dumps(variants),
+                ))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[VARIANTS] Failed to save variants of {url}: {e}")
+            finally:
+                db.session.remove()
+
+
+def attach_image_variants(serialized_properties):
+    """
+    Add `image_variants` to serialized properties: one manifest (or None
+    while it is not ready) per entry of `property_images`, in one query.
+    """
+    urls = list({url for item in serialized_properties for url in item.get('property_images') or []
+                 if isinstance(url, str)})
+    manifests = {}
+    for start in range(0, len(urls), LOOKUP_CHUNK_SIZE):
+        rows = ImageVariant.query.filter(ImageVariant.url.in_(urls[start:start + LOOKUP_CHUNK_SIZE]))
+        manifests.update((row.url, row.serialize()) for row in rows)
+    for item in serialized_properties:
+        item['image_variants'] = [manifests.get(url) if isinstance(url, str) else None
+                                  for url in item.get('property_images') or []]
+    return serialized_properties
+
+
+def init_image_variants(app, uploader):
+    """Generate variants for everything `uploader` stores"""
+    if not app.config.get('IMAGE_VARIANTS_ENABLED', True):
+        return None
+    if not PILLOW_AVAILABLE:
+        print("⚠️  Warning: Pillow is not installed, image variants are only generated for Cloudinary")
+    processor = VariantProcessor(
+        app,
+        app.config.get('IMAGE_VARIANT_WIDTHS', [320, 640, 1024, 1600]),
+        webp_quality=app.config.get('IMAGE_WEBP_QUALITY', 75),
+        jpeg_quality=app.config.get('IMAGE_JPEG_QUALITY', 80),
+        workers=app.config.get('IMAGE_VARIANT_WORKERS', 2),
+    )
+    uploader.on_stored = processor.schedule
+    app.extensions['image_variants'] = processor
+    return processor
@@ -0,0 +1,98 @@
+"""
+Queries behind the listing endpoints.
+
+The routes build their queries here and check_query_plans.py explains
+the same builders, so a changed filter or order is checked against the
+indexes that serve it. Builders return unordered queries where the
+caller picks between offset pages (ordered by NEWEST_FIRST or
+`area_order`) and cursor pages (see app/services/pagination.py).
+"""
+from sqlalchemy.orm import joinedload
+from app.models.blog import Blog
+from app.models.favorite import Favorite
+from app.models.property import Property
+from app.models.vendor import Vendor
+from app.services.serialization import project
+
+# Order of the paginated property listings, the same as cursor pages
+NEWEST_FIRST = (Property.date_created.desc(), Property.id.desc())
+
+# Sort orders accepted by the `sort` argument of the listing endpoints (whether descending)
+AREA_SORTS = {"acreage": False, "-acreage": True}
+
+# Properties in the recently added strip
+RECENTLY_ADDED = 4
+
+
+def area_order(sort):
+    """Order of a `sort` from AREA_SORTS, served by the acreage index"""
+    acreage_order = Property.acreage.desc() if AREA_SORTS[sort] else Property.acreage.asc()
+    return acreage_order, Property.id
+
+
+def active_properties(min_area=None, max_area=None):
+    """Active properties, optionally within an area range in acres"""
+    query = Property.query.filter(Property.active == True)
+    if min_area is not None:
+        query = query.filter(Property.acreage >= min_area)
+    if max_area is not None:
+        query = query.filter(Property.acreage <= max_area)
+    return query
+
+
+def admin_properties(include_inactive=False):
+    """Properties with their realtor loaded in the same query"""
+    query = Property.query.options(joinedload(Property.realtor))
+    if not include_inactive:
+        query = query.filter(Property.active == True)
+    return query
+
+
+def realtor_properties(owner_id, include_inactive=False):
+    """Properties of the realtor with primary key `owner_id`"""
+    query = Property.query.filter(Property.owner_id == owner_id)
+    if not include_inactive:
+        query = query.filter(Property.active == True)
+    return query
+
+
+def active_properties_by_id(property_ids):
+    return Property.query.filter(Property.id.in_(property_ids), Property.active == True)
+
+
+def recently_added(fields):
+    """Rows of `fields` of the newest properties"""
+    return project(Property.query, fields).order_by(Property.date_created.desc()).limit(RECENTLY_ADDED)
+
+
+def favorite_properties(user_id):
+    """Properties the user favorited, in one joined query"""
+    return Property.query.join(Favorite, Favorite.property_id == Property.id).filter(Favorite.user_id == user_id)
+
+
+def user_favorite(user_id, property_id):
+    return Favorite.query.filter(Favorite.property_id == property_id, Favorite.user_id == user_id)
+
+
+def published_blogs(category=None):
+    query = Blog.query.filter_by(published=True, active=True)
+    if category:
+        query = query.filter_by(category=category)
+    return query
+
+
+def admin_blogs(include_unpublished=False):
+    query = Blog.query.filter_by(active=True)
+    if not include_unpublished:
+        query = query.filter_by(published=True)
+    return query
+
+
+def vendors(category=None, include_inactive=False):
+    """Vendors, newest first"""
+    query = Vendor.query
+    if not include_inactive:
+        query = query.filter_by(active=True)
+    if category:
+        query = query.filter_by(category=category)
+    return query.order_by(Vendor.date_created.desc())
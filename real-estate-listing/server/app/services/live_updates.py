@@ -0,0 +1,249 @@
+"""
+Live listing updates, pushed to browsers with Server-Sent Events.
+
+Committed property changes (create_property, update_property, delisting,
+bulk imports and moderation all go through `on_commit(Property)`) are
+published to the LIVE_UPDATES_REDIS_URL Redis channel as `listing`
+events (a new or changed active property) and `removed` events (deleted
+or delisted).
+
+Streams are open for minutes and idle most of the time, so they are not
+served by the API: each would hold one of its gunicorn threads. They are
+served by live_server.py, a separate asyncio process that subscribes to
+the channel and keeps any number of streams open on one event loop
+(`ListingBus`, `event_stream`). The API's /property/live_updates
+redirects to it (LIVE_UPDATES_URL).
+
+The live server keeps the last LIVE_UPDATES_BUFFER events, numbered, so
+a client that reconnects with the Last-Event-ID header gets what it
+missed; when that is no longer buffered (or was numbered by another live
+server process) it gets a `reset` event and should refetch. Streams end
+after SSE_STREAM_SECONDS, before proxies time them out; EventSource
+reconnects on its own after the `retry` delay and resumes from
+Last-Event-ID.
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from flask import current_app, has_app_context
+from app.models.property import Property
+from app.services.model_events import on_commit
+from app.services.serialization import LISTING_FIELDS
+
+# Redis import (optional - only if LIVE_UPDATES_REDIS_URL is set)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Fields events can be filtered on
+FILTER_FIELDS = ('category', 'property_type', 'location', 'price')
+
+# Redis channel between the API and the live server
+CHANNEL = 'live-listings'
+
+
+class LiveEvent:
+    def __init__(self, kind, property_id, data, attributes):
+        self.kind = kind              # 'listing' or 'removed'
+        self.property_id = property_id
+        self.data = data              # JSON text sent to clients
+        self.attributes = attributes  # FILTER_FIELDS values, for listing events
+
+    def to_json(self):
+        return json.dumps([self.kind, self.property_id, self.data, self.attributes])
+
+    @classmethod
+    def from_json(cls, raw):
+        return cls(*json.loads(raw))
+
+
+class LivePublisher:
+    """Publishes the events of the API's commits to the live server"""
+
+    def __init__(self, remote, channel=CHANNEL):
+        self.remote = remote
+        self.channel = channel
+        self.stats = {'published': 0, 'errors': 0}
+
+    def publish(self, event):
+        try:
+            self.remote.publish(self.channel, event.to_json())
+            self.stats['published'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"[LIVE] Failed to publish to Redis: {e}")
+
+
+class ListingBus:
+    """The live server's numbered buffer of recent events. Not thread-safe: use it from the event loop."""
+
+    def __init__(self, buffer_size=1000):
+        self.id = uuid.uuid4().hex[:12]
+        self._events = deque(maxlen=buffer_size)  # (seq, LiveEvent)
+        self._seq = 0
+        self._first = 1               # lowest sequence number that can be resumed from
+        self._arrived = asyncio.Event()
+        self.stats = {'received': 0, 'streams': 0, 'streamed': 0, 'errors': 0}
+
+    def append(self, event):
+        self._seq += 1
+        self._events.append((self._seq, event))
+        self._first = max(self._first, self._events[0][0])
+        self.stats['received'] += 1
+        self._wake()
+
+    def lose_track(self):
+        """Events may have been missed (e.g. Redis reconnect): every stream gets a reset"""
+        self._seq += 1
+        self._events.clear()
+        self._first = self._seq + 1
+        self._wake()
+
+    def _wake(self):
+        self._arrived.set()
+        self._arrived = asyncio.Event()
+
+    async def relay(self, remote, channel=CHANNEL):
+        """Append the events published on `channel`, until cancelled"""
+        backoff = 1
+        while True:
+            try:
+                async with remote.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(channel)
+                    backoff = 1
+                    async for message in pubsub.listen():
+                        self.append(LiveEvent.from_json(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"[LIVE] Redis subscription interrupted, retrying in {backoff}s: {e}")
+            self.lose_track()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    # Streams
+
+    def event_id(self, seq):
+        return f"{self.id}-{seq}"
+
+    def resume_point(self, last_event_id):
+        """Sequence number to stream after; None when the client missed events that are gone"""
+        if not last_event_id:
+            return self._seq
+        origin, _, seq = last_event_id.rpartition('-')
+        if origin != self.id or not seq.isdigit() or int(seq) > self._seq:
+            # From another live server or an earlier process
+            return None
+        return int(seq) if int(seq) + 1 >= self._first else None
+
+    def latest(self):
+        return self._seq
+
+    async def wait(self, after, timeout):
+        """Events after sequence number `after`, waiting up to `timeout` seconds for one; None on a gap"""
+        if self._seq == after:
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if after + 1 < self._first:
+            return None
+        return [(seq, event) for seq, event in self._events if seq > after]
+
+
+def listing_filter(args):
+    """Predicate on listing events from the `category`, `property_type`, `location`, `min_price` and `max_price` arguments"""
+    category = (args.get('category') or '').strip().lower()
+    property_type = (args.get('property_type') or '').strip().lower()
+    location = (args.get('location') or '').strip().lower()
+    min_price = args.get('min_price', type=float)
+    max_price = args.get('max_price', type=float)
+
+    def matches(event):
+        if event.kind != 'listing':
+            return True
+        values = event.attributes
+        if category and (values.get('category') or '').lower() != category:
+            return False
+        if property_type and (values.get('property_type') or '').lower() != property_type:
+            return False
+        if location and location not in (values.get('location') or '').lower():
+            return False
+        price = values.get('price')
+        if min_price is not None and (price is None or price < min_price):
+            return False
+        if max_price is not None and (price is None or price > max_price):
+            return False
+        return True
+    return matches
+
+
+def sse_message(event_id, kind, data):
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+
+
+async def event_stream(bus, after, matches, duration, heartbeat, retry):
+    """SSE text of the events after sequence number `after` (None: start with a reset) for `duration` seconds"""
+    deadline = time.monotonic() + duration
+    # EventSource reconnects `retry` seconds after the stream ends, sending Last-Event-ID
+    yield f"retry: {int(retry * 1000)}\n\n"
+    if after is None:
+        after = bus.latest()
+        yield sse_message(bus.event_id(after), 'reset', '{}')
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = await bus.wait(after, min(heartbeat, remaining))
+        if events is None:
+            # Too slow to keep up, or the server lost events: the client should refetch
+            after = bus.latest()
+            yield sse_message(bus.event_id(after), 'reset', '{}')
+        elif not events:
+            yield ": keep-alive\n\n"
+        for seq, event in events or ():
+            after = seq
+            if matches(event):
+                yield sse_message(bus.event_id(seq), event.kind, event.data)
+
+
+@on_commit(Property)
+def publish_listing_changes(changes):
+    if not has_app_context():
+        return
+    publisher = current_app.extensions.get('live_updates')
+    if publisher is None:
+        return
+    dumps = current_app.json.dumps
+    for change in changes:
+        values = change.values or {}
+        if change.op == 'delete' or (change.op == 'update' and 'active' in change.changed and not values.get('active')):
+            publisher.publish(LiveEvent('removed', change.id, dumps({"id": change.id}), None))
+        elif values.get('active'):
+            item = {field: values.get(field) for field in LISTING_FIELDS}
+            item['views'] = item['views'] or 0
+            publisher.publish(LiveEvent('listing', change.id, dumps(item),
+                                        {field: values.get(field) for field in FILTER_FIELDS}))
+
+
+def init_live_updates(app):
+    """Publisher of live listing updates to LIVE_UPDATES_REDIS_URL, read by live_server.py"""
+    if not app.config.get('LIVE_UPDATES_ENABLED', True):
+        return None
+
+    redis_url = app.config.get('LIVE_UPDATES_REDIS_URL')
+    if not redis_url:
+        return None
+    if not REDIS_AVAILABLE:
+        print("⚠️  Warning: LIVE_UPDATES_REDIS_URL is set but the redis package is not installed, "
+              "live updates are not published")
+        return None
+
+    publisher = LivePublisher(redis.Redis.from_url(redis_url, socket_timeout=app.config.get('LIVE_UPDATES_REDIS_TIMEOUT', 0.5)))
+    app.extensions['live_updates'] = publisher
+    return publisher
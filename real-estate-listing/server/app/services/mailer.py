@@ -0,0 +1,248 @@
+"""
+Transactional email outbox.
+
+Request handlers call `enqueue_email()`, which adds the email to the
+session they are about to commit: the email is stored in the same
+transaction as the record it is about (e.g. a Purchase) and nothing is
+sent on the request path. A background dispatcher claims due emails in
+batches, sends them concurrently on a small thread pool and records the
+outcome of the whole batch at once. Failed sends are retried with
+exponential backoff; after MAIL_MAX_ATTEMPTS an email is marked 'failed'
+and kept, with its last error, so it can be inspected or re-queued.
+
+Claiming an email moves its `next_attempt_at` forward by MAIL_CLAIM_LEASE
+seconds, so an email claimed by a process that dies is picked up again once
+the lease runs out, and several processes can share one outbox. Delivery is
+at least once.
+
+MAIL_ENDPOINT defaults to Brevo's transactional email API; point it at
+`python mail_sink.py` to run without sending real email.
+"""
+import json
+import random
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import requests
+from flask import current_app, has_app_context
+from sqlalchemy import update
+from app.extensions import db
+from app.models.email_outbox import EmailOutbox
+from app.services.model_events import on_commit
+
+BREVO_ENDPOINT = 'https://api.brevo.com/v3/smtp/email'
+DEFAULT_SENDER = {'email': "254realtors.homes@gmail.com", 'name': 'Real Estate Platform'}
+
+# Mail API responses that will not succeed when retried (malformed request or address)
+PERMANENT_FAILURES = (400, 422)
+
+DeliveryResult = namedtuple('DeliveryResult', ['id', 'error', 'retry'])
+
+
+def enqueue_email(kind, to_email, subject, html_content, reply_to=None, sender=None):
+    """
+    Add an email to the current session's outbox. It is sent after the
+    session commits, and dropped with the rest of the transaction on rollback.
+    """
+    payload = {
+        'sender': sender or DEFAULT_SENDER,
+        'to': [{'email': to_email}],
+        'subject': subject,
+        'htmlContent': html_content,
+    }
+    if reply_to:
+        payload['replyTo'] = reply_to
+    email = EmailOutbox(
+        id=str(uuid.uuid4()),
+        kind=kind,
+        recipient=to_email,
+        payload=json.dumps(payload),
+        status='pending',
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(email)
+    return email
+
+
+def due_emails(now, limit):
+    """Query of the ids of the pending emails due at `now`, longest waiting first"""
+    return (db.select(EmailOutbox.id)
+            .where(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(limit))
+
+
+class MailDispatcher:
+    def __init__(self, app):
+        config = app.config
+        self.app = app
+        self.endpoint = config.get('MAIL_ENDPOINT') or BREVO_ENDPOINT
+        self.api_key = config.get('MAIL_KEY')
+        self.workers = config.get('MAIL_WORKERS', 4)
+        self.batch_size = config.get('MAIL_BATCH_SIZE', 20)
+        self.poll_interval = config.get('MAIL_POLL_INTERVAL', 5)
+        self.max_attempts = config.get('MAIL_MAX_ATTEMPTS', 8)
+        self.retry_base_delay = config.get('MAIL_RETRY_BASE_DELAY', 10)
+        self.retry_max_delay = config.get('MAIL_RETRY_MAX_DELAY', 3600)
+        self.claim_lease = config.get('MAIL_CLAIM_LEASE', 120)
+        self.timeout = config.get('MAIL_TIMEOUT', 10)
+        # Brevo needs an API key; any other endpoint is a local stand-in
+        self.configured = bool(self.api_key) or self.endpoint != BREVO_ENDPOINT
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pool = None
+        self._local = threading.local()
+
+    def start(self):
+        """Start the dispatcher thread (once per process)"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            if not self.configured:
+                print("[EMAIL] MAIL_KEY not configured, emails stay in the outbox until it is set")
+                self._thread = False
+                return
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='mail-worker')
+            self._thread = threading.Thread(target=self._run, name='mail-dispatcher', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Check the outbox now instead of at the next poll"""
+        self.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    # Keep going while there are full batches
+                    while self.dispatch_batch() == self.batch_size:
+                        pass
+            except Exception as e:
+                print(f"[EMAIL] Dispatcher error: {e}")
+                import traceback
+                traceback.print_exc()
+
+    def dispatch_batch(self):
+        """Claim, send and record up to MAIL_BATCH_SIZE due emails"""
+        try:
+            emails = self._claim()
+        finally:
+            db.session.remove()
+        if not emails:
+            return 0
+
+        results = list(self._pool.map(self._deliver, emails))
+        try:
+            self._record(emails, results)
+        finally:
+            db.session.remove()
+        return len(emails)
+
+    def _claim(self):
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = due_emails(now, self.batch_size)
+        # Re-checking the due condition makes the claim safe against other processes
+        db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due),
+                   EmailOutbox.status == 'pending',
+                   EmailOutbox.next_attempt_at <= now)
+            .values(claim_token=token, next_attempt_at=now + timedelta(seconds=self.claim_lease))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return db.session.execute(
+            db.select(EmailOutbox.id, EmailOutbox.payload, EmailOutbox.attempts)
+            .where(EmailOutbox.claim_token == token)
+        ).all()
+
+    def _http(self):
+        # One connection pool per worker thread
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update({'accept': 'application/json', 'content-type': 'application/json'})
+            if self.api_key:
+                session.headers['api-key'] = str(self.api_key)
+        return session
+
+    def _deliver(self, email):
+        try:
+            response = self._http().post(self.endpoint, data=email.payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            return DeliveryResult(email.id, f"{type(e).__name__}: {e}", True)
+        except Exception as e:
+            # Anything else (a bad payload, a session bug) must not keep the batch from being recorded
+            print(f"[EMAIL] Unexpected error sending {email.id}: {type(e).__name__}: {e}")
+            return DeliveryResult(email.id, f"{type(e).__name__}: {e}", True)
+        if response.ok:
+            return DeliveryResult(email.id, None, False)
+        error = f"{response.status_code}: {response.text[:500]}"
+        return DeliveryResult(email.id, error, response.status_code not in PERMANENT_FAILURES)
+
+    def _retry_delay(self, attempts):
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _record(self, emails, results):
+        now = datetime.utcnow()
+        attempts = {email.id: email.attempts + 1 for email in emails}
+        values = []
+        for result in results:
+            row = {'id': result.id, 'attempts': attempts[result.id], 'claim_token': None,
+                   'last_error': result.error, 'status': 'pending', 'date_sent': None,
+                   'next_attempt_at': now}
+            if result.error is None:
+                row['status'] = 'sent'
+                row['date_sent'] = now
+                self.stats['sent'] += 1
+            elif result.retry and attempts[result.id] < self.max_attempts:
+                row['next_attempt_at'] = now + timedelta(seconds=self._retry_delay(attempts[result.id]))
+                self.stats['retried'] += 1
+                print(f"[EMAIL] Send failed ({result.error}), retrying {result.id} at {row['next_attempt_at']}")
+            else:
+                row['status'] = 'failed'
+                self.stats['failed'] += 1
+                print(f"[EMAIL] Giving up on {result.id} after {attempts[result.id]} attempts: {result.error}")
+            values.append(row)
+
+        # One executemany UPDATE for the whole batch
+        db.session.execute(update(EmailOutbox), values)
+        db.session.commit()
+        sent = sum(1 for result in results if result.error is None)
+        print(f"[EMAIL] Sent {sent} of {len(results)} emails")
+
+
+def init_mailer(app):
+    """Create the outbox dispatcher; it starts with the first request"""
+    dispatcher = MailDispatcher(app)
+    app.extensions['mailer'] = dispatcher
+    if not app.config.get('MAIL_DISPATCHER_ENABLED', True):
+        return dispatcher
+
+    @app.before_request
+    def start_mail_dispatcher():
+        dispatcher.start()
+
+    return dispatcher
+
+
+@on_commit(EmailOutbox)
+def wake_mail_dispatcher(changes):
+    if not has_app_context() or not any(change.op == 'create' for change in changes):
+        return
+    dispatcher = current_app.extensions.get('mailer')
+    if dispatcher is not None and current_app.config.get('MAIL_DISPATCHER_ENABLED', True):
+        dispatcher.wake()
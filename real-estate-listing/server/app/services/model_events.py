@@ -0,0 +1,94 @@
+"""
+Commit hooks for model changes.
+
+Functions registered with `on_commit(Model)` are called once a session
+commits, with the list of `ModelChange`s made to that model during the
+transaction. Changes from rolled back transactions are discarded.
+
+Set-based writes (`update()`/`delete()` statements, executemany inserts)
+bypass the ORM unit of work, so code issuing them must call `notify()`
+itself after committing.
+"""
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# op is 'create', 'update' or 'delete'.
+# values is a dict of column values (for deletes, the ones that were loaded),
+# changed is the set of column keys modified by an update.
+ModelChange = namedtuple('ModelChange', ['op', 'id', 'values', 'changed'])
+
+_listeners = {}
+
+
+def on_commit(model):
+    """Decorator registering `fn(changes)` to run after commits touching `model`"""
+    def decorator(fn):
+        _listeners.setdefault(model, []).append(fn)
+        return fn
+    return decorator
+
+
+def notify(model, changes):
+    """Dispatch `changes` of `model` to its listeners"""
+    for listener in _listeners.get(model, []):
+        try:
+            listener(changes)
+        except Exception as e:
+            print(f"[EVENTS] {listener.__name__} failed for {model.__name__}: {e}")
+            import traceback
+            traceback.print_exc()
+
+
+def object_id(obj):
+    """Primary key value of `obj` (e.g. ImageVariant.url for models without an `id`)"""
+    key = inspect(obj).mapper.primary_key_from_instance(obj)
+    return key[0] if len(key) == 1 else tuple(key)
+
+
+def column_values(obj):
+    # Deferred columns are left out rather than loaded
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs if not attr.deferred}
+
+
+def loaded_values(obj):
+    """Column values already loaded on `obj`, without emitting SQL"""
+    state = inspect(obj)
+    return {attr.key: state.dict.get(attr.key) for attr in state.mapper.column_attrs}
+
+
+def changed_columns(obj):
+    state = inspect(obj)
+    return {attr.key for attr in state.mapper.column_attrs
+            if state.attrs[attr.key].history.has_changes()}
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault('model_changes', [])
+    for obj in session.new:
+        if type(obj) in _listeners:
+            pending.append((type(obj), ModelChange('create', object_id(obj), column_values(obj), None)))
+    for obj in session.dirty:
+        if type(obj) in _listeners and session.is_modified(obj, include_collections=False):
+            changed = changed_columns(obj)
+            if changed:
+                pending.append((type(obj), ModelChange('update', object_id(obj), column_values(obj), changed)))
+    for obj in session.deleted:
+        if type(obj) in _listeners:
+            pending.append((type(obj), ModelChange('delete', object_id(obj), loaded_values(obj), None)))
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    pending = session.info.pop('model_changes', [])
+    by_model = {}
+    for model, change in pending:
+        by_model.setdefault(model, []).append(change)
+    for model, changes in by_model.items():
+        notify(model, changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('model_changes', None)
@@ -0,0 +1,198 @@
+"""
+Bulk moderation of properties and vendors.
+
+Admins select rows with a list of ids or a filter expression and
+activate, deactivate or delete all of them with one set-based statement
+(`moderate`), instead of one request and one transaction per row.
+
+A filter maps fields to a value (equality) or to {operator: value}, e.g.
+{"description": {"contains": "crypto"}, "date_created": {"gte": "2024-05-01"}}.
+Operators are eq, ne, in, contains (case-insensitive), lt, lte, gt and gte;
+only the fields of PROPERTY_FILTERS/VENDOR_FILTERS can be used, and an
+empty filter is refused so a typo can't select a whole table.
+
+Statements use RETURNING to get the affected rows, which are logged in
+the change feed and passed to the commit hooks (`notify`) so caches,
+facets and documents follow.
+Activating or deactivating only touches rows whose state changes.
+Deleting properties first deletes their favorites and image index rows
+(what the ON DELETE CASCADE of Favorite.property_id and
+PropertyImage.property_id does, also on SQLite where foreign keys aren't
+enforced) and skips properties with purchase requests, which
+would be left pointing at nothing.
+"""
+from datetime import datetime
+from sqlalchemy import and_, delete, exists, func, select, update
+from app.extensions import db
+from app.models.favorite import Favorite
+from app.models.property import Property
+from app.models.property_image import PropertyImage
+from app.models.purchase import Purchase
+from app.models.realtor import Realtor
+from app.services.model_events import ModelChange, notify
+from app.services.property_documents import refresh_documents
+from app.services.change_feed import record_changes
+
+ACTIONS = ('activate', 'deactivate', 'delete')
+
+# Most ids accepted in one request
+MAX_IDS = 5000
+
+PROPERTY_FILTERS = ('id', 'owner_id', 'realtor_id', 'location', 'address', 'description', 'category',
+                    'property_type', 'price', 'active', 'date_created', 'date_updated')
+VENDOR_FILTERS = ('id', 'vendor_id', 'company_name', 'description', 'category', 'location', 'email',
+                  'verified', 'active', 'date_created', 'date_updated')
+
+
+def _comparison(column, operator, value):
+    if isinstance(column.type, db.DateTime) and value is not None:
+        values = value if isinstance(value, list) else [value]
+        try:
+            values = [datetime.fromisoformat(item) for item in values]
+        except (TypeError, ValueError):
+            raise ValueError(f"{column.key} takes ISO 8601 dates")
+        value = values if isinstance(value, list) else values[0]
+
+    if operator == 'in':
+        if not isinstance(value, list):
+            raise ValueError(f"'in' takes a list ({column.key})")
+        return column.in_(value)
+    if isinstance(value, (list, dict)):
+        raise ValueError(f"'{operator}' takes a single value ({column.key})")
+    if operator == 'eq':
+        return column.is_(None) if value is None else column == value
+    if operator == 'ne':
+        return column.is_not(None) if value is None else column != value
+    if operator == 'contains':
+        return func.lower(column).contains(str(value).lower(), autoescape=True)
+    if operator == 'lt':
+        return column < value
+    if operator == 'lte':
+        return column <= value
+    if operator == 'gt':
+        return column > value
+    if operator == 'gte':
+        return column >= value
+    raise ValueError(f"Unknown operator '{operator}'")
+
+
+def _column(model, field):
+    if model is Property and field == 'realtor_id':
+        return Realtor.realtor_id
+    return getattr(model, field)
+
+
+def filter_condition(model, filters, allowed):
+    """SQL condition of a filter expression; ValueError when it is invalid"""
+    if not isinstance(filters, dict) or not filters:
+        raise ValueError("filter must be a non-empty object")
+    conditions = []
+    for field, test in filters.items():
+        if field not in allowed:
+            raise ValueError(f"Unknown filter field '{field}'")
+        if not isinstance(test, dict):
+            test = {'eq': test}
+        if not test:
+            raise ValueError(f"Empty filter for '{field}'")
+        column = _column(model, field)
+        condition = and_(*(_comparison(column, operator, value) for operator, value in test.items()))
+        if column is Realtor.realtor_id:
+            # Properties of the realtors with matching Firebase user ids
+            condition = Property.owner_id.in_(select(Realtor.id).where(condition))
+        conditions.append(condition)
+    return and_(*conditions)
+
+
+def selection_condition(model, data, allowed):
+    """Condition selecting `ids` or matching `filter` from a request body; ValueError when invalid"""
+    ids = data.get('ids')
+    if ids is not None:
+        if 'filter' in data:
+            raise ValueError("Send either ids or filter, not both")
+        if not isinstance(ids, list) or not ids or not all(isinstance(item, str) for item in ids):
+            raise ValueError("ids must be a non-empty list of ids")
+        if len(ids) > MAX_IDS:
+            raise ValueError(f"At most {MAX_IDS} ids per request")
+        return model.id.in_(ids)
+    if 'filter' not in data:
+        raise ValueError("Send ids or filter")
+    return filter_condition(model, data['filter'], allowed)
+
+
+def _returned_columns(model):
+    # Deferred columns (the property document) aren't needed by the hooks
+    return [column for column in model.__table__.c if column.key != 'document']
+
+
+def moderate(model, action, condition, dry_run=False):
+    """
+    Apply `action` to the rows of `model` matching `condition` in one
+    statement and commit. Returns the counts; with `dry_run`, only counts
+    what would be affected.
+    """
+    table = model.__table__
+    connection = db.session.connection()
+    matched = connection.execute(select(func.count()).select_from(table).where(condition)).scalar()
+    result = {"action": action, "matched": matched, "dry_run": dry_run}
+
+    if action == 'delete':
+        return _delete(model, condition, result, dry_run)
+
+    active = action == 'activate'
+    changing = and_(condition, table.c.active != active)
+    if dry_run:
+        result["affected"] = connection.execute(select(func.count()).select_from(table).where(changing)).scalar()
+        return result
+
+    now = datetime.utcnow()
+    rows = connection.execute(
+        update(table).where(changing).values(active=active, date_updated=now)
+        .returning(*_returned_columns(model))
+    ).mappings().all()
+    changes = [ModelChange('update', row['id'], dict(row), {'active', 'date_updated'}) for row in rows]
+    if model is Property and rows:
+        refresh_documents(connection, [row['id'] for row in rows])
+    record_changes(connection, model, changes)
+    db.session.commit()
+
+    result["affected"] = len(rows)
+    if changes:
+        notify(model, changes)
+    return result
+
+
+def _delete(model, condition, result, dry_run):
+    table = model.__table__
+    connection = db.session.connection()
+    if model is Property:
+        purchased = exists().where(Purchase.property_id == table.c.id)
+        result["skipped_with_purchases"] = connection.execute(
+            select(table.c.id).where(condition, purchased).limit(MAX_IDS)
+        ).scalars().all()
+        condition = and_(condition, ~purchased)
+        deletable = select(table.c.id).where(condition)
+        if dry_run:
+            result["affected"] = connection.execute(select(func.count()).select_from(deletable.subquery())).scalar()
+            result["favorites_deleted"] = connection.execute(
+                select(func.count()).select_from(Favorite).where(Favorite.property_id.in_(deletable))
+            ).scalar()
+            return result
+        result["favorites_deleted"] = connection.execute(
+            delete(Favorite.__table__).where(Favorite.property_id.in_(deletable))
+        ).rowcount
+        connection.execute(delete(PropertyImage.__table__).where(PropertyImage.property_id.in_(deletable)))
+    elif dry_run:
+        result["affected"] = result["matched"]
+        return result
+
+    rows = connection.execute(
+        delete(table).where(condition).returning(*_returned_columns(model))
+    ).mappings().all()
+    changes = [ModelChange('delete', row['id'], dict(row), None) for row in rows]
+    record_changes(connection, model, changes)
+    db.session.commit()
+
+    result["affected"] = len(rows)
+    if changes:
+        notify(model, changes)
+    return result
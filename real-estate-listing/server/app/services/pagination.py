@@ -0,0 +1,171 @@
+"""
+Keyset (cursor) pagination for listing endpoints.
+
+Clients opt in by sending a `cursor` query argument (empty for the first
+page). Pages are ordered newest first on (date_created, id) and every
+response carries an opaque `next_cursor` (None on the last page), so
+deep pages cost the same as the first one and no COUNT(*) is issued.
+Rows without a date_created come last, ordered by id; their cursors
+store a null date.
+The total number of pages is only computed when `include_total=true`
+is passed, and is then cached for a short time.
+"""
+import base64
+import json
+import math
+import threading
+from datetime import datetime
+from cachetools import TTLCache
+from flask import request, jsonify, abort, make_response
+from sqlalchemy import tuple_
+
+# Totals for `include_total=true`, keyed by compiled query and parameters
+_count_cache = TTLCache(maxsize=1024, ttl=60)
+_count_cache_lock = threading.Lock()
+
+
+class CursorPagination:
+    def __init__(self, items, next_cursor, pages=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        # None unless the client asked for the total
+        self.pages = pages
+
+
+def cursor_requested():
+    return 'cursor' in request.args
+
+
+def newest_first(key):
+    """Sort key of a (date_created, id) pair, for reverse sorting; undated items come last"""
+    return (key[0] is not None, key)
+
+
+def encode_cursor(date_created, item_id):
+    payload = json.dumps([date_created.isoformat() if date_created is not None else None, item_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (date_created or None, id) pair stored in `cursor`, raises ValueError if invalid"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_created, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(item_id, str):
+            raise ValueError
+        return (datetime.fromisoformat(date_created) if date_created is not None else None), item_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def paginate_by_cursor(query, model, per_page):
+    """
+    Return the page of `query` that follows the `cursor` request argument.
+    `model` must have `date_created` and `id` columns.
+    """
+    cursor = request.args.get('cursor', '')
+    include_total = request.args.get('include_total', 'false').lower() == 'true'
+
+    query = query.order_by(None)
+    pages = None
+    if include_total:
+        pages = math.ceil(cached_count(query) / per_page)
+
+    date_created = item_id = None
+    if cursor:
+        try:
+            date_created, item_id = decode_cursor(cursor)
+        except ValueError as e:
+            abort(make_response(jsonify({"message": str(e)}), 400))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = []
+    if not cursor or date_created is not None:
+        after = (date_created, item_id) if cursor else None
+        rows = dated_rows(query, model, after).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        # Then the rows without a date (NULL comparisons would drop them from the keyset predicate)
+        after_id = item_id if date_created is None else None
+        rows += undated_rows(query, model, after_id).limit(per_page + 1 - len(rows)).all()
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(last.date_created, last.id)
+
+    return CursorPagination(items, next_cursor, pages)
+
+
+def dated_rows(query, model, after=None):
+    """Rows of `query` with a date_created, newest first, after the (date_created, id) pair `after`"""
+    query = query.filter(model.date_created.is_not(None))
+    if after is not None:
+        query = query.filter(tuple_(model.date_created, model.id) < tuple_(*after))
+    return query.order_by(model.date_created.desc(), model.id.desc())
+
+
+def undated_rows(query, model, after_id=None):
+    """Rows of `query` without a date_created, by descending id, after `after_id`"""
+    query = query.filter(model.date_created.is_(None))
+    if after_id is not None:
+        query = query.filter(model.id < after_id)
+    return query.order_by(model.id.desc())
+
+
+def cached_count(query):
+    """COUNT(*) of `query`, cached for a minute"""
+    compiled = query.statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+
+    with _count_cache_lock:
+        if key in _count_cache:
+            return _count_cache[key]
+
+    count = query.count()
+    with _count_cache_lock:
+        _count_cache[key] = count
+    return count
+
+
+def with_next_cursor(response_data, pagination_result):
+    """Add `next_cursor` to a listing response when cursor pagination is used"""
+    if isinstance(pagination_result, CursorPagination):
+        response_data["next_cursor"] = pagination_result.next_cursor
+    return response_data
+
+
+class ListPagination:
+    def __init__(self, items, pages):
+        self.items = items
+        self.pages = pages
+
+
+def paginate_id_list(item_ids, sort_key, load, per_page, page_number=1):
+    """
+    Paginate a list of ids computed in memory (e.g. by the facet index).
+
+    `item_ids` is already in result order for offset pagination. In cursor
+    mode the ids are re-ordered newest first using `sort_key(id)`, which
+    returns the item's (date_created, id); undated items come last. `load(ids)` returns the rows for
+    a page of ids, in the same order.
+    """
+    if not cursor_requested():
+        start = (page_number - 1) * per_page
+        return ListPagination(load(item_ids[start:start + per_page]),
+                              math.ceil(len(item_ids) / per_page))
+
+    keys = sorted((sort_key(item_id) for item_id in item_ids), key=newest_first, reverse=True)
+    cursor = request.args.get('cursor', '')
+    if cursor:
+        try:
+            cursor_key = newest_first(decode_cursor(cursor))
+        except ValueError as e:
+            abort(make_response(jsonify({"message": str(e)}), 400))
+        keys = [key for key in keys if newest_first(key) < cursor_key]
+
+    page_keys = keys[:per_page]
+    next_cursor = encode_cursor(*page_keys[-1]) if len(keys) > per_page else None
+    pages = None
+    if request.args.get('include_total', 'false').lower() == 'true':
+        pages = math.ceil(len(item_ids) / per_page)
+    return CursorPagination(load([key[1] for key in page_keys]), next_cursor, pages)
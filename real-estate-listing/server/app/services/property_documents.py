@@ -0,0 +1,194 @@
+"""
+Materialized listing documents.
+
+Every property keeps its listing entry, already encoded as JSON, in
+`Property.document`: the columns of LISTING_FIELDS (except `views`, which
+changes without a write), its realtor's contact details and the variants
+of its images. Listing endpoints select only these documents and splice
+them into the response (`listing_response`), so a page costs no per-row
+serialization.
+
+Documents are rebuilt in the same transaction as the writes they depend
+on, from the session's `after_flush`: a property being created or
+updated, its realtor being updated, or variants of one of its images
+being saved. The listings showing an image are found through the
+PropertyImage table, kept in step with property_images by the same hook.
+Set-based writes must call `index_property_images` and
+`refresh_documents` themselves. Properties refreshed for their realtor
+or images are logged in the change feed as updates of those fields.
+A property without a document yet (e.g. before `upgrade_db.py` backfilled
+them) is serialized when it is listed.
+"""
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, delete, event, inspect, insert, select, update
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models.image_variant import ImageVariant, manifest
+from app.models.property import Property
+from app.models.property_image import PropertyImage
+from app.models.realtor import Realtor
+from app.services.change_feed import record_changes
+from app.services.model_events import ModelChange
+from app.services.serialization import LISTING_FIELDS, serialize_rows
+from app.services.image_variants import attach_image_variants
+
+DOCUMENT_FIELDS = tuple(field for field in LISTING_FIELDS if field != 'views')
+
+# Build documents for at most this many properties per query
+CHUNK_SIZE = 500
+
+
+def build_documents(connection, property_ids, date_updated=None):
+    """
+    Encoded documents of `property_ids`, read through `connection`; {id: json}.
+    `date_updated` replaces the stored one, for documents stored with a new version.
+    """
+    property_ids = list(property_ids)
+    table = Property.__table__
+    documents = {}
+    for start in range(0, len(property_ids), CHUNK_SIZE):
+        rows = connection.execute(
+            select(*(table.c[field] for field in DOCUMENT_FIELDS),
+                   Realtor.company_name, Realtor.company_mail, Realtor.contact, Realtor.realtor_id)
+            .select_from(table.outerjoin(Realtor.__table__, Realtor.id == table.c.owner_id))
+            .where(table.c.id.in_(property_ids[start:start + CHUNK_SIZE]))
+        ).all()
+
+        urls = list({url for row in rows for url in row.property_images or [] if isinstance(url, str)})
+        manifests = {}
+        for url_start in range(0, len(urls), CHUNK_SIZE):
+            for variant in connection.execute(
+                select(ImageVariant.url, ImageVariant.width, ImageVariant.height, ImageVariant.variants)
+                .where(ImageVariant.url.in_(urls[url_start:url_start + CHUNK_SIZE]))
+            ):
+                manifests[variant.url] = manifest(variant.width, variant.height,
+                                                  json.loads(variant.variants) if variant.variants else {})
+
+        for row in rows:
+            document = {field: row._mapping[field] for field in DOCUMENT_FIELDS}
+            if date_updated is not None:
+                document["date_updated"] = date_updated
+            document["image_variants"] = [manifests.get(url) if isinstance(url, str) else None
+                                          for url in row.property_images or []]
+            if row.realtor_id is not None:
+                document["realtor"] = {
+                    "contact_name": row.company_name,
+                    "contact_email": row.company_mail,
+                    "contact_phone": row.contact,
+                    "realtor_id": row.realtor_id,
+                }
+            documents[row.id] = current_app.json.dumps(document)
+    return documents
+
+
+def refresh_documents(connection, property_ids, new_version=True):
+    """
+    Rebuild and store the documents of `property_ids`. Their content may
+    have changed (e.g. the realtor's contact), so this is a new version,
+    unless `new_version` is False (documents built for unchanged rows).
+    """
+    date_updated = datetime.utcnow() if new_version else None
+    documents = build_documents(connection, property_ids, date_updated)
+    if not documents:
+        return
+    table = Property.__table__
+    # Without a new version, keep date_updated rather than let its onupdate default stamp it
+    connection.execute(
+        update(table).where(table.c.id == bindparam('property_id'))
+        .values(document=bindparam('document'), date_updated=date_updated or table.c.date_updated),
+        [{'property_id': property_id, 'document': document}
+         for property_id, document in sorted(documents.items())]
+    )
+
+
+def index_property_images(connection, images_by_id):
+    """Replace the PropertyImage rows of the properties in `images_by_id` ({id: property_images})"""
+    if not images_by_id:
+        return
+    table = PropertyImage.__table__
+    property_ids = sorted(images_by_id)
+    for start in range(0, len(property_ids), CHUNK_SIZE):
+        connection.execute(delete(table).where(table.c.property_id.in_(property_ids[start:start + CHUNK_SIZE])))
+    rows = [{'property_id': property_id, 'url': url} for property_id in property_ids
+            for url in dict.fromkeys(url for url in images_by_id[property_id] or [] if isinstance(url, str))]
+    if rows:
+        connection.execute(insert(table), rows)
+
+
+def properties_showing(urls):
+    """Query of the ids of the properties whose images include one of `urls`"""
+    return select(PropertyImage.property_id).where(PropertyImage.url.in_(urls))
+
+
+def listing_items(rows, fields):
+    """
+    Entries of a listing page from rows selected by `serialization.project`:
+    documents when `fields` is None, dicts of the requested fields otherwise.
+    """
+    if fields is not None:
+        items = serialize_rows(rows, fields)
+        if 'image_variants' in fields:
+            attach_image_variants(items)
+        return items
+
+    rows = list(rows)
+    missing = [row.id for row in rows if row.document is None]
+    built = build_documents(db.session.connection(), missing) if missing else {}
+    return [row.document if row.document is not None else built[row.id]
+            for row in rows if row.document is not None or row.id in built]
+
+
+def listing_response(payload, key, items):
+    """
+    JSON response of `payload` with `items` (encoded documents or dicts)
+    under `key`, or of just the list of `items` when `key` is None.
+    """
+    dumps = current_app.json.dumps
+    body = '[' + ','.join(item if isinstance(item, str) else dumps(item) for item in items) + ']'
+    if key is not None:
+        head = dumps(payload)
+        body = f"{head[:-1]}{',' if len(head) > 2 else ''}{dumps(key)}:{body}}}"
+    return current_app.response_class(body + '\n', mimetype=current_app.json.mimetype)
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_changed_documents(session, flush_context):
+    property_ids = set()
+    realtor_ids = set()
+    image_urls = set()
+    images_by_id = {}
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Property):
+            if obj in session.new or session.is_modified(obj, include_collections=False):
+                property_ids.add(obj.id)
+            if obj in session.new or inspect(obj).attrs.property_images.history.has_changes():
+                images_by_id[obj.id] = obj.property_images
+        elif isinstance(obj, Realtor):
+            if obj not in session.new and session.is_modified(obj, include_collections=False):
+                realtor_ids.add(obj.id)
+        elif isinstance(obj, ImageVariant):
+            image_urls.add(obj.url)
+    for obj in session.deleted:
+        if isinstance(obj, Property):
+            images_by_id[obj.id] = []
+    if not (property_ids or realtor_ids or image_urls or images_by_id):
+        return
+
+    connection = session.connection()
+    table = Property.__table__
+    index_property_images(connection, images_by_id)
+    # Listings whose document changes with their realtor or images: {id: changed document fields}
+    refreshed = {}
+    if realtor_ids:
+        for property_id in connection.execute(select(table.c.id).where(table.c.owner_id.in_(realtor_ids))).scalars():
+            refreshed.setdefault(property_id, set()).add('realtor')
+    if image_urls:
+        for property_id in connection.execute(properties_showing(image_urls)).scalars():
+            refreshed.setdefault(property_id, set()).add('image_variants')
+    if property_ids or refreshed:
+        refresh_documents(connection, property_ids | refreshed.keys())
+    # The change feed logs the properties that changed themselves; the others change through their documents
+    record_changes(connection, Property, [ModelChange('update', property_id, {}, fields)
+                                          for property_id, fields in refreshed.items() if property_id not in property_ids])
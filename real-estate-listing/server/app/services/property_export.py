@@ -0,0 +1,114 @@
+"""
+Streaming export of the property catalogue.
+
+`export_rows` reads properties joined with their realtor in one query,
+ordered by (date_updated, id), in batches of EXPORT_BATCH_SIZE rows
+(`yield_per`, a server-side cursor on PostgreSQL), so memory stays flat
+however large the catalogue is. `ndjson_lines` and `csv_lines` encode the
+rows as they are read, for a streamed response or a file.
+
+Filters match the admin listing (`include_inactive`); `updated_since`
+only exports properties modified at or after a time. Rows come in
+`date_updated` order, so an incremental pull can pass the `date_updated`
+of the last row it received (rows updated in that same instant are sent
+again rather than missed).
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import select
+from app.extensions import db
+from app.models.property import Property
+from app.models.realtor import Realtor
+from app.services.serialization import LISTING_FIELDS
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# Rows fetched from the database at a time
+EXPORT_BATCH_SIZE = 1000
+
+# Realtor columns exported with each property: (field, column)
+REALTOR_FIELDS = (
+    ('company_name', Realtor.company_name),
+    ('contact_email', Realtor.company_mail),
+    ('contact_phone', Realtor.contact),
+    ('realtor_id', Realtor.realtor_id),
+)
+
+CSV_COLUMNS = LISTING_FIELDS + tuple(f"realtor_{field}" for field, _ in REALTOR_FIELDS)
+
+
+def parse_updated_since(value):
+    """Datetime of an `updated_since` argument (ISO 8601), None if absent; ValueError if invalid"""
+    if not value:
+        return None
+    since = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    # Stored times are naive UTC
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def export_query(include_inactive=False, updated_since=None):
+    table = Property.__table__
+    query = (select(*(table.c[field] for field in LISTING_FIELDS),
+                    *(column.label(f"realtor_{field}") for field, column in REALTOR_FIELDS))
+             .select_from(table.outerjoin(Realtor.__table__, Realtor.id == table.c.owner_id)))
+    if not include_inactive:
+        query = query.where(table.c.active == True)
+    if updated_since is not None:
+        query = query.where(table.c.date_updated >= updated_since)
+    return query.order_by(table.c.date_updated, table.c.id)
+
+
+def export_rows(include_inactive=False, updated_since=None, batch_size=EXPORT_BATCH_SIZE):
+    """Exported properties as dicts (realtor details under `realtor`), read `batch_size` rows at a time"""
+    result = db.session.execute(
+        export_query(include_inactive, updated_since).execution_options(yield_per=batch_size)
+    )
+    try:
+        for row in result:
+            values = row._mapping
+            item = {field: values[field] for field in LISTING_FIELDS}
+            for field in ('date_created', 'date_updated'):
+                if item[field] is not None:
+                    item[field] = item[field].isoformat()
+            item['views'] = item['views'] or 0
+            if values['realtor_realtor_id'] is not None:
+                item['realtor'] = {field: values[f"realtor_{field}"] for field, _ in REALTOR_FIELDS}
+            yield item
+    finally:
+        result.close()
+
+
+def ndjson_lines(rows):
+    dumps = current_app.json.dumps
+    for row in rows:
+        yield dumps(row) + '\n'
+
+
+def csv_lines(rows):
+    """CSV with a header row; lists (the image URLs) are written as JSON"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for row in rows:
+        realtor = row.get('realtor') or {}
+        writer.writerow([json.dumps(row[field]) if isinstance(row[field], list) else row[field]
+                         for field in LISTING_FIELDS] +
+                        [realtor.get(field) for field, _ in REALTOR_FIELDS])
+        yield flush()
+
+
+def export_lines(export_format, rows):
+    return csv_lines(rows) if export_format == 'csv' else ndjson_lines(rows)
@@ -0,0 +1,300 @@
+"""
+Bulk import of properties from NDJSON or CSV.
+
+Rows are read from a stream as they arrive (`read_rows`), validated, and
+written in batches of IMPORT_BATCH_SIZE: the owners of a batch are
+resolved with one query, missing realtors are created with one
+executemany INSERT, and the properties with another, in one transaction
+per batch. Documents are built, changes logged and commit hooks notified
+for the batch as a whole (see app/services/property_documents.py,
+app/services/change_feed.py and app/services/model_events.py).
+
+Rows take the fields of `create_property`. The owner is the realtor with
+the row's `owner_id`, or with its `realtor.realtor_id` (created from the
+row's realtor details if it doesn't exist yet), or the importer's default
+realtor. Exports (app/services/property_export.py) can be imported again,
+`id`s included; fields that are derived or managed by the server (views,
+dates, acreage) are ignored.
+
+A row with errors is skipped and reported with its line number; a batch
+the database rejects is rolled back and all its rows are reported.
+"""
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from sqlalchemy import insert, select
+from app.extensions import db
+from app.models.property import Property, parse_acreage
+from app.models.realtor import Realtor
+from app.services.model_events import ModelChange, notify
+from app.services.property_documents import index_property_images, refresh_documents
+from app.services.change_feed import record_changes
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+REQUIRED_FIELDS = ('location', 'description', 'address', 'bedrooms', 'bathrooms', 'category', 'price',
+                   'property_type')
+TEXT_FIELDS = ('location', 'description', 'address', 'category', 'property_type', 'size')
+INTEGER_FIELDS = ('bedrooms', 'bathrooms')
+
+# Realtor details of a row: nested under `realtor` (NDJSON exports) or as `realtor_*` columns (CSV exports)
+REALTOR_FIELDS = ('realtor_id', 'company_name', 'contact_email', 'contact_phone')
+
+# Report at most this many failed rows in detail
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.realtors_created = 0
+        self.errors = []
+
+    def fail(self, line, errors, property_id=None):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line, "id": property_id, "errors": errors})
+
+    def serialize(self):
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "realtors_created": self.realtors_created,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def read_rows(stream, import_format):
+    """(line number, row dict or None if unparseable) for each record of a binary `stream`"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if import_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _realtor_details(row):
+    realtor = row.get('realtor')
+    if isinstance(realtor, dict):
+        return {field: realtor.get(field) or None for field in REALTOR_FIELDS}
+    return {field: row.get(f"realtor_{field}") or None for field in REALTOR_FIELDS}
+
+
+def _parse_images(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        # CSV cells hold a JSON array
+        value = json.loads(value)
+    if not isinstance(value, list) or not all(isinstance(url, str) for url in value):
+        raise ValueError
+    return value
+
+
+def _parse_active(value):
+    if value in (None, ''):
+        return True
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in ('true', '1', 'yes'):
+        return True
+    if str(value).strip().lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError
+
+
+def validate_row(row):
+    """(property values, realtor details, errors) of a raw row"""
+    errors = []
+    values = {}
+    for field in REQUIRED_FIELDS:
+        if row.get(field) in (None, ''):
+            errors.append(f"{field} is required")
+
+    for field in TEXT_FIELDS:
+        value = row.get(field)
+        values[field] = None if value in (None, '') else str(value)
+    for field in INTEGER_FIELDS:
+        value = row.get(field)
+        if value in (None, ''):
+            continue
+        try:
+            number = float(value)
+            if not number.is_integer():
+                raise ValueError
+            values[field] = int(number)
+        except (TypeError, ValueError):
+            errors.append(f"{field} must be an integer")
+    if row.get('price') not in (None, ''):
+        try:
+            values['price'] = float(row['price'])
+        except (TypeError, ValueError):
+            errors.append("price must be a number")
+    try:
+        values['property_images'] = _parse_images(row.get('property_images'))
+    except ValueError:
+        errors.append("property_images must be a list of URLs")
+    try:
+        values['active'] = _parse_active(row.get('active'))
+    except ValueError:
+        errors.append("active must be true or false")
+
+    values['id'] = str(row['id']) if row.get('id') else None
+    values['owner_id'] = str(row['owner_id']) if row.get('owner_id') else None
+    values['acreage'], values['size_unit'] = parse_acreage(values.get('size'))
+    return values, _realtor_details(row), errors
+
+
+def _created(rows):
+    return [ModelChange('create', row['id'], row, None) for row in rows]
+
+
+class PropertyImporter:
+    """Imports rows in batches; `default_realtor_id` owns rows that don't name a realtor"""
+
+    def __init__(self, batch_size=500, default_realtor_id=None):
+        self.batch_size = batch_size
+        self.default_realtor_id = default_realtor_id
+        self.report = ImportReport()
+        self._seen_ids = set()
+        # Firebase user id -> Realtor.id, for owners resolved by earlier batches
+        self._realtors = {}
+
+    def run(self, rows):
+        """Import (line number, row) pairs; returns the ImportReport"""
+        batch = []
+        for line, row in rows:
+            if row is None:
+                self.report.fail(line, ["Row could not be parsed"])
+                continue
+            values, realtor, errors = validate_row(row)
+            if values['id'] is not None:
+                if values['id'] in self._seen_ids:
+                    errors.append("Duplicate id in this import")
+                self._seen_ids.add(values['id'])
+            if errors:
+                self.report.fail(line, errors, values['id'])
+                continue
+            batch.append((line, values, realtor))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+        return self.report
+
+    def _import_batch(self, batch):
+        resolved = dict(self._realtors)
+        try:
+            rows, realtor_rows, rejected = self._write_batch(batch)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # Realtors created by this batch were rolled back too
+            self._realtors = resolved
+            print(f"[IMPORT] Batch of {len(batch)} rows failed: {e}")
+            for line, values, _ in batch:
+                self.report.fail(line, [f"Batch rejected by the database: {e}"], values['id'])
+            return
+
+        for line, property_id, error in rejected:
+            self.report.fail(line, [error], property_id)
+        self.report.imported += len(rows)
+        self.report.realtors_created += len(realtor_rows)
+        if realtor_rows:
+            notify(Realtor, _created(realtor_rows))
+        if rows:
+            notify(Property, _created(rows))
+
+    def _write_batch(self, batch):
+        """Insert a batch; (property rows, realtor rows, rejected (line, id, error)s)"""
+        connection = db.session.connection()
+        now = datetime.utcnow()
+        realtor_rows = self._resolve_realtors(connection, batch, now)
+
+        owner_ids = {values['owner_id'] for _, values, _ in batch if values['owner_id']}
+        known_owners = set(connection.execute(
+            select(Realtor.id).where(Realtor.id.in_(owner_ids))
+        ).scalars()) if owner_ids else set()
+        given_ids = [values['id'] for _, values, _ in batch if values['id']]
+        existing_ids = set(connection.execute(
+            select(Property.id).where(Property.id.in_(given_ids))
+        ).scalars()) if given_ids else set()
+
+        rows = []
+        rejected = []
+        for line, values, realtor in batch:
+            if values['id'] in existing_ids:
+                rejected.append((line, values['id'], "A property with this id already exists"))
+                continue
+            owner_id = values['owner_id']
+            if owner_id is None:
+                realtor_id = realtor['realtor_id'] or self.default_realtor_id
+                owner_id = self._realtors.get(realtor_id)
+                if owner_id is None:
+                    rejected.append((line, values['id'], f"Unknown realtor {realtor_id} (company_name is needed to create it)"
+                                     if realtor_id else "No realtor: set owner_id or realtor_id"))
+                    continue
+            elif owner_id not in known_owners:
+                rejected.append((line, values['id'], f"Unknown owner_id {owner_id}"))
+                continue
+            rows.append(dict(values, id=values['id'] or str(uuid.uuid4()), owner_id=owner_id,
+                             date_created=now, date_updated=now, views=0))
+
+        if realtor_rows:
+            connection.execute(insert(Realtor), realtor_rows)
+            record_changes(connection, Realtor, _created(realtor_rows))
+        if rows:
+            connection.execute(insert(Property), rows)
+            index_property_images(connection, {row['id']: row['property_images'] for row in rows})
+            refresh_documents(connection, [row['id'] for row in rows])
+            record_changes(connection, Property, _created(rows))
+        return rows, realtor_rows, rejected
+
+    def _resolve_realtors(self, connection, batch, now):
+        """Map the batch's realtors to Realtor.id with one query; rows of the realtors to create"""
+        wanted = {realtor['realtor_id'] for _, values, realtor in batch
+                  if values['owner_id'] is None and realtor['realtor_id']}
+        if self.default_realtor_id:
+            wanted.add(self.default_realtor_id)
+        wanted -= set(self._realtors)
+        if not wanted:
+            return []
+
+        self._realtors.update(connection.execute(
+            select(Realtor.realtor_id, Realtor.id).where(Realtor.realtor_id.in_(wanted))
+        ).all())
+        created = []
+        for _, values, realtor in batch:
+            realtor_id = realtor['realtor_id']
+            if realtor_id not in wanted or realtor_id in self._realtors or not realtor['company_name']:
+                continue
+            row = {
+                'id': str(uuid.uuid4()),
+                'realtor_id': realtor_id,
+                'company_name': realtor['company_name'],
+                'description': 'Property seller',
+                'profile_picture': '',
+                'company_mail': realtor['contact_email'],
+                'website_url': '',
+                'contact': realtor['contact_phone'] or '',
+                'active': True,
+                'date_created': now,
+                'date_updated': now,
+            }
+            self._realtors[realtor_id] = row['id']
+            created.append(row)
+        return created
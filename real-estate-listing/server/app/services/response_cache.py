@@ -0,0 +1,373 @@
+"""
+Tiered cache for public read endpoints.
+
+Responses are kept in an in-process LRU (RESPONSE_CACHE_SIZE entries, for
+at most RESPONSE_CACHE_TTL seconds) in front of an optional Redis tier
+shared by all workers (CACHE_REDIS_URL). Without Redis only the local tier
+is used.
+
+Every entry is stored with tags, e.g. 'properties' for listings or
+'property:<id>' for a detail page. Each tag has a version number that is
+bumped when the data behind it is written; an entry is only served while
+the versions it was computed under are current. The versions are read
+before computing an entry, so a write committed while a request computes
+it can't be hidden by that request's result. With Redis the versions live
+in Redis (one MGET per lookup), so a write in one worker invalidates the
+local tier of all of them.
+
+Misses are single-flight: while one thread computes an entry, other
+threads asking for the same key (and tag versions) wait for its result
+instead of running the same queries. With Redis and CACHE_REDIS_LOCK, the
+computing thread also holds a lock in Redis, and other workers poll the
+Redis tier for its result. Waiting is bounded by CACHE_FLIGHT_TIMEOUT,
+after which a request computes the entry itself. `stats` counts computed
+and coalesced requests.
+
+Property, Realtor, Blog, Vendor and ImageVariant commits bump the tags
+(see `invalidate_*` below). Set-based writes must call `notify()` (see
+app/services/model_events.py) for their changes to be seen here.
+"""
+import functools
+import json
+import threading
+import time
+from cachetools import TTLCache
+from flask import current_app, has_app_context, make_response, request
+from werkzeug.http import parse_date
+from app.models.blog import Blog
+from app.models.image_variant import ImageVariant
+from app.models.property import Property
+from app.models.realtor import Realtor
+from app.models.vendor import Vendor
+from app.services.conditional import not_modified, unchanged, with_validators
+from app.services.model_events import on_commit
+
+# Redis import (optional - only if CACHE_REDIS_URL is set)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+# Seconds between checks of the Redis tier while another worker computes an entry
+REMOTE_POLL_INTERVAL = 0.05
+
+
+class Flight:
+    """One computation of an entry, shared by the threads waiting for it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class TieredCache:
+    def __init__(self, size=1024, ttl=60, remote=None, remote_ttl=300, namespace='response-cache',
+                 flight_timeout=10, remote_lock=True):
+        # key -> (tag versions, value); TTLCache evicts the least recently used entry when full
+        self._local = TTLCache(maxsize=size, ttl=ttl)
+        self._versions = {}  # tag -> version, when there is no remote tier
+        self._flights = {}   # (key, tag versions) -> Flight being computed
+        self._lock = threading.Lock()
+        self.remote = remote
+        self.remote_ttl = remote_ttl
+        self.namespace = namespace
+        self.flight_timeout = flight_timeout
+        self.remote_lock = remote_lock
+        self.stats = {'local_hits': 0, 'remote_hits': 0, 'misses': 0, 'computed': 0, 'coalesced': 0,
+                      'remote_coalesced': 0, 'invalidations': 0, 'errors': 0}
+
+    def fetch(self, key, tags, compute):
+        """Cached value of `key`, calling `compute()` to fill it on a miss (None is not cached)"""
+        versions = self.tag_versions(tags)
+        if versions is None:
+            # The remote tier is down and entries can't be validated: don't cache
+            return compute()
+
+        with self._lock:
+            entry = self._local.get(key)
+        if entry is not None and entry[0] == versions:
+            self._count('local_hits')
+            return entry[1]
+
+        value = self._remote_get(key, versions)
+        if value is not None:
+            self._count('remote_hits')
+            with self._lock:
+                self._local[key] = (versions, value)
+            return value
+
+        self._count('misses')
+        with self._lock:
+            flight = self._flights.get((key, versions))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(key, versions)] = Flight()
+        if not leader:
+            # Another thread is computing this entry, reuse its result
+            if flight.done.wait(self.flight_timeout) and flight.value is not None:
+                self._count('coalesced')
+                return flight.value
+            self._count('computed')
+            return compute()
+
+        try:
+            value = self._compute_once(key, versions, compute)
+            if value is not None:
+                with self._lock:
+                    self._local[key] = (versions, value)
+            flight.value = value
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop((key, versions), None)
+            flight.done.set()
+
+    def _compute_once(self, key, versions, compute):
+        """Compute an entry and store it in Redis, unless another worker already is"""
+        if self.remote is None or not self.remote_lock:
+            return self._compute(key, versions, compute)
+
+        try:
+            lock = self.remote.lock(f"{self.namespace}:lock:{key}", timeout=self.flight_timeout)
+            acquired = lock.acquire(blocking=False)
+        except Exception as e:
+            self._count('errors')
+            print(f"[CACHE] Failed to lock {key} in Redis: {e}")
+            return self._compute(key, versions, compute)
+
+        if acquired:
+            try:
+                return self._compute(key, versions, compute)
+            finally:
+                try:
+                    lock.release()
+                except Exception:
+                    # Expired while computing, another worker may have taken over
+                    pass
+
+        # Another worker is computing this entry, wait for it to show up in Redis
+        deadline = time.monotonic() + self.flight_timeout
+        while time.monotonic() < deadline:
+            time.sleep(REMOTE_POLL_INTERVAL)
+            value = self._remote_get(key, versions)
+            if value is not None:
+                self._count('remote_coalesced')
+                return value
+            try:
+                if not lock.locked():
+                    break
+            except Exception:
+                break
+        return self._compute(key, versions, compute)
+
+    def _compute(self, key, versions, compute):
+        self._count('computed')
+        value = compute()
+        if value is not None:
+            self._remote_set(key, versions, value)
+        return value
+
+    def invalidate(self, tags):
+        """Make entries carrying any of `tags` stale, in every worker"""
+        tags = set(tags)
+        if not tags:
+            return
+        self._count('invalidations', len(tags))
+        if self.remote is None:
+            with self._lock:
+                for tag in tags:
+                    self._versions[tag] = self._versions.get(tag, 0) + 1
+            return
+        try:
+            pipeline = self.remote.pipeline(transaction=False)
+            for tag in sorted(tags):
+                pipeline.incr(self._tag_key(tag))
+            pipeline.execute()
+        except Exception as e:
+            self._count('errors')
+            print(f"[CACHE] Failed to invalidate {', '.join(sorted(tags))}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    def _tag_key(self, tag):
+        return f"{self.namespace}:tag:{tag}"
+
+    def _entry_key(self, key):
+        return f"{self.namespace}:entry:{key}"
+
+    def tag_versions(self, tags):
+        """Current versions of `tags`; None when Redis can't be reached"""
+        if self.remote is None:
+            with self._lock:
+                return tuple(self._versions.get(tag, 0) for tag in tags)
+        try:
+            return tuple(int(version or 0) for version in self.remote.mget([self._tag_key(tag) for tag in tags]))
+        except Exception as e:
+            self._count('errors')
+            print(f"[CACHE] Redis unavailable, not caching: {e}")
+            return None
+
+    def _remote_get(self, key, versions):
+        if self.remote is None:
+            return None
+        try:
+            raw = self.remote.get(self._entry_key(key))
+            if raw is None:
+                return None
+            stored = json.loads(raw)
+            return stored['value'] if tuple(stored['versions']) == versions else None
+        except Exception as e:
+            self._count('errors')
+            print(f"[CACHE] Failed to read {key} from Redis: {e}")
+            return None
+
+    def _remote_set(self, key, versions, value):
+        if self.remote is None:
+            return
+        try:
+            self.remote.set(self._entry_key(key),
+                            current_app.json.dumps({'versions': versions, 'value': value}),
+                            ex=self.remote_ttl)
+        except Exception as e:
+            self._count('errors')
+            print(f"[CACHE] Failed to write {key} to Redis: {e}")
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+
+def request_key():
+    """Cache key of the current request: endpoint, URL arguments and sorted query arguments"""
+    view_args = sorted((request.view_args or {}).items())
+    query_args = sorted(request.args.items(multi=True))
+    return json.dumps([request.endpoint, view_args, query_args], separators=(',', ':'))
+
+
+def cached(key, tags, compute):
+    """`compute()`, from the response cache when it is enabled. Don't modify the value returned."""
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        return compute()
+    return cache.fetch(key, tags, compute)
+
+
+def cached_response(*tags):
+    """
+    Decorator caching the JSON body of a view's 200 responses, with their
+    ETag and Last-Modified, which conditional requests are checked against,
+    and their compressed bodies.
+    Tags are formatted with the view's arguments, e.g. 'property:{property_id}'.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get('response_cache')
+            if cache is None:
+                return fn(*args, **kwargs)
+
+            uncacheable = []
+
+            def compute():
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200 or not response.is_json:
+                    uncacheable.append(response)
+                    return None
+                return {
+                    'body': response.get_data(as_text=True),
+                    'etag': response.get_etag()[0],
+                    'last_modified': response.headers.get('Last-Modified'),
+                    # Compressed bodies by encoding, added by app/middleware/compression.py
+                    # (kept in-process: they are added after the entry is written to Redis)
+                    'compressed': {},
+                }
+
+            entry = cache.fetch(request_key(), [tag.format(**kwargs) for tag in tags], compute)
+            if entry is None:
+                # Requests coalesced with an uncacheable one compute their own response
+                return uncacheable[0] if uncacheable else fn(*args, **kwargs)
+
+            last_modified = parse_date(entry['last_modified']) if entry['last_modified'] else None
+            if entry['etag'] is not None and unchanged(entry['etag'], last_modified):
+                return not_modified(entry['etag'], last_modified)
+            response = current_app.response_class(entry['body'], status=200, mimetype='application/json')
+            response.precompressed = entry.setdefault('compressed', {})
+            if entry['etag'] is None:
+                return response
+            return with_validators(response, entry['etag'], last_modified)
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get('response_cache')
+    if cache is not None:
+        cache.invalidate(tags)
+
+
+def tag_version(tag):
+    """Current version of `tag`; None when the response cache is disabled or Redis can't be reached"""
+    cache = current_app.extensions.get('response_cache') if has_app_context() else None
+    if cache is None:
+        return None
+    versions = cache.tag_versions((tag,))
+    return versions[0] if versions is not None else None
+
+
+@on_commit(Property)
+def invalidate_properties(changes):
+    invalidate('properties', *(f"property:{change.id}" for change in changes))
+
+
+@on_commit(Realtor)
+def invalidate_realtors(changes):
+    # Property detail pages and listing documents include their realtor's contact details
+    invalidate('realtors')
+
+
+@on_commit(Blog)
+def invalidate_blogs(changes):
+    invalidate('blogs', *(f"blog:{change.id}" for change in changes))
+
+
+@on_commit(Vendor)
+def invalidate_vendors(changes):
+    invalidate('vendors', *(f"vendor:{change.id}" for change in changes))
+
+
+@on_commit(ImageVariant)
+def invalidate_image_variants(changes):
+    # Listings include the variants of their images, which are generated after upload
+    invalidate('image_variants')
+
+
+def init_response_cache(app):
+    """In-process response cache, backed by Redis when CACHE_REDIS_URL is set"""
+    if not app.config.get('RESPONSE_CACHE_ENABLED', True):
+        return None
+
+    remote = None
+    redis_url = app.config.get('CACHE_REDIS_URL')
+    if redis_url:
+        if REDIS_AVAILABLE:
+            remote = redis.Redis.from_url(redis_url, socket_timeout=app.config.get('CACHE_REDIS_TIMEOUT', 0.5))
+        else:
+            print("⚠️  Warning: CACHE_REDIS_URL is set but the redis package is not installed, caching in-process only")
+
+    cache = TieredCache(
+        size=app.config.get('RESPONSE_CACHE_SIZE', 1024),
+        ttl=app.config.get('RESPONSE_CACHE_TTL', 60),
+        remote=remote,
+        remote_ttl=app.config.get('CACHE_REDIS_TTL', 300),
+        flight_timeout=app.config.get('CACHE_FLIGHT_TIMEOUT', 10),
+        remote_lock=app.config.get('CACHE_REDIS_LOCK', True),
+    )
+    app.extensions['response_cache'] = cache
+    print(f"[CACHE] Response cache: in-process{' + redis' if remote is not None else ''}")
+    return cache
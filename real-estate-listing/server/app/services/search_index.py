@@ -0,0 +1,177 @@
+"""
+Full-text search over property listings.
+
+SQLite uses an external-content FTS5 table (`property_fts`) kept in sync with
+the `property` table by triggers. PostgreSQL uses a GIN index over a
+tsvector expression, which the database maintains on every write.
+If neither is available the search falls back to LIKE filters.
+"""
+import re
+import time
+from sqlalchemy import text, inspect, func, or_, Float, literal_column
+from app.extensions import db
+from app.models.property import Property
+
+# Columns indexed for search, in the order used by the FTS5 table
+SEARCH_COLUMNS = ('location', 'category', 'description', 'address')
+
+# bm25() weights for SEARCH_COLUMNS (higher = more important)
+SQLITE_COLUMN_WEIGHTS = (4.0, 2.0, 1.0, 3.0)
+
+# The exact same expression must be used by the index and the query,
+# otherwise PostgreSQL will not use the GIN index.
+POSTGRES_DOCUMENT_SQL = (
+    "(setweight(to_tsvector('english', coalesce(property.location, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(property.address, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(property.category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(property.description, '')), 'C'))"
+)
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS property_fts USING fts5(
+        location, category, description, address,
+        content='property', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS property_fts_ai AFTER INSERT ON property BEGIN
+        INSERT INTO property_fts(rowid, location, category, description, address)
+        VALUES (new.rowid, new.location, new.category, new.description, new.address);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS property_fts_ad AFTER DELETE ON property BEGIN
+        INSERT INTO property_fts(property_fts, rowid, location, category, description, address)
+        VALUES ('delete', old.rowid, old.location, old.category, old.description, old.address);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS property_fts_au
+    AFTER UPDATE OF location, category, description, address ON property BEGIN
+        INSERT INTO property_fts(property_fts, rowid, location, category, description, address)
+        VALUES ('delete', old.rowid, old.location, old.category, old.description, old.address);
+        INSERT INTO property_fts(rowid, location, category, description, address)
+        VALUES (new.rowid, new.location, new.category, new.description, new.address);
+    END
+    """,
+]
+
+POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_property_search ON property USING GIN ({POSTGRES_DOCUMENT_SQL})",
+]
+
+# Seconds before checking again for an index that wasn't usable
+# (e.g. the app started before init_db.py created the tables)
+INDEX_RETRY_SECONDS = 60
+
+# Engine url -> True if the full-text index is usable on that database,
+# or the time.monotonic() of the last check that found it wasn't
+_index_ready = {}
+
+
+def _unavailable(engine):
+    _index_ready[str(engine.url)] = time.monotonic()
+    return False
+
+
+def ensure_search_index():
+    """
+    Create the full-text index (and its sync triggers on SQLite) if missing.
+    Safe to call on every start-up. Must run inside an app context.
+    """
+    engine = db.engine
+    dialect = engine.dialect.name
+
+    if not inspect(engine).has_table('property'):
+        # Tables not created yet (run init_db.py first)
+        return _unavailable(engine)
+
+    try:
+        with engine.begin() as connection:
+            if dialect == 'sqlite':
+                is_new = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'property_fts'"
+                )).first() is None
+                for statement in SQLITE_DDL:
+                    connection.execute(text(statement))
+                if is_new:
+                    # Index rows that existed before the FTS table was created
+                    connection.execute(text("INSERT INTO property_fts(property_fts) VALUES ('rebuild')"))
+            elif dialect == 'postgresql':
+                for statement in POSTGRES_DDL:
+                    connection.execute(text(statement))
+            else:
+                return _unavailable(engine)
+    except Exception as e:
+        print(f"[SEARCH] Full-text index unavailable, falling back to LIKE search: {e}")
+        return _unavailable(engine)
+
+    _index_ready[str(engine.url)] = True
+    return True
+
+
+def rebuild_search_index():
+    """Rebuild the SQLite FTS table from scratch (e.g. after a VACUUM)."""
+    if db.engine.dialect.name != 'sqlite':
+        return
+    with db.engine.begin() as connection:
+        connection.execute(text("INSERT INTO property_fts(property_fts) VALUES ('rebuild')"))
+
+
+def search_index_ready():
+    state = _index_ready.get(str(db.engine.url))
+    if state is True:
+        return True
+    if state is None or time.monotonic() - state >= INDEX_RETRY_SECONDS:
+        return ensure_search_index()
+    return False
+
+
+def tokenize(search_text):
+    return re.findall(r'\w+', (search_text or '').lower())
+
+
+def apply_full_text_search(query, search_text):
+    """
+    Restrict `query` (a Property query) to rows matching `search_text`,
+    ordered by relevance. Every search token must match, as a prefix,
+    in at least one of the indexed columns.
+    """
+    tokens = tokenize(search_text)
+    if not tokens:
+        return query
+
+    if not search_index_ready():
+        return _apply_like_search(query, search_text)
+
+    if db.engine.dialect.name == 'sqlite':
+        match_expression = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(weight) for weight in SQLITE_COLUMN_WEIGHTS)
+        matches = text(
+            f"SELECT rowid AS rowid, bm25(property_fts, {weights}) AS rank "
+            "FROM property_fts WHERE property_fts MATCH :match_expression"
+        ).bindparams(match_expression=match_expression).columns(
+            rowid=db.Integer, rank=Float).subquery('property_fts_matches')
+        return query.join(matches, matches.c.rowid == literal_column('property.rowid'))\
+            .order_by(matches.c.rank, Property.date_created.desc())
+
+    # PostgreSQL: prefix match on every token, ranked by cover density
+    document = literal_column(POSTGRES_DOCUMENT_SQL)
+    ts_query = func.to_tsquery('english', ' & '.join(f'{token}:*' for token in tokens))
+    return query.filter(document.op('@@')(ts_query))\
+        .order_by(func.ts_rank_cd(document, ts_query).desc(), Property.date_created.desc())
+
+
+def _apply_like_search(query, search_text):
+    pattern = '%{}%'.format(search_text.lower())
+    return query.filter(or_(*[
+        func.lower(getattr(Property, column)).like(pattern) for column in SEARCH_COLUMNS
+    ]))
+
+
+def full_text_property_ids(search_text):
+    """Ids of every property matching `search_text`, most relevant first"""
+    query = apply_full_text_search(db.session.query(Property.id), search_text)
+    return [row.id for row in query]
@@ -0,0 +1,134 @@
+"""
+Fast serialization path for property listings.
+
+Listing endpoints select only the columns they return (`project`) and
+serialize the Core rows directly (`serialize_rows`): no ORM objects, no
+identity map, and `property_images` is decoded once by the JSONArray
+column type. Clients can drop fields they don't show with a `fields`
+query argument, e.g. `fields=id,price,location,property_images` for a
+grid view, so `description` isn't even read from the database. Without
+`fields`, listings are assembled from materialized documents instead (see
+app/services/property_documents.py).
+
+Responses are encoded with orjson when it is installed (`init_fast_json`),
+producing the same JSON as Flask's default provider.
+"""
+import dataclasses
+import decimal
+from datetime import date
+from flask import abort, jsonify, make_response, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+from app.models.property import Property
+
+# orjson import (optional - falls back to the standard library encoder)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Fields of a property in listings, in the order of Property.serialize()
+LISTING_FIELDS = ('id', 'owner_id', 'location', 'description', 'address', 'bedrooms', 'bathrooms',
+                  'category', 'price', 'property_type', 'active', 'date_created', 'date_updated',
+                  'property_images', 'size', 'acreage', 'size_unit', 'views')
+
+# Selected even when not returned: cursors and ETags are built from them
+KEY_FIELDS = ('id', 'date_created', 'date_updated')
+
+
+def listing_fields(extra=()):
+    """
+    Fields requested with the `fields` query argument (from LISTING_FIELDS
+    and `extra`), None when it is absent: listings then use the properties'
+    documents. `id` is always included; unknown fields are a 400.
+    """
+    available = LISTING_FIELDS + tuple(extra)
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+
+    requested = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = sorted(requested - set(available))
+    if unknown:
+        abort(make_response(jsonify({"message": f"Unknown fields: {', '.join(unknown)}"}), 400))
+    requested.add('id')
+    # Image variants are looked up from the image URLs
+    if 'image_variants' in requested:
+        requested.add('property_images')
+    return tuple(field for field in available if field in requested)
+
+
+def project(query, fields):
+    """`query` selecting only the columns of `fields` (and KEY_FIELDS), as rows; documents when `fields` is None"""
+    if fields is None:
+        return query.with_entities(Property.id, Property.date_created, Property.date_updated, Property.document)
+    columns = [field for field in LISTING_FIELDS if field in fields or field in KEY_FIELDS]
+    return query.with_entities(*(getattr(Property, field) for field in columns))
+
+
+def serialize_rows(rows, fields):
+    """Listing dicts from rows selected by `project`, matching Property.serialize()"""
+    columns = [field for field in fields if field in LISTING_FIELDS]
+    items = []
+    for row in rows:
+        values = row._mapping
+        item = {field: values[field] for field in columns}
+        if 'views' in item:
+            item['views'] = item['views'] or 0
+        items.append(item)
+    return items
+
+
+def _default(o):
+    """Types Flask's default provider handles and orjson doesn't (or not the same way)"""
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding with orjson, falling back to the default one"""
+
+    if ORJSON_AVAILABLE:
+        # Same output as the default provider: sorted keys, HTTP dates
+        OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def encode(self, obj):
+        """`obj` as JSON bytes"""
+        try:
+            return orjson.dumps(obj, default=_default, option=self.OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits
+            return super().dumps(obj).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self._app.debug or self.compact is False:
+            # Indented output
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b"\n", mimetype=self.mimetype)
+
+
+def init_fast_json(app):
+    """Encode JSON responses with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        app.json = FastJSONProvider(app)
+    else:
+        print("⚠️  Warning: orjson is not installed, JSON responses use the standard library encoder")
@@ -0,0 +1,95 @@
+"""
+Buffered view counters.
+
+Counting a view used to be an UPDATE and a commit inside the GET request,
+and every read of a popular row queued on that row's lock. Views are now
+added to an in-process buffer instead, and a background thread flushes the
+buffer every VIEW_FLUSH_INTERVAL seconds with one batched
+`UPDATE ... SET views = views + :n WHERE id = :id` per model. Counts that
+fail to flush are put back and retried with the next flush; views still in
+the buffer when the process is killed are lost. A flush bumps the
+`<table>:<id>` cache tags of the rows it wrote (see
+app/services/response_cache.py), so cached details show the new counts.
+"""
+import atexit
+import threading
+from flask import current_app
+from sqlalchemy import bindparam, func, update
+from app.extensions import db
+from app.services.response_cache import invalidate
+
+
+class ViewCounter:
+    def __init__(self, app, interval=10):
+        self.app = app
+        self.interval = interval
+        self._counts = {}  # model -> {id: views not flushed yet}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def increment(self, model, object_id, count=1):
+        with self._lock:
+            counts = self._counts.setdefault(model, {})
+            counts[object_id] = counts.get(object_id, 0) + count
+        if self._thread is None:
+            self._start()
+
+    def pending(self, model, object_id):
+        """Views of an object that are not in the database yet"""
+        with self._lock:
+            return self._counts.get(model, {}).get(object_id, 0)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='view-counter', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            buffered, self._counts = self._counts, {}
+        if not buffered:
+            return
+
+        with self.app.app_context():
+            for model, counts in buffered.items():
+                table = model.__table__
+                # Views don't change the row's version (date_updated), see app/services/conditional.py
+                statement = (update(table)
+                             .where(table.c.id == bindparam('object_id'))
+                             .values(views=func.coalesce(table.c.views, 0) + bindparam('count'),
+                                     date_updated=table.c.date_updated))
+                # Same row order in every flush, so concurrent flushes can't deadlock
+                rows = [{'object_id': object_id, 'count': count} for object_id, count in sorted(counts.items())]
+                try:
+                    db.session.execute(statement, rows)
+                    db.session.commit()
+                    # Cached details include the views, and their pending count just dropped to 0
+                    invalidate(*(f"{table.name}:{object_id}" for object_id in counts))
+                    print(f"[VIEWS] Flushed {sum(counts.values())} {model.__name__} views for {len(rows)} rows")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[VIEWS] Failed to flush {model.__name__} views, retrying later: {e}")
+                    for object_id, count in counts.items():
+                        self.increment(model, object_id, count)
+            db.session.remove()
+
+
+def init_view_counters(app):
+    counter = ViewCounter(app, interval=app.config.get('VIEW_FLUSH_INTERVAL', 10))
+    app.extensions['view_counter'] = counter
+    return counter
+
+
+def count_view(model, object_id):
+    """Count a view of `object_id`; returns the views not flushed yet (this one included)"""
+    counter = current_app.extensions['view_counter']
+    counter.increment(model, object_id)
+    return counter.pending(model, object_id)
@@ -5,32 +5,43 @@ from app.extensions import db
 import uuid
 from app.middleware.authenticate import authenticate_user
 from app.middleware.admin import require_admin
+from app.services.response_cache import cached_response
+from app.services.listing_queries import vendors as vendor_query
+from app.services.moderation import ACTIONS, VENDOR_FILTERS, moderate, selection_condition
+from app.services.conditional import not_modified, page_etag, resource_validators, unchanged, with_validators
 
 # Get all vendors
 @bp.get('/vendors')
+@cached_response('vendors')
 def get_all_vendors():
     category = request.args.get('category', None)
     # Removed verified_only filter - all vendors are now auto-verified
     
-    query = Vendor.query.filter_by(active=True)
+    vendors = vendor_query(category).all()
+    # The client has this list already: nothing to serialize
+    etag = page_etag(vendors)
+    if unchanged(etag):
+        return not_modified(etag)
     
-    if category:
-        query = query.filter_by(category=category)
-    
-    vendors = query.order_by(Vendor.date_created.desc()).all()
-    
-    return jsonify({
+    return with_validators(jsonify({
         "vendors": [vendor.serialize() for vendor in vendors]
-    }), 200
+    }), etag), 200
 
 # Get vendor by ID
 @bp.get('/vendors/<vendor_id>')
 def get_vendor(vendor_id):
+    # Answer conditional requests before loading the vendor
+    validators = resource_validators("vendor", Vendor, vendor_id)
+    if validators is None:
+        return jsonify({"message": "Vendor not found"}), 404
+    if unchanged(*validators):
+        return not_modified(*validators)
+
     vendor = Vendor.query.get(vendor_id)
     if vendor is None:
         return jsonify({"message": "Vendor not found"}), 404
     
-    return jsonify(vendor.serialize()), 200
+    return with_validators(jsonify(vendor.serialize()), *validators), 200
 
 # Register/create a vendor
 @bp.post('/vendors/register')
@@ -136,7 +147,7 @@ def update_vendor(vendor_id):
 # Get vendors by category
 @bp.get('/vendors/category/<category>')
 def get_vendors_by_category(category):
-    vendors = Vendor.query.filter_by(category=category, active=True).order_by(Vendor.date_created.desc()).all()
+    vendors = vendor_query(category).all()
     
     return jsonify({
         "vendors": [vendor.serialize() for vendor in vendors],
@@ -200,6 +211,30 @@ def admin_activate_vendor(vendor_id):
         db.session.rollback()
         return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
+# Admin: Moderate vendors by id list or filter (activate, deactivate or delete)
+@bp.post('/vendors/admin/bulk/<action>')
+@authenticate_user
+@require_admin
+def admin_bulk_vendors(action):
+    if action not in ACTIONS:
+        return jsonify({"message": f"action must be one of: {', '.join(ACTIONS)}"}), 404
+    request_data = request.get_json(silent=True)
+    if not isinstance(request_data, dict):
+        return jsonify({"message": "Invalid request data"}), 400
+    try:
+        condition = selection_condition(Vendor, request_data, VENDOR_FILTERS)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        result = moderate(Vendor, action, condition, dry_run=bool(request_data.get('dry_run')))
+        print(f"[ADMIN] Bulk {action} of {result['affected']} vendors by admin {request.user.get('email')}")
+        return jsonify(result), 200
+    except Exception as e:
+        print(f"[ADMIN] Error in bulk {action} of vendors: {e}")
+        db.session.rollback()
+        return jsonify({"message": f"An error occurred: {str(e)}"}), 500
+
 # Admin: Get all vendors (including inactive)
 @bp.get('/vendors/admin/all')
 @authenticate_user
@@ -207,11 +242,7 @@ def admin_activate_vendor(vendor_id):
 def admin_get_all_vendors():
     include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
     
-    query = Vendor.query
-    if not include_inactive:
-        query = query.filter_by(active=True)
-    
-    vendors = query.order_by(Vendor.date_created.desc()).all()
+    vendors = vendor_query(include_inactive=include_inactive).all()
     
     print(f"[ADMIN] Fetching vendors - include_inactive: {include_inactive}, found: {len(vendors)} vendors")
     if include_inactive:
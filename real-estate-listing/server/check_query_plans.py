@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Query plan regression checks for the hot listing queries.
+
+Runs EXPLAIN (SQLite and PostgreSQL) on the query behind each listing
+endpoint and fails when one of them falls back to a full table scan or
+sorts its results instead of reading them in index order.
+
+Run it against a scratch database, or an in-memory one (`make check`
+does, and exits non-zero on a failure):
+
+    DATABASE_URI=sqlite:// python check_query_plans.py
+
+The queries are built by the same builders as the routes (mostly
+app/services/listing_queries.py), with sample arguments.
+"""
+import re
+import sys
+from datetime import datetime
+from app import create_app
+from app.extensions import db
+from app.models.property import Property
+from app.models.realtor import Realtor
+from app.models.blog import Blog
+from app.models import favorite, email_outbox, realtor_follower, purchase
+from app.services.search_index import ensure_search_index, apply_full_text_search
+from app.services.facets import indexed_rows
+from app.services.property_export import export_query
+from app.services.property_documents import properties_showing
+from app.services.pagination import dated_rows, undated_rows
+from app.services.change_feed import changes_query
+from app.services.mailer import due_emails
+from app.services.serialization import project
+from app.services.listing_queries import (NEWEST_FIRST, active_properties, active_properties_by_id, admin_blogs,
+                                          admin_properties, area_order, favorite_properties, published_blogs,
+                                          realtor_properties, recently_added, user_favorite, vendors)
+
+TABLES = ('property', 'realtor', 'favorite', 'blog', 'vendor', 'email_outbox', 'change_log', 'property_image')
+CURSOR = (datetime(2024, 1, 1), 'ffffffff-ffff-ffff-ffff-ffffffffffff')
+# Pages are fetched with one extra row
+PAGE = 20 + 1
+
+
+def listing_rows(query):
+    # Without a `fields` argument, listings select the stored documents
+    return project(query, None)
+
+
+# (name, query builder, whether sorting the result is acceptable)
+CHECKS = [
+    ("get_all_properties",
+     lambda: listing_rows(active_properties()).order_by(*NEWEST_FIRST).limit(20).offset(40), False),
+    ("get_all_properties (count)",
+     lambda: active_properties().with_entities(db.func.count()), False),
+    ("get_all_properties (cursor)",
+     lambda: dated_rows(listing_rows(active_properties()), Property, CURSOR).limit(PAGE), False),
+    ("get_all_properties (cursor, undated rows)",
+     lambda: undated_rows(listing_rows(active_properties()), Property, CURSOR[1]).limit(PAGE), False),
+    ("get_all_properties (sort=acreage)",
+     lambda: listing_rows(active_properties(min_area=1)).order_by(*area_order('acreage')).limit(20), False),
+    ("admin_get_all_properties",
+     lambda: admin_properties().order_by(*NEWEST_FIRST).limit(20), False),
+    ("admin_get_all_properties (include_inactive)",
+     lambda: admin_properties(include_inactive=True).order_by(*NEWEST_FIRST).limit(20), False),
+    ("admin_export_properties",
+     lambda: export_query(), False),
+    ("admin_export_properties (updated_since)",
+     lambda: export_query(include_inactive=True, updated_since=CURSOR[0]), False),
+    ("search_recently_added",
+     lambda: recently_added(None), False),
+    ("get_my_properties",
+     lambda: realtor_properties('realtor-id').order_by(*NEWEST_FIRST).limit(20), False),
+    ("get_my_properties (include_inactive)",
+     lambda: realtor_properties('realtor-id', include_inactive=True).order_by(*NEWEST_FIRST).limit(20), False),
+    ("get_realtor_properties (cursor)",
+     lambda: dated_rows(realtor_properties('realtor-id'), Property, CURSOR).limit(PAGE), False),
+    ("search_properties (full-text ids)",
+     lambda: apply_full_text_search(db.session.query(Property.id), 'storage dallas'), True),
+    ("search_properties (page rows)",
+     lambda: listing_rows(active_properties_by_id(['a', 'b', 'c'])), False),
+    ("facet index build",
+     lambda: indexed_rows(), False),
+    # The user's favorites are joined and sorted; bounded by one user's favorites
+    ("get_user_favorites",
+     lambda: favorite_properties('user-id').order_by(*NEWEST_FIRST).limit(20), True),
+    ("get_user_favorites (cursor)",
+     lambda: dated_rows(favorite_properties('user-id'), Property).limit(PAGE), True),
+    ("check_property_exists",
+     lambda: user_favorite('user-id', 'property-id').limit(1), False),
+    ("realtor by firebase user id",
+     lambda: Realtor.query.filter_by(realtor_id='user-id').limit(1), False),
+    ("get_all_blogs",
+     lambda: published_blogs().order_by(Blog.date_published.desc()).limit(10), False),
+    ("get_all_blogs (cursor)",
+     lambda: dated_rows(published_blogs(), Blog).limit(11), False),
+    ("admin_get_all_blogs",
+     lambda: admin_blogs().order_by(Blog.date_created.desc()).limit(20), False),
+    ("get_all_vendors",
+     lambda: vendors(), False),
+    ("get_vendors_by_category",
+     lambda: vendors('Construction'), False),
+    ("get_changes",
+     lambda: changes_query(100, 501, ['property', 'blog'], CURSOR[0]), False),
+    ("documents of a saved image's listings",
+     lambda: properties_showing(['https://example.com/a.jpg', 'https://example.com/b.jpg']), False),
+    ("mail dispatcher claim",
+     lambda: due_emails(CURSOR[0], 20), False),
+]
+
+
+def explain_sqlite(statement, params):
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, params).all()
+    problems = []
+    for row in rows:
+        detail = row[-1]
+        scanned = re.match(r'^SCAN (\w+)$', detail)
+        if scanned and scanned.group(1) in TABLES:
+            problems.append(('scan', detail))
+        if 'USE TEMP B-TREE' in detail:
+            problems.append(('sort', detail))
+    return [row[-1] for row in rows], problems
+
+
+def explain_postgres(statement, params):
+    connection = db.session.connection()
+    # Make the planner prefer indexes even on small tables, so that a
+    # sequential scan or a sort in the plan means no index can serve the query.
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    connection.exec_driver_sql('SET LOCAL enable_sort = off')
+    plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, params).scalar()
+    lines, problems = [], []
+
+    def walk(node, depth=0):
+        relation = node.get('Relation Name')
+        lines.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else ''))
+        if node['Node Type'] == 'Seq Scan' and relation in TABLES:
+            problems.append(('scan', f'Seq Scan on {relation}'))
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            problems.append(('sort', node['Node Type']))
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan[0]['Plan'])
+    return lines, problems
+
+
+def explain(query):
+    statement = query.statement if hasattr(query, 'statement') else query
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if db.engine.dialect.name == 'postgresql':
+        return explain_postgres(str(compiled), params)
+    return explain_sqlite(str(compiled), params)
+
+
+def check_query_plans():
+    print(f"🔍 Checking query plans on {db.engine.dialect.name}...\n")
+    failures = 0
+    for name, build_query, sort_allowed in CHECKS:
+        try:
+            plan, problems = explain(build_query())
+        finally:
+            db.session.rollback()
+        problems = [detail for kind, detail in problems if not (kind == 'sort' and sort_allowed)]
+        if problems:
+            failures += 1
+            print(f"   ❌ {name}: {', '.join(problems)}")
+            for line in plan:
+                print(f"      {line}")
+        else:
+            print(f"   ✅ {name}")
+
+    if failures:
+        print(f"\n❌ {failures} of {len(CHECKS)} queries are not served by an index")
+        return False
+    print(f"\n✅ All {len(CHECKS)} queries are served by indexes")
+    return True
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        ensure_search_index()
+        sys.exit(0 if check_query_plans() else 1)
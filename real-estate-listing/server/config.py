@@ -8,6 +8,99 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URI')\
         or 'sqlite:///' + os.path.join(basedir, 'myDB.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Seconds before the in-memory facet index is reloaded from the database
+    # (sooner when another worker writes properties and CACHE_REDIS_URL is set)
+    FACET_INDEX_MAX_AGE = int(os.environ.get('FACET_INDEX_MAX_AGE', 300))
+    # Fail requests running more SQL queries than this (development/tests, 0 = off)
+    MAX_QUERIES_PER_REQUEST = int(os.environ.get('MAX_QUERIES_PER_REQUEST', 0))
+    # Firebase project whose ID tokens are accepted (defaults to the Admin SDK's project)
+    FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID') or os.environ.get('project_id')
+    # Number of verified tokens kept in memory
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+    # 'firebase', or 'local' to accept tokens signed by a local test key (load tests only)
+    AUTH_PROVIDER = os.environ.get('AUTH_PROVIDER', 'firebase')
+    LOCAL_AUTH_KEY_FILE = os.environ.get('LOCAL_AUTH_KEY_FILE') or os.path.join(basedir, 'local-auth-key.pem')
+    LOCAL_AUTH_PROJECT_ID = os.environ.get('LOCAL_AUTH_PROJECT_ID', 'local-auth')
+    # Email outbox delivery (see app/services/mailer.py)
+    MAIL_KEY = os.environ.get('MAIL_KEY')
+    MAIL_ENDPOINT = os.environ.get('MAIL_ENDPOINT', 'https://api.brevo.com/v3/smtp/email')
+    MAIL_DISPATCHER_ENABLED = os.environ.get('MAIL_DISPATCHER_ENABLED', 'true').lower() == 'true'
+    MAIL_WORKERS = int(os.environ.get('MAIL_WORKERS', 4))
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 20))
+    MAIL_POLL_INTERVAL = float(os.environ.get('MAIL_POLL_INTERVAL', 5))
+    MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', 8))
+    MAIL_RETRY_BASE_DELAY = float(os.environ.get('MAIL_RETRY_BASE_DELAY', 10))
+    MAIL_RETRY_MAX_DELAY = float(os.environ.get('MAIL_RETRY_MAX_DELAY', 3600))
+    MAIL_CLAIM_LEASE = int(os.environ.get('MAIL_CLAIM_LEASE', 120))
+    MAIL_TIMEOUT = float(os.environ.get('MAIL_TIMEOUT', 10))
+    # Image storage, in priority order Cloudinary > Firebase > Local (resolved at startup)
+    USE_CLOUDINARY = os.environ.get('USE_CLOUDINARY', 'false').lower() == 'true'
+    USE_FIREBASE_STORAGE = os.environ.get('USE_FIREBASE_STORAGE', 'false').lower() == 'true'
+    USE_LOCAL_STORAGE = os.environ.get('USE_LOCAL_STORAGE', 'true').lower() == 'true'
+    CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
+    CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
+    CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or os.path.join(basedir, 'uploads')
+    # Images uploaded concurrently, across all requests
+    UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 8))
+    # Upload limits, checked while the upload streams in (see app/services/image_store.py)
+    MAX_UPLOAD_REQUEST_BYTES = int(os.environ.get('MAX_UPLOAD_REQUEST_BYTES', 300 * 1024 * 1024))
+    MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', 15 * 1024 * 1024))
+    MAX_IMAGE_DIMENSION = int(os.environ.get('MAX_IMAGE_DIMENSION', 12000))
+    MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 50000000))
+    # Who streams /uploads/properties files: 'app', 'accel' (nginx X-Accel-Redirect) or 'sendfile' (X-Sendfile)
+    UPLOADS_SERVE_MODE = os.environ.get('UPLOADS_SERVE_MODE', 'app')
+    UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+    # Cache lifetime of uploads without a content hash in their name (seconds)
+    UPLOADS_MAX_AGE = int(os.environ.get('UPLOADS_MAX_AGE', 86400))
+    # Response cache for public read endpoints (see app/services/response_cache.py)
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+    # Optional Redis tier shared by all workers, e.g. redis://localhost:6379/0
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_REDIS_TTL = int(os.environ.get('CACHE_REDIS_TTL', 300))
+    CACHE_REDIS_TIMEOUT = float(os.environ.get('CACHE_REDIS_TIMEOUT', 0.5))
+    # Seconds a cache miss waits for the same entry being computed by another request
+    CACHE_FLIGHT_TIMEOUT = float(os.environ.get('CACHE_FLIGHT_TIMEOUT', 10))
+    # Also coalesce misses across workers with a lock in Redis
+    CACHE_REDIS_LOCK = os.environ.get('CACHE_REDIS_LOCK', 'true').lower() == 'true'
+    # Response compression (see app/middleware/compression.py)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    # Smaller responses are sent uncompressed
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+    # Rows inserted per transaction by bulk imports (see app/services/property_import.py)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+    # Change feed (see app/services/change_feed.py): most changes per page, and
+    # seconds a change is held back so concurrent transactions can commit first
+    CHANGE_FEED_PAGE_SIZE = int(os.environ.get('CHANGE_FEED_PAGE_SIZE', 500))
+    CHANGE_FEED_SETTLE = float(os.environ.get('CHANGE_FEED_SETTLE', 2))
+    # Origins of the frontend allowed to call the API and open live update streams
+    CORS_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
+    # Live listing updates over Server-Sent Events (see app/services/live_updates.py)
+    LIVE_UPDATES_ENABLED = os.environ.get('LIVE_UPDATES_ENABLED', 'true').lower() == 'true'
+    # Redis the API publishes events to and live_server.py reads them from, e.g. redis://localhost:6379/0
+    LIVE_UPDATES_REDIS_URL = os.environ.get('LIVE_UPDATES_REDIS_URL')
+    LIVE_UPDATES_REDIS_TIMEOUT = float(os.environ.get('LIVE_UPDATES_REDIS_TIMEOUT', 0.5))
+    # Public URL of live_server.py's stream, e.g. https://live.example.com/property/live_updates
+    LIVE_UPDATES_URL = os.environ.get('LIVE_UPDATES_URL')
+    # Events kept by live_server.py for clients resuming with Last-Event-ID
+    LIVE_UPDATES_BUFFER = int(os.environ.get('LIVE_UPDATES_BUFFER', 1000))
+    # Streams end after this many seconds (below proxy timeouts, e.g. Cloud Run's 300s default)
+    SSE_STREAM_SECONDS = float(os.environ.get('SSE_STREAM_SECONDS', 240))
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+    # Seconds clients wait before reconnecting
+    SSE_RETRY_SECONDS = float(os.environ.get('SSE_RETRY_SECONDS', 5))
+    # Seconds between writes of buffered blog and property view counts
+    VIEW_FLUSH_INTERVAL = float(os.environ.get('VIEW_FLUSH_INTERVAL', 10))
+    # Responsive image variants generated after upload (see app/services/image_variants.py)
+    IMAGE_VARIANTS_ENABLED = os.environ.get('IMAGE_VARIANTS_ENABLED', 'true').lower() == 'true'
+    IMAGE_VARIANT_WIDTHS = [int(width) for width in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640,1024,1600').split(',')]
+    IMAGE_WEBP_QUALITY = int(os.environ.get('IMAGE_WEBP_QUALITY', 75))
+    IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', 80))
+    IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
 
 def import_firebase_variables():
     private_key = os.environ.get("private_key")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Export the property catalogue as NDJSON or CSV, streamed to a file or
+stdout (see app/services/property_export.py). Same output as
+GET /property/admin/export.
+
+    python export_properties.py [--format ndjson|csv] [--output FILE]
+                                [--include-inactive] [--updated-since 2024-01-01T00:00:00]
+"""
+import argparse
+import contextlib
+import sys
+from app import create_app
+from app.extensions import db
+from app.services.property_export import EXPORT_FORMATS, export_lines, export_rows, parse_updated_since
+
+# Startup messages go to stderr, stdout may be the export
+with contextlib.redirect_stdout(sys.stderr):
+    app = create_app()
+
+
+def export_properties(export_format, output, include_inactive, updated_since):
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    for line in export_lines(export_format, counted(export_rows(include_inactive, updated_since))):
+        output.write(line)
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the property catalogue")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+    parser.add_argument('--output', help="File to write (default: stdout)")
+    parser.add_argument('--include-inactive', action='store_true', help="Also export delisted properties")
+    parser.add_argument('--updated-since', help="Only properties modified at or after this ISO 8601 date")
+    args = parser.parse_args()
+
+    try:
+        since = parse_updated_since(args.updated_since)
+    except ValueError:
+        parser.error("--updated-since must be an ISO 8601 date")
+
+    with app.app_context():
+        if args.output:
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                exported = export_properties(args.format, f, args.include_inactive, since)
+            print(f"✅ Exported {exported} properties to {args.output}", file=sys.stderr)
+        else:
+            exported = export_properties(args.format, sys.stdout, args.include_inactive, since)
+            print(f"✅ Exported {exported} properties", file=sys.stderr)
+        db.session.remove()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Garbage-collect the content-addressed local image store.
+
+Recounts the references to every stored image from Property.property_images,
+then deletes images (and their variants) that no property references and
+that are older than the grace period, which leaves time for an upload to
+be attached to a new listing. Also removes stale temporary upload files.
+
+    python gc_uploads.py [--grace-hours 24] [--dry-run]
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from collections import Counter
+from sqlalchemy import update
+from app import create_app
+from app.extensions import db
+from app.models.property import Property
+from app.models.stored_image import StoredImage
+from app.models.image_variant import ImageVariant
+from app.services.image_store import stored_filenames
+
+app = create_app()
+
+
+def gc_uploads(grace_hours, dry_run):
+    store = app.extensions['image_store']
+    references = Counter()
+    for (images,) in db.session.query(Property.property_images):
+        references.update(stored_filenames(images))
+
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    removed = recounted = 0
+    for image in StoredImage.query.all():
+        count = references.get(image.filename, 0)
+        if count == 0 and image.date_created and image.date_created < cutoff:
+            stem = os.path.splitext(image.filename)[0]
+            files = [name for name in os.listdir(store.directory) if name == image.filename
+                     or name.startswith(f"{stem}_")]
+            print(f"   🗑️  {image.filename} ({len(files)} files)")
+            if not dry_run:
+                for name in files:
+                    os.remove(os.path.join(store.directory, name))
+                ImageVariant.query.filter(ImageVariant.url.like(f"%/uploads/properties/{image.filename}"))\
+                    .delete(synchronize_session=False)
+                db.session.delete(image)
+            removed += 1
+        elif count != image.refcount:
+            recounted += 1
+            if not dry_run:
+                db.session.execute(update(StoredImage).where(StoredImage.sha256 == image.sha256)
+                                   .values(refcount=count))
+    if not dry_run:
+        db.session.commit()
+
+    stale = 0
+    for name in os.listdir(store.tmp_directory):
+        path = os.path.join(store.tmp_directory, name)
+        if time.time() - os.path.getmtime(path) > 3600:
+            stale += 1
+            if not dry_run:
+                os.remove(path)
+
+    print(f"\n✅ Removed {removed} unreferenced images, fixed {recounted} reference counts, "
+          f"removed {stale} stale temporary files{' (dry run)' if dry_run else ''}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Remove unreferenced uploaded images")
+    parser.add_argument('--grace-hours', type=float, default=24,
+                        help="Keep unreferenced images uploaded less than this long ago")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would be removed")
+    args = parser.parse_args()
+    with app.app_context():
+        db.create_all()
+        gc_uploads(args.grace_hours, args.dry_run)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Generate responsive variants for property images uploaded before variants
+existed. Only images in the local uploads directory can be processed;
+Cloudinary images just get their transformation URLs. Images that already
+have variants are skipped, so it is safe to run repeatedly.
+
+    python generate_image_variants.py
+"""
+import os
+from urllib.parse import urlsplit
+from app import create_app
+from app.extensions import db
+from app.models.property import Property
+from app.models.image_variant import ImageVariant
+from app.services.image_storage import LocalStorageBackend
+from app.services.image_variants import PILLOW_AVAILABLE
+
+app = create_app()
+
+
+def generate_image_variants():
+    processor = app.extensions.get('image_variants')
+    if processor is None:
+        print("❌ Image variants are disabled (IMAGE_VARIANTS_ENABLED=false)")
+        return
+    local = LocalStorageBackend(app.extensions['image_store'])
+
+    done = {url for (url,) in db.session.query(ImageVariant.url)}
+    urls = {url for (images,) in db.session.query(Property.property_images) for url in images or []
+            if isinstance(url, str) and url not in done}
+    print(f"🔍 {len(urls)} images without variants")
+
+    processed = 0
+    for url in sorted(urls):
+        parts = urlsplit(url)
+        if '/upload/' in parts.path and 'cloudinary' in parts.netloc:
+            processor.record_cloudinary(url)
+            processed += 1
+        elif parts.path.startswith('/uploads/properties/') and PILLOW_AVAILABLE:
+            path = os.path.join(local.upload_dir, os.path.basename(parts.path))
+            if not os.path.exists(path):
+                print(f"   ⚠️  Missing file for {url}")
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            processor.process(local, url, data, f"{parts.scheme}://{parts.netloc}")
+            processed += 1
+    print(f"\n✅ Generated variants for {processed} images")
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        db.create_all()
+        generate_image_variants()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Import properties from an NDJSON or CSV file, in batches (see
+app/services/property_import.py). Same behaviour as
+POST /property/admin/import; exports of export_properties.py can be
+imported as they are.
+
+    python import_properties.py FILE [--format ndjson|csv] [--batch-size 500]
+                                     [--realtor-id FIREBASE_UID] [--report report.json]
+"""
+import argparse
+import json
+import os
+import sys
+from app import create_app
+from app.extensions import db
+from app.services.property_import import IMPORT_FORMATS, PropertyImporter, read_rows
+
+app = create_app()
+
+
+def import_properties(path, import_format, batch_size, realtor_id):
+    importer = PropertyImporter(batch_size=batch_size, default_realtor_id=realtor_id)
+    with open(path, 'rb') as f:
+        return importer.run(read_rows(f, import_format))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import properties from NDJSON or CSV")
+    parser.add_argument('file')
+    parser.add_argument('--format', choices=IMPORT_FORMATS,
+                        help="Default: from the file extension (.csv), else ndjson")
+    parser.add_argument('--batch-size', type=int, default=app.config.get('IMPORT_BATCH_SIZE', 500))
+    parser.add_argument('--realtor-id', help="Firebase user id of the realtor owning rows that name none")
+    parser.add_argument('--report', help="Write the per-row error report to this JSON file")
+    args = parser.parse_args()
+
+    import_format = args.format or ('csv' if os.path.splitext(args.file)[1].lower() == '.csv' else 'ndjson')
+    with app.app_context():
+        report = import_properties(args.file, import_format, max(args.batch_size, 1), args.realtor_id)
+        db.session.remove()
+
+    print(f"\n✅ Imported {report.imported} properties ({report.realtors_created} new realtors)")
+    if report.failed:
+        print(f"❌ {report.failed} rows failed")
+        for error in report.errors[:20]:
+            print(f"   Row {error['row']}: {'; '.join(error['errors'])}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report.serialize(), f, indent=2)
+        print(f"📄 Report written to {args.report}")
+    sys.exit(1 if report.failed and not report.imported else 0)
@@ -1,6 +1,7 @@
 from app import create_app
 from app.extensions import db
-from app.models import property, realtor, favorite, realtor_follower, purchase, vendor, blog
+from app.models import property, realtor, favorite, realtor_follower, purchase, vendor, blog, email_outbox, image_variant, stored_image, change_log, property_image
+from app.services.search_index import ensure_search_index
 
 app = create_app()
 
@@ -8,4 +9,6 @@ with app.app_context():
     # Create all database tables
     db.create_all()
     print("Database tables created successfully!")
+    if ensure_search_index():
+        print("Full-text search index created successfully!")
 
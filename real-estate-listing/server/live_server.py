@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Server of the live listing updates stream (Server-Sent Events).
+
+Streams stay open for minutes, so they are served here, on one asyncio
+event loop, rather than by the API's gunicorn threads: an open stream
+costs a socket and a little memory, and there is no limit on how many
+can be open. Events are read from the LIVE_UPDATES_REDIS_URL channel the
+API publishes to (see app/services/live_updates.py).
+
+    LIVE_UPDATES_REDIS_URL=redis://localhost:6379/0 python live_server.py --port 8081
+    LIVE_UPDATES_REDIS_URL=redis://localhost:6379/0 \\
+        LIVE_UPDATES_URL=http://127.0.0.1:8081/property/live_updates python run.py
+
+GET /property/live_updates takes the filters of `listing_filter` and the
+Last-Event-ID header (or `last_event_id` argument); GET /health returns
+the bus statistics.
+"""
+import argparse
+import asyncio
+import json
+import os
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+from werkzeug.datastructures import MultiDict
+from config import Config
+from app.services.live_updates import ListingBus, event_stream, listing_filter
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+STREAM_PATH = '/property/live_updates'
+
+# Seconds a client has to send its request headers
+REQUEST_TIMEOUT = 10
+
+
+class LiveServer:
+    def __init__(self, bus, origins):
+        self.bus = bus
+        self.origins = origins
+
+    async def handle(self, reader, writer):
+        try:
+            method, target, headers = await asyncio.wait_for(read_request(reader), REQUEST_TIMEOUT)
+        except (asyncio.TimeoutError, ValueError, ConnectionError):
+            writer.close()
+            return
+
+        try:
+            url = urlsplit(target)
+            cors = self.cors_headers(headers.get('origin'))
+            if method == 'OPTIONS':
+                await respond(writer, HTTPStatus.NO_CONTENT, cors + [
+                    ('Access-Control-Allow-Methods', 'GET'),
+                    ('Access-Control-Allow-Headers', 'Last-Event-ID, Cache-Control'),
+                ])
+            elif method != 'GET':
+                await respond_json(writer, HTTPStatus.METHOD_NOT_ALLOWED, {"message": "Method not allowed"}, cors)
+            elif url.path == STREAM_PATH:
+                await self.stream(writer, MultiDict(parse_qsl(url.query)), headers, cors)
+            elif url.path == '/health':
+                await respond_json(writer, HTTPStatus.OK, self.bus.stats, cors)
+            else:
+                await respond_json(writer, HTTPStatus.NOT_FOUND, {"message": "Not found"}, cors)
+        except ConnectionError:
+            # The client went away
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, writer, args, headers, cors):
+        bus = self.bus
+        after = bus.resume_point(headers.get('last-event-id') or args.get('last_event_id'))
+        stream = event_stream(bus, after, listing_filter(args),
+                              duration=Config.SSE_STREAM_SECONDS,
+                              heartbeat=Config.SSE_HEARTBEAT_SECONDS,
+                              retry=Config.SSE_RETRY_SECONDS)
+        await respond(writer, HTTPStatus.OK, cors + [
+            ('Content-Type', 'text/event-stream'),
+            ('Cache-Control', 'no-cache'),
+            ('X-Accel-Buffering', 'no'),
+        ])
+        bus.stats['streams'] += 1
+        try:
+            async for chunk in stream:
+                writer.write(chunk.encode())
+                await writer.drain()
+        finally:
+            bus.stats['streams'] -= 1
+            bus.stats['streamed'] += 1
+            await stream.aclose()
+
+    def cors_headers(self, origin):
+        if origin not in self.origins:
+            return []
+        return [('Access-Control-Allow-Origin', origin), ('Access-Control-Allow-Credentials', 'true'),
+                ('Vary', 'Origin')]
+
+
+async def read_request(reader):
+    """(method, target, lower-cased headers) of an HTTP/1.x request; ValueError if malformed"""
+    request_line = (await reader.readline()).decode('latin-1')
+    method, target, _ = request_line.split(' ', 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if line in ('\r\n', '\n', ''):
+            return method, target, headers
+        name, separator, value = line.partition(':')
+        if not separator:
+            raise ValueError(f"Malformed header: {line!r}")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def respond(writer, status, headers):
+    # No Content-Length: the body (if any) ends when the connection closes
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", 'Connection: close']
+    lines += [f"{name}: {value}" for name, value in headers]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+
+
+async def respond_json(writer, status, body, headers):
+    await respond(writer, status, headers + [('Content-Type', 'application/json')])
+    writer.write(json.dumps(body).encode())
+    await writer.drain()
+
+
+async def serve(host, port, redis_url):
+    bus = ListingBus(buffer_size=Config.LIVE_UPDATES_BUFFER)
+    relay = asyncio.create_task(bus.relay(aioredis.Redis.from_url(redis_url)))
+    server = await asyncio.start_server(LiveServer(bus, Config.CORS_ORIGINS).handle, host, port)
+    print(f"📡 Live updates on http://{host}:{port}{STREAM_PATH}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        relay.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server of the live listing updates stream")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8081)))
+    args = parser.parse_args()
+
+    if not Config.LIVE_UPDATES_REDIS_URL:
+        parser.error("LIVE_UPDATES_REDIS_URL is not set: the live server reads the API's events from Redis")
+    if not REDIS_AVAILABLE:
+        parser.error("The redis package is not installed (pip install -r requirements.txt)")
+    try:
+        asyncio.run(serve(args.host, args.port, Config.LIVE_UPDATES_REDIS_URL))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
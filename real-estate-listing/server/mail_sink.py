@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Brevo transactional email API.
+
+Accepts POSTs of Brevo's /v3/smtp/email JSON body and prints them instead of
+sending email. It can be made slow or flaky to exercise the outbox retries:
+
+    python mail_sink.py --port 8025 --delay 2 --fail-rate 0.3
+    MAIL_ENDPOINT=http://127.0.0.1:8025/v3/smtp/email python run.py
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(delay, fail_rate, quiet):
+    class MailSinkHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if delay:
+                time.sleep(delay)
+            if random.random() < fail_rate:
+                self._reply(503, {'code': 'service_unavailable', 'message': 'Simulated failure'})
+                return
+            try:
+                email = json.loads(body)
+            except ValueError:
+                self._reply(400, {'code': 'invalid_parameter', 'message': 'Body is not JSON'})
+                return
+            if not quiet:
+                recipients = ', '.join(to.get('email', '') for to in email.get('to', []))
+                print(f"[MAIL SINK] To: {recipients} | Subject: {email.get('subject')}")
+            self._reply(201, {'messageId': f'<{uuid.uuid4()}@mail-sink>'})
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MailSinkHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Brevo email API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--delay', type=float, default=0, help="Seconds to wait before answering")
+    parser.add_argument('--fail-rate', type=float, default=0, help="Fraction of requests answered with 503")
+    parser.add_argument('--quiet', action='store_true', help="Don't print received emails")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.delay, args.fail_rate, args.quiet))
+    print(f"📬 Mail sink listening on http://{args.host}:{args.port}/v3/smtp/email")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
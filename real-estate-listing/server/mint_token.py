@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Mint ID tokens for the offline auth stand-in (AUTH_PROVIDER=local).
+
+Tokens are signed with LOCAL_AUTH_KEY_FILE, the key the server loads, and
+carry the same claims as Firebase ID tokens:
+
+    python mint_token.py --uid seller-1 --email seller@example.com --name "Test Seller"
+    curl -H "Authorization: Bearer $(python mint_token.py --uid seller-1)" localhost:5000/property/my_properties
+
+Add the email to ADMIN_EMAILS to exercise the admin routes.
+"""
+import argparse
+from dotenv import load_dotenv
+load_dotenv()
+from config import Config
+from app.middleware.local_auth import create_local_identity_provider
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mint a local test ID token")
+    parser.add_argument('--uid', required=True, help="User id (Firebase uid)")
+    parser.add_argument('--email', help="Email claim, used for admin checks and notifications")
+    parser.add_argument('--name', help="Display name claim")
+    parser.add_argument('--expires-in', type=int, default=3600, help="Token lifetime in seconds")
+    parser.add_argument('--count', type=int, default=1,
+                        help="Mint tokens for uid-0..uid-N instead (one per line, for load tests)")
+    args = parser.parse_args()
+
+    config = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+    provider = create_local_identity_provider(config)
+    if args.count == 1:
+        print(provider.mint_token(args.uid, args.email, args.name, args.expires_in))
+        return
+    for number in range(args.count):
+        email = args.email.replace('@', f'+{number}@') if args.email else None
+        print(provider.mint_token(f'{args.uid}-{number}', email, args.name, args.expires_in))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Upgrade an existing database to the current models.
+
+db.create_all() only creates missing tables, so this script also adds the
+columns and indexes introduced after a table was created, then backfills
+derived data. It is safe to run repeatedly.
+
+    python upgrade_db.py
+"""
+from sqlalchemy import inspect, text, update
+from app import create_app
+from app.extensions import db
+from app.models import property, realtor, favorite, realtor_follower, purchase, vendor, blog, email_outbox, image_variant, stored_image, change_log, property_image
+from app.models.property import Property, parse_acreage
+from app.models.property_image import PropertyImage
+from app.models.blog import Blog
+from app.models.realtor import Realtor
+from app.models.vendor import Vendor
+from app.services.property_documents import index_property_images, refresh_documents
+
+BATCH_SIZE = 500
+
+app = create_app()
+
+
+def add_missing_columns():
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            print(f"✓ Added column {table.name}.{column.name} ({column_type})")
+
+
+def add_missing_indexes():
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    print("✓ Indexes are up to date")
+
+
+def backfill_acreage():
+    """Parse Property.size into the numeric acreage/size_unit columns"""
+    last_id = ''
+    updated = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Property.id, Property.size)
+            .where(Property.id > last_id, Property.acreage.is_(None), Property.size.isnot(None))
+            .order_by(Property.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        values = []
+        for row in rows:
+            acreage, size_unit = parse_acreage(row.size)
+            if acreage is not None:
+                values.append({"id": row.id, "acreage": acreage, "size_unit": size_unit})
+        if values:
+            db.session.execute(update(Property), values)
+            db.session.commit()
+            updated += len(values)
+    print(f"✓ Backfilled acreage for {updated} properties")
+
+
+def backfill_date_updated():
+    """Rows written before date_updated existed start at their creation date"""
+    for model in (Property, Blog, Vendor, Realtor):
+        result = db.session.execute(
+            update(model).where(model.date_updated.is_(None)).values(date_updated=model.date_created)
+        )
+        db.session.commit()
+        print(f"✓ Backfilled date_updated for {result.rowcount} {model.__tablename__} rows")
+
+
+def backfill_documents():
+    """Build the listing documents of properties that don't have one yet, keeping their date_updated"""
+    built = 0
+    while True:
+        property_ids = db.session.execute(
+            db.select(Property.id).where(Property.document.is_(None)).order_by(Property.id).limit(BATCH_SIZE)
+        ).scalars().all()
+        if not property_ids:
+            break
+        refresh_documents(db.session.connection(), property_ids, new_version=False)
+        db.session.commit()
+        built += len(property_ids)
+    print(f"✓ Built listing documents for {built} properties")
+
+
+def backfill_property_images():
+    """Index the image URLs of properties that have no PropertyImage rows"""
+    last_id = ''
+    indexed = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Property.id, Property.property_images)
+            .where(Property.id > last_id, ~db.select(PropertyImage.property_id)
+                   .where(PropertyImage.property_id == Property.id).exists())
+            .order_by(Property.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        index_property_images(db.session.connection(), {row.id: row.property_images for row in rows})
+        db.session.commit()
+        indexed += len(rows)
+    print(f"✓ Indexed the images of {indexed} properties")
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        db.create_all()
+        add_missing_columns()
+        add_missing_indexes()
+        backfill_acreage()
+        backfill_date_updated()
+        backfill_documents()
+        backfill_property_images()
+        print("\n✅ Database upgraded successfully!")